@@ -1,11 +1,29 @@
+from pathlib import Path
+from typing import List
 import argparse
 import asyncio
 import logging
 import os
+import sys
+import time
 
 from at_queue.core.session import ConnectionParameters
 
+from at_temporal_solver.core.artifacts import ARTIFACT_SUFFIX
+from at_temporal_solver.core.artifacts import KBArtifacts
+from at_temporal_solver.core.artifacts import load_artifacts
+from at_temporal_solver.core.artifacts import save_artifacts
+from at_temporal_solver.core.at_temporal_solver import TIMELINE_CLASSES
+from at_temporal_solver.core.at_temporal_solver import TemporalSolver
 from at_temporal_solver.core.component import ATTemporalSolver
+from at_temporal_solver.core.kb import get_kb_hash
+from at_temporal_solver.core.kb import load_kb
+from at_temporal_solver.core.kb import load_kb_file
+from at_temporal_solver.core.kb import read_kb_file
+from at_temporal_solver.core.sessions import EvictionPolicy
+from at_temporal_solver.core.workers import EXECUTOR_MODES
+from at_temporal_solver.replay import read_wm_stream
+from at_temporal_solver.replay import replay
 
 parser = argparse.ArgumentParser(
     prog="at-temporal-solver", description="General working memory for AT-TECHNOLOGY components"
@@ -38,11 +56,159 @@ parser.add_argument(
     required=False,
     default="/",
 )
+parser.add_argument(
+    "--timeline",
+    help="Timeline storage backend",
+    choices=list(TIMELINE_CLASSES),
+    required=False,
+    default="default",
+)
+parser.add_argument(
+    "--retention",
+    help="Number of last tacts to keep in session timelines, all tacts are kept by default",
+    type=int,
+    required=False,
+    default=None,
+)
+parser.add_argument(
+    "--executor",
+    help="Where tacts are processed: on the event loop, in a thread pool or in worker processes owning sessions",
+    choices=EXECUTOR_MODES,
+    required=False,
+    default="inline",
+)
+parser.add_argument(
+    "--workers",
+    help="Number of executor threads or processes, defaults to the number of CPUs",
+    type=int,
+    required=False,
+    default=None,
+)
+parser.add_argument(
+    "--shards",
+    help="Run sessions in the given number of worker processes, routing each token or user id by its hash",
+    type=int,
+    required=False,
+    default=None,
+)
+parser.add_argument(
+    "--max-sessions", help="Maximum number of sessions, least recently used are evicted", type=int, default=None
+)
+parser.add_argument("--session-ttl", help="Seconds after the last call to evict a session", type=float, default=None)
+parser.add_argument("--session-memory", help="Approximate memory budget of a session in bytes", type=int, default=None)
+parser.add_argument(
+    "--memory-budget", help="Approximate memory budget of all sessions in bytes", type=int, default=None
+)
+parser.add_argument(
+    "--sweep-interval", help="Seconds between checks of session TTL and memory budgets", type=float, default=60
+)
+parser.add_argument(
+    "--hibernate-dir",
+    dest="hibernation_dir",
+    help="Directory to save evicted sessions and sessions left on shutdown to, they are restored on their next call",
+    default=None,
+)
+parser.add_argument(
+    "--preload",
+    dest="preload_dir",
+    help="Directory of knowledge base artifacts made by the compile command to load at startup",
+    default=None,
+)
 
+subparsers = parser.add_subparsers(dest="command")
 
-async def main(**connection_kwargs):
+replay_parser = subparsers.add_parser(
+    "replay", help="Process recorded working memory tacts without RabbitMQ and write tact results"
+)
+replay_parser.add_argument("kb", help="Knowledge base file (.xml, .json, .krl or a compiled .atkb)")
+replay_parser.add_argument("input", help="JSON lines file with a list of working memory items per tact, - for stdin")
+replay_parser.add_argument("-o", "--output", help="JSON lines file to write tact results to", default=None)
+replay_parser.add_argument("--full", help="Write full tact results instead of deltas", action="store_true")
+replay_parser.add_argument(
+    "--keep-wm", help="Update the working memory without clearing it before each tact", action="store_true"
+)
+
+compile_parser = subparsers.add_parser(
+    "compile", help="Precompile knowledge base files to artifacts loaded at startup with --preload"
+)
+compile_parser.add_argument("kbs", nargs="+", help="Knowledge base files (.xml, .json or .krl)")
+compile_parser.add_argument(
+    "-o", "--output-dir", help="Directory to write artifacts to, named after the knowledge base files", default="."
+)
+
+
+def run_compile(kbs: List[str], output_dir: str = ".", **kwargs):
+    os.makedirs(output_dir, exist_ok=True)
+    for kb in kbs:
+        kb_data = read_kb_file(kb)
+        started = time.perf_counter()
+        artifacts = KBArtifacts.build(load_kb(kb_data), kb_hash=get_kb_hash(kb_data))
+        path = os.path.join(output_dir, Path(kb).stem + ARTIFACT_SUFFIX)
+        save_artifacts(artifacts, path)
+        print(f"Compiled {kb} to {path} in {time.perf_counter() - started:.3f} s", file=sys.stderr)
+
+
+def run_replay(
+    kb: str,
+    input: str,
+    output: str = None,
+    full: bool = False,
+    keep_wm: bool = False,
+    timeline: str = "default",
+    retention: int = None,
+    **kwargs,
+):
+    artifacts = load_artifacts(kb) if kb.endswith(ARTIFACT_SUFFIX) else KBArtifacts.build(load_kb_file(kb))
+    solver = TemporalSolver.from_artifacts(
+        artifacts, timeline_class=TIMELINE_CLASSES[timeline], retention=retention, incremental=True
+    )
+    input_file = sys.stdin if input == "-" else open(input, encoding="utf-8")
+    output_file = open(output, "w", encoding="utf-8") if output is not None else None
+    try:
+        stats = replay(solver, read_wm_stream(input_file), output=output_file, delta=not full, clear_before=not keep_wm)
+    finally:
+        if input_file is not sys.stdin:
+            input_file.close()
+        if output_file is not None:
+            output_file.close()
+    print(
+        f"Processed {stats.tacts} tacts in {stats.seconds:.3f} s ({stats.tacts_per_second:.1f} tacts/s)",
+        file=sys.stderr,
+    )
+
+
+async def main(
+    timeline: str = "default",
+    retention: int = None,
+    executor: str = "inline",
+    workers: int = None,
+    shards: int = None,
+    max_sessions: int = None,
+    session_ttl: float = None,
+    session_memory: int = None,
+    memory_budget: int = None,
+    sweep_interval: float = 60,
+    hibernation_dir: str = None,
+    preload_dir: str = None,
+    **connection_kwargs,
+):
+    if shards:
+        executor = "sharded"
+        workers = shards
     connection_parameters = ConnectionParameters(**connection_kwargs)
-    solver = ATTemporalSolver(connection_parameters=connection_parameters)
+    solver = ATTemporalSolver(
+        connection_parameters=connection_parameters,
+        timeline_class=TIMELINE_CLASSES[timeline],
+        retention=retention,
+        executor=executor,
+        workers=workers,
+        eviction=EvictionPolicy(
+            max_sessions=max_sessions, ttl=session_ttl, session_memory=session_memory, memory=memory_budget
+        ),
+        sweep_interval=sweep_interval,
+        hibernation_dir=hibernation_dir,
+        preload_dir=preload_dir,
+    )
     await solver.initialize()
     await solver.register()
 
@@ -55,12 +221,21 @@ async def main(**connection_kwargs):
     except PermissionError:
         pass
 
-    await solver.start()
+    try:
+        await solver.start()
+    finally:
+        solver.executor.close()
 
 
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO)
     args = parser.parse_args()
     args_dict = vars(args)
+    command = args_dict.pop("command")
 
-    asyncio.run(main(**args_dict))
+    if command == "replay":
+        run_replay(**args_dict)
+    elif command == "compile":
+        run_compile(**args_dict)
+    else:
+        asyncio.run(main(**args_dict))
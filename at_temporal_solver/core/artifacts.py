@@ -0,0 +1,221 @@
+from collections import OrderedDict
+from concurrent.futures import Executor
+from dataclasses import dataclass
+from dataclasses import replace
+from pathlib import Path
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+from typing import Union
+from xml.etree.ElementTree import Element
+import asyncio
+import logging
+import mmap
+import os
+import pickle
+import struct
+import threading
+
+from at_krl.core.knowledge_base import KnowledgeBase
+from at_krl.core.temporal.allen_event import KBEvent
+from at_krl.core.temporal.allen_interval import KBInterval
+from at_solver.core.wm import WorkingMemory
+
+from at_temporal_solver.core.dependencies import Condition
+from at_temporal_solver.core.dependencies import create_condition
+from at_temporal_solver.core.kb import get_kb_hash
+from at_temporal_solver.core.kb import load_kb
+from at_temporal_solver.core.signification import SignificationPlan
+from at_temporal_solver.evaluations.compiled import ExpressionCompiler
+
+logger = logging.getLogger(__name__)
+
+ARTIFACT_MAGIC = b"ATKB"
+ARTIFACT_VERSION = 2
+ARTIFACT_SUFFIX = ".atkb"
+ARTIFACT_HEADER = struct.Struct("<4sH32s")
+
+
+@dataclass(kw_only=True)
+class KBArtifacts:
+    """Parts of a temporal solver depending only on its knowledge base.
+
+    They are not changed by processing tacts, so solvers of the same knowledge base share them.
+    """
+
+    kb: KnowledgeBase
+    interval_conditions: List[Tuple[KBInterval, Condition, Condition]]
+    event_conditions: List[Tuple[KBEvent, Condition]]
+    compiler: Optional[ExpressionCompiler]
+    signification_plan: SignificationPlan
+    kb_hash: Optional[str] = None
+
+    @property
+    def conditions(self) -> List[Condition]:
+        return [condition for _, *conditions in self.interval_conditions for condition in conditions] + [
+            condition for _, condition in self.event_conditions
+        ]
+
+    @classmethod
+    def build(cls, kb: KnowledgeBase, compile_expressions: bool = True, kb_hash: str = None) -> "KBArtifacts":
+        wm = WorkingMemory(kb=kb)
+        artifacts = cls(
+            kb=kb,
+            interval_conditions=[
+                (
+                    interval,
+                    create_condition(f"{interval.id}.open", interval.open, wm),
+                    create_condition(f"{interval.id}.close", interval.close, wm),
+                )
+                for interval in kb.classes.intervals
+            ],
+            event_conditions=[
+                (event, create_condition(event.id, event.occurance_condition, wm)) for event in kb.classes.events
+            ],
+            compiler=ExpressionCompiler() if compile_expressions else None,
+            signification_plan=SignificationPlan.from_kb(kb),
+            kb_hash=kb_hash,
+        )
+        artifacts.compile()
+        return artifacts
+
+    def compile(self):
+        if self.compiler is not None:
+            for condition in self.conditions:
+                condition.compiled = self.compiler.compile(condition.expression)
+
+
+def save_artifacts(artifacts: KBArtifacts, path: Union[str, Path]):
+    """Writes artifacts precompiled from a knowledge base source to a file.
+
+    The file is a header with the format version and the knowledge base hash followed by the pickled
+    knowledge base, conditions and signification plan. Compiled closures are not stored, they are
+    compiled again on load.
+    """
+
+    if artifacts.kb_hash is None:
+        raise ValueError("Only artifacts of a knowledge base source can be saved")
+    state = {
+        "kb": artifacts.kb,
+        "interval_conditions": [
+            (interval, replace(open_condition, compiled=None), replace(close_condition, compiled=None))
+            for interval, open_condition, close_condition in artifacts.interval_conditions
+        ],
+        "event_conditions": [
+            (event, replace(condition, compiled=None)) for event, condition in artifacts.event_conditions
+        ],
+        "signification_plan": artifacts.signification_plan,
+    }
+    header = ARTIFACT_HEADER.pack(ARTIFACT_MAGIC, ARTIFACT_VERSION, bytes.fromhex(artifacts.kb_hash))
+    path = Path(path)
+    temporary_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(temporary_path, "wb") as f:
+        f.write(header)
+        pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temporary_path, path)
+
+
+def load_artifacts(path: Union[str, Path], compile_expressions: bool = True) -> KBArtifacts:
+    """Loads artifacts saved by ``save_artifacts``. Artifact files are unpickled, load only trusted ones."""
+
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        if data.size() < ARTIFACT_HEADER.size:
+            raise ValueError(f"{path} is not a knowledge base artifact")
+        magic, version, digest = ARTIFACT_HEADER.unpack(data.read(ARTIFACT_HEADER.size))
+        if magic != ARTIFACT_MAGIC:
+            raise ValueError(f"{path} is not a knowledge base artifact")
+        if version != ARTIFACT_VERSION:
+            raise ValueError(f"Unsupported knowledge base artifact version {version} of {path}")
+        state = pickle.load(data)
+    artifacts = KBArtifacts(
+        **state, compiler=ExpressionCompiler() if compile_expressions else None, kb_hash=digest.hex()
+    )
+    artifacts.compile()
+    return artifacts
+
+
+class KBCache:
+    """Knowledge base artifacts by the hash of the knowledge base source.
+
+    Sessions configured with the same knowledge base share its artifacts, so it is parsed and compiled
+    once. ``aget`` builds missing artifacts in an executor, concurrent requests of the same knowledge
+    base wait for a single build. ``preload`` fills the cache with precompiled artifact files. With
+    ``max_size`` set the least recently used artifacts are dropped, solvers created from them keep working.
+    """
+
+    artifacts: OrderedDict[str, KBArtifacts]
+    pending: Dict[str, asyncio.Future]
+
+    def __init__(self, compile_expressions: bool = True, max_size: int = None):
+        self.compile_expressions = compile_expressions
+        self.max_size = max_size
+        self.artifacts = OrderedDict()
+        self.pending = {}
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self.artifacts)
+
+    def __contains__(self, kb_hash: object) -> bool:
+        return kb_hash in self.artifacts
+
+    def lookup(self, kb_hash: str) -> Optional[KBArtifacts]:
+        with self._lock:
+            artifacts = self.artifacts.get(kb_hash)
+            if artifacts is not None:
+                self.artifacts.move_to_end(kb_hash)
+            return artifacts
+
+    def store(self, artifacts: KBArtifacts) -> KBArtifacts:
+        """Adds artifacts to the cache and returns the cached artifacts of their knowledge base."""
+
+        with self._lock:
+            cached = self.artifacts.setdefault(artifacts.kb_hash, artifacts)
+            self.artifacts.move_to_end(artifacts.kb_hash)
+            if self.max_size is not None:
+                while len(self.artifacts) > self.max_size:
+                    self.artifacts.popitem(last=False)
+            return cached
+
+    def build(self, kb_data: Union[KnowledgeBase, Element, dict, str], kb_hash: str = None) -> KBArtifacts:
+        artifacts = KBArtifacts.build(load_kb(kb_data), compile_expressions=self.compile_expressions, kb_hash=kb_hash)
+        return artifacts if kb_hash is None else self.store(artifacts)
+
+    def get(self, kb_data: Union[KnowledgeBase, Element, dict, str]) -> KBArtifacts:
+        """Returns cached artifacts of a knowledge base source building them on a miss.
+
+        Artifacts of a parsed ``KnowledgeBase`` are built for it and are not cached.
+        """
+
+        if isinstance(kb_data, KnowledgeBase):
+            return self.build(kb_data)
+        kb_hash = get_kb_hash(kb_data)
+        return self.lookup(kb_hash) or self.build(kb_data, kb_hash)
+
+    def preload(self, directory: Union[str, Path]) -> int:
+        """Loads artifact files of a directory saved by ``save_artifacts``, returns the number of loaded ones."""
+
+        loaded = 0
+        for path in sorted(Path(directory).glob(f"*{ARTIFACT_SUFFIX}")):
+            try:
+                self.store(load_artifacts(path, compile_expressions=self.compile_expressions))
+            except Exception:
+                logger.exception("Failed to preload knowledge base artifact %s", path)
+            else:
+                loaded += 1
+        return loaded
+
+    async def aget(self, kb_data: Union[KnowledgeBase, Element, dict, str], executor: Executor = None) -> KBArtifacts:
+        loop = asyncio.get_running_loop()
+        if isinstance(kb_data, KnowledgeBase):
+            return await loop.run_in_executor(executor, self.build, kb_data)
+        kb_hash = get_kb_hash(kb_data)
+        artifacts = self.lookup(kb_hash)
+        if artifacts is not None:
+            return artifacts
+        pending = self.pending.get(kb_hash)
+        if pending is None:
+            pending = self.pending[kb_hash] = loop.run_in_executor(executor, self.build, kb_data, kb_hash)
+            pending.add_done_callback(lambda _: self.pending.pop(kb_hash, None))
+        return await asyncio.shield(pending)
@@ -1,28 +1,297 @@
-from at_krl.core.kb_rule import KBRule
+from itertools import repeat
+from typing import Any
+from typing import AsyncIterable
+from typing import AsyncIterator
+from typing import Collection
+from typing import Dict
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Set
+from typing import Tuple
+from typing import Type
+from typing import Union
+
+from at_krl.core.kb_reference import KBReference
+from at_krl.core.kb_value import KBValue
 from at_krl.core.knowledge_base import KnowledgeBase
-from at_krl.core.simple.simple_evaluatable import SimpleEvaluatable
-from at_krl.core.simple.simple_operation import SimpleOperation
-from at_krl.core.temporal.allen_evaluatable import AllenEvaluatable
+from at_krl.core.non_factor import NonFactor
+from at_krl.core.temporal.allen_event import KBEvent
+from at_krl.core.temporal.allen_interval import KBInterval
 from at_solver.core.wm import WorkingMemory
 
+from at_temporal_solver.core.artifacts import KBArtifacts
+from at_temporal_solver.core.compact_timeline import CompactTimeline
+from at_temporal_solver.core.dependencies import Condition
+from at_temporal_solver.core.dependencies import ConditionCache
+from at_temporal_solver.core.dependencies import get_reference_path
+from at_temporal_solver.core.encoding import CompactResultEncoder
+from at_temporal_solver.core.encoding import encode_result
+from at_temporal_solver.core.results import TactResult
+from at_temporal_solver.core.results import TactResultEncoder
+from at_temporal_solver.core.signification import PlannedOperation
+from at_temporal_solver.core.signification import SignificationPlan
+from at_temporal_solver.core.timeline import IntervalInstance
 from at_temporal_solver.core.timeline import TactRecord
 from at_temporal_solver.core.timeline import Timeline
-from at_temporal_solver.evaluations.allen import AllenEvaluator
+from at_temporal_solver.evaluations.allen_batch import AllenBatchEvaluator
+from at_temporal_solver.evaluations.compiled import ExpressionCompiler
 from at_temporal_solver.evaluations.simple import SimpleEvaluator
 
+WM_VALUE_BYTES = 200
+
+TIMELINE_CLASSES = {
+    "default": Timeline,
+    "compact": CompactTimeline,
+}
+
+
+def is_same_value(value: KBValue, content: Any, belief: float, probability: float, accuracy: float) -> bool:
+    nf = value.non_factor
+    return (
+        type(value.content) is type(content)
+        and value.content == content
+        and nf.belief == belief
+        and nf.probability == probability
+        and nf.accuracy == accuracy
+    )
+
 
 class TemporalSolver:
-    wm: WorkingMemory
+    """Builds the timeline of a knowledge base events and intervals and signifies Allen operations in rules.
+
+    With ``incremental`` enabled results of interval and event conditions are cached and evaluated again
+    only when a working memory reference they read is changed. Changes are tracked by ``update_wm``
+    and ``set_value``, replacing ``wm`` invalidates all cached results. Values changed directly in
+    ``wm`` must be reported with ``mark_changed``.
+
+    With ``compile_expressions`` enabled conditions are compiled into closures once on creation
+    instead of being interpreted by ``SimpleEvaluator`` on every tact. Conditions, compiled expressions
+    and the signification plan depend only on the knowledge base, passing ``artifacts`` shares them
+    between solvers of the same knowledge base (see ``KBCache``).
+
+    In incremental mode Allen operations in rules are signified again only when an instance of an event
+    or interval they reference was created or closed at the tact, or when they compare a section of a
+    still opened interval. Values of other operations are reused from the previous tact.
+    """
+
+    _wm: WorkingMemory
     kb: KnowledgeBase
     timeline: Timeline
+    timeline_class: Type[Timeline]
+    retention: Optional[int]
     signified_meta: dict = None
+    sequence: int
+    closed_interval_instances: List[IntervalInstance]
+    result_encoder: TactResultEncoder
+    compact_encoder: CompactResultEncoder
+    incremental: bool
+    changed_refs: Optional[Set[str]]
+    interval_conditions: List[Tuple[KBInterval, Condition, Condition]]
+    event_conditions: List[Tuple[KBEvent, Condition]]
+    condition_cache: ConditionCache
+    compiler: Optional[ExpressionCompiler]
+    signification_plan: SignificationPlan
+    artifacts: KBArtifacts
+    touched_entities: Set[str]
+    signified_values: Dict[str, KBValue]
 
-    def __init__(self, kb: KnowledgeBase) -> None:
+    def __init__(
+        self,
+        kb: KnowledgeBase,
+        timeline_class: Type[Timeline] = Timeline,
+        retention: Optional[int] = None,
+        incremental: bool = False,
+        compile_expressions: bool = True,
+        artifacts: KBArtifacts = None,
+    ) -> None:
+        if artifacts is None:
+            artifacts = KBArtifacts.build(kb, compile_expressions=compile_expressions)
+        elif artifacts.kb is not kb:
+            raise ValueError("Artifacts are built for another knowledge base")
         self.wm = WorkingMemory(kb=kb)
         self.kb = kb
-        self.timeline = Timeline()
+        self.artifacts = artifacts
+        self.incremental = incremental
+        self.compiler = artifacts.compiler
+        self._ref_paths = {}
+        self.interval_conditions = artifacts.interval_conditions
+        self.event_conditions = artifacts.event_conditions
+        self.condition_cache = ConditionCache(conditions=artifacts.conditions)
+        self.signification_plan = artifacts.signification_plan
+        self.touched_entities = set()
+        self.signified_values = {}
+        self._signified_wm = None
+        self._signified_timeline = None
+        self.timeline_class = timeline_class
+        self.retention = retention
+        self.timeline = self.create_timeline()
         self.current_tact = None
         self.signified_meta = {}
+        self.sequence = 0
+        self.closed_interval_instances = []
+        self.result_encoder = TactResultEncoder()
+        self.compact_encoder = CompactResultEncoder()
+
+    @classmethod
+    def from_artifacts(cls, artifacts: KBArtifacts, **kwargs) -> "TemporalSolver":
+        return cls(artifacts.kb, artifacts=artifacts, **kwargs)
+
+    @property
+    def wm(self) -> WorkingMemory:
+        return self._wm
+
+    @wm.setter
+    def wm(self, wm: WorkingMemory):
+        self._wm = wm
+        self._wm_contents = {}
+        self._wm_values = {}
+        self.changed_refs = None
+
+    @property
+    def wm_contents(self) -> Dict[str, Any]:
+        """Contents of the working memory values set by ``update_wm`` and ``set_value`` by their reference paths."""
+
+        return self._wm_contents
+
+    def get_wm_items(self) -> List[Dict]:
+        """Returns working memory values as items of ``update_wm``, with non-factors of values set by it."""
+
+        items = []
+        for path, content in self._wm_contents.items():
+            item = {"ref": path, "value": content}
+            value = self._wm_values.get(path)
+            if value is not None:
+                nf = value.non_factor
+                item.update(belief=nf.belief, probability=nf.probability, accuracy=nf.accuracy)
+            items.append(item)
+        return items
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory used by the timeline and the working memory values."""
+
+        return self.timeline.nbytes + len(self._wm_contents) * WM_VALUE_BYTES
+
+    def get_ref_path(self, ref: str | KBReference) -> str:
+        if isinstance(ref, KBReference):
+            return get_reference_path(ref)
+        path = self._ref_paths.get(ref)
+        if path is None:
+            path = get_reference_path(KBReference.parse(ref))
+            self._ref_paths[ref] = path
+        return path
+
+    def mark_changed(self, refs: Iterable[str | KBReference] = None):
+        if refs is None:
+            self.changed_refs = None
+        elif self.changed_refs is not None:
+            self.changed_refs.update(self.get_ref_path(ref) for ref in refs)
+
+    def set_value(self, ref: str, value: Any | KBValue):
+        content = value.content if isinstance(value, KBValue) else value
+        path = self.get_ref_path(ref)
+        if path not in self._wm_contents or self._wm_contents[path] != content:
+            self.mark_changed([path])
+        self._wm_contents[path] = content
+        self._wm_values.pop(path, None)
+        self._wm.set_value(ref, value)
+
+    def update_wm(self, items: List[Dict], clear_before: bool = True) -> Set[str]:
+        return self.apply_wm_items(
+            (
+                (
+                    item["ref"],
+                    item["value"],
+                    item.get("belief", 50),
+                    item.get("probability", 100),
+                    item.get("accuracy", 0),
+                )
+                for item in items
+            ),
+            clear_before=clear_before,
+        )
+
+    def update_wm_columns(
+        self,
+        refs: Sequence[str],
+        values: Sequence[Any],
+        belief: Optional[Sequence[float]] = None,
+        probability: Optional[Sequence[float]] = None,
+        accuracy: Optional[Sequence[float]] = None,
+        clear_before: bool = True,
+    ) -> Set[str]:
+        """Updates the working memory from parallel sequences of references, values and non-factor parts.
+
+        Missing non-factor sequences are filled with the defaults of ``update_wm`` items.
+        """
+
+        if any(column is not None and len(column) != len(refs) for column in [values, belief, probability, accuracy]):
+            raise ValueError("Working memory columns must have the same length")
+        columns = [
+            column if column is not None else repeat(default)
+            for column, default in [(belief, 50), (probability, 100), (accuracy, 0)]
+        ]
+        return self.apply_wm_items(zip(refs, values, *columns), clear_before=clear_before)
+
+    def apply_wm_items(
+        self, items: Iterable[Tuple[str, Any, float, float, float]], clear_before: bool = True
+    ) -> Set[str]:
+        """Sets working memory values of ``(ref, value, belief, probability, accuracy)`` items.
+
+        Only values differing from the ones set by the previous update are set, values of other items are
+        kept in place. With ``clear_before`` values missing in the items are removed, the working memory is
+        then created again. Returns reference paths with changed values.
+        """
+
+        previous_contents = self._wm_contents
+        previous_values = self._wm_values
+        contents = {} if clear_before else previous_contents
+        values = {} if clear_before else previous_values
+        changed = set()
+        updates = []
+        kept = [] if clear_before else None
+        for ref, content, belief, probability, accuracy in items:
+            path = self.get_ref_path(ref)
+            value = previous_values.get(path)
+            if value is None or not is_same_value(value, content, belief, probability, accuracy):
+                nf = NonFactor(belief=belief, probability=probability, accuracy=accuracy)
+                value = KBValue(content=content, non_factor=nf)
+                updates.append((ref, value))
+            elif kept is not None:
+                kept.append((ref, value))
+            if path not in previous_contents or previous_contents[path] != content:
+                changed.add(path)
+            contents[path] = content
+            values[path] = value
+
+        if clear_before:
+            removed = [path for path in previous_contents if path not in contents]
+            if removed:
+                changed.update(removed)
+                self._wm = WorkingMemory(kb=self.kb)
+                updates.extend(kept)
+            self._wm_contents = contents
+            self._wm_values = values
+        for ref, value in updates:
+            self._wm.set_value(ref, value)
+        self.mark_changed(changed)
+        return changed
+
+    def create_timeline(self) -> Timeline:
+        """Creates an empty timeline keeping the instances the knowledge base references by negative indexes."""
+
+        return self.timeline_class(retention=self.retention, kept_instances=self.signification_plan.kept_instances)
+
+    def reset(self):
+        self.wm = WorkingMemory(kb=self.kb)
+        self.timeline = self.create_timeline()
+        self.current_tact = None
+        self.signified_meta = {}
+        self.closed_interval_instances = []
+        self.result_encoder.invalidate()
 
     def process_tact(self, as_new=True):
         if as_new:
@@ -30,43 +299,137 @@ class TemporalSolver:
                 self.current_tact = 0
             else:
                 self.current_tact += 1
-        self.signified_meta = {}
+        self.sequence += 1
+        if not self.incremental:
+            self.signified_meta = {}
         self.build_timeline_tact()
         self.signify_temporal_operations_in_rules()
 
+    def process_tacts(
+        self, batches: Iterable[List[Dict]], clear_before: bool = True, delta: bool = False, final_only: bool = False
+    ) -> List[dict]:
+        """Updates the working memory with each of ``batches`` and processes a tact after every update.
+
+        Returns the result of every tact, or only the full result of the last tact with ``final_only``,
+        as intermediate deltas are not encoded then.
+        """
+
+        results = []
+        for items in batches:
+            self.update_wm(items, clear_before=clear_before)
+            self.process_tact()
+            if not final_only:
+                results.append(self.get_result(delta=delta))
+        if final_only and self.current_tact is not None:
+            results.append(self.get_result())
+        return results
+
+    def run(self, stream: Iterable[List[Dict]], clear_before: bool = True) -> Iterator[TactResult]:
+        """Lazily processes a tact for each working memory update of ``stream`` and yields its result.
+
+        Results refer only to the processed tact, so with ``retention`` set the memory used does not
+        grow with the stream length.
+        """
+
+        for items in stream:
+            self.update_wm(items, clear_before=clear_before)
+            self.process_tact()
+            yield self.get_tact_result()
+
+    async def arun(
+        self, stream: Union[AsyncIterable[List[Dict]], Iterable[List[Dict]]], clear_before: bool = True
+    ) -> AsyncIterator[TactResult]:
+        """Same as ``run`` for an async iterable of working memory updates."""
+
+        if not isinstance(stream, AsyncIterable):
+            for result in self.run(stream, clear_before=clear_before):
+                yield result
+            return
+        async for items in stream:
+            self.update_wm(items, clear_before=clear_before)
+            self.process_tact()
+            yield self.get_tact_result()
+
+    def get_tact_result(self) -> TactResult:
+        return TactResult.from_solver(self)
+
     def build_timeline_tact(self) -> TactRecord:
         evaluator = SimpleEvaluator(self.wm)
-        for interval in self.kb.classes.intervals:
-            open_value = evaluator.eval(interval.open)
-            instance = self.timeline.get_interval_instance(interval)
-            if open_value.content:
+        self.closed_interval_instances = []
+        self.touched_entities = set()
+        if self.incremental:
+            self.condition_cache.invalidate(self.changed_refs)
+        else:
+            self.condition_cache.invalidate()
+
+        for interval, open_condition, close_condition in self.interval_conditions:
+            open_value = self.evaluate_condition(open_condition, evaluator)
+            instance = self.timeline.get_opened_interval(interval.id)
+            if open_value:
+                if instance is None:
+                    self.touched_entities.add(interval.id)
                 instance = self.timeline.open_interval_instance(self.current_tact, interval)
             if instance is not None and instance.open_tact != self.current_tact:
-                close_value = evaluator.eval(interval.close)
-                if close_value.content:
-                    self.timeline.close_interval_instance(self.current_tact, interval)
+                close_value = self.evaluate_condition(close_condition, evaluator)
+                if close_value:
+                    closed_instance = self.timeline.close_interval_instance(self.current_tact, interval)
+                    if closed_instance is not None:
+                        self.closed_interval_instances.append(closed_instance)
+                        self.touched_entities.add(interval.id)
 
-        for event in self.kb.classes.events:
-            occurance_value = evaluator.eval(event.occurance_condition)
-            if occurance_value.content:
+        for event, occurance_condition in self.event_conditions:
+            occurance_value = self.evaluate_condition(occurance_condition, evaluator)
+            if occurance_value:
                 self.timeline.create_event_instance(self.current_tact, event)
+                self.touched_entities.add(event.id)
+
+        self.changed_refs = set()
+        return self.timeline.get_or_create_tact_record(self.current_tact)
+
+    def evaluate_condition(self, condition: Condition, evaluator: SimpleEvaluator) -> Any:
+        values = self.condition_cache.values
+        if condition.key in values:
+            return values[condition.key]
+        if condition.compiled is not None:
+            content = condition.compiled(self._wm)
+        else:
+            content = evaluator.eval(condition.expression).content
+        if self.incremental:
+            self.condition_cache.store(condition, content)
+        return content
 
-        result = self.timeline._tacts.get(self.current_tact)
-        if result is None:
-            return self.timeline.get_or_create_tact_record(self.current_tact)
-        return result
+    def get_result(self, delta: bool = False, fields: Collection[str] = None, encoding: str = None) -> dict | bytes:
+        """Returns the result of the last tact, see ``TactResultEncoder`` for ``fields``.
+
+        With ``encoding`` set to ``msgpack`` the result is packed by the session ``CompactResultEncoder``.
+        """
+
+        return encode_result(self, self.result_encoder.encode(self, delta=delta, fields=fields), encoding)
 
     def signify_temporal_operations_in_rules(self):
-        for rule in self.kb.rules:
-            self.search_and_signify(rule.condition, rule=rule)
-
-    def search_and_signify(self, v: SimpleEvaluatable, rule: KBRule):
-        if isinstance(v, AllenEvaluatable):
-            allen_evaluator = AllenEvaluator(self)
-            res = allen_evaluator.eval(v)
-            self.wm.set_value("signifier." + v.xml_owner_path, res)
-            self.signified_meta[v.xml_owner_path] = {"rule": rule.id, "allen_operation": v.krl, "value": res.content}
-        elif isinstance(v, SimpleOperation):
-            self.search_and_signify(v.left, rule=rule)
-            if v.is_binary:
-                self.search_and_signify(v.right, rule=rule)
+        plan = self.signification_plan
+        full = not self.incremental or self._signified_timeline is not self.timeline
+        if full:
+            self.signified_values = {}
+            operations = plan.operations
+        else:
+            operations = plan.get_affected_operations(self.touched_entities, self.timeline.opened_intervals)
+
+        results = AllenBatchEvaluator(self).eval_all([planned.operation for planned in operations])
+        for planned, res in zip(operations, results):
+            self.signified_values[planned.key] = res
+            self.write_signified_value(planned, res)
+
+        if not full and self._signified_wm is not self._wm:
+            evaluated = {planned.key for planned in operations}
+            for planned in plan.operations:
+                if planned.key not in evaluated:
+                    self.write_signified_value(planned, self.signified_values[planned.key])
+
+        self._signified_wm = self._wm
+        self._signified_timeline = self.timeline
+
+    def write_signified_value(self, planned: PlannedOperation, res: KBValue):
+        for path, rule in planned.usages:
+            self._wm.set_value("signifier." + path, res)
+            self.signified_meta[path] = {"rule": rule.id, "allen_operation": planned.krl, "value": res.content}
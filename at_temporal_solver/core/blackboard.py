@@ -0,0 +1,145 @@
+from abc import ABC
+from abc import abstractmethod
+from dataclasses import dataclass
+from typing import Any
+from typing import Awaitable
+from typing import Callable
+from typing import Dict
+from typing import Hashable
+from typing import Iterable
+from typing import List
+from typing import TYPE_CHECKING
+from typing import TypeVar
+import asyncio
+
+if TYPE_CHECKING:
+    from at_queue.core.at_component import ATComponent
+
+T = TypeVar("T")
+
+
+@dataclass(kw_only=True)
+class BlackBoardChanges:
+    """Blackboard items changed since a cursor, all items when ``full`` is set."""
+
+    cursor: int
+    items: List[Dict[str, Any]]
+    full: bool = False
+
+
+class BlackBoard(ABC):
+    @abstractmethod
+    async def get_all_items(self, auth_token: str = None) -> List[Dict[str, Any]]:
+        pass
+
+    @abstractmethod
+    async def get_changed_items(self, cursor: int = None, auth_token: str = None) -> BlackBoardChanges:
+        """Returns items changed since ``cursor`` with the cursor of the returned state.
+
+        All items are returned with ``full`` set when ``cursor`` is not passed or is not valid anymore.
+        """
+
+
+class RemoteBlackBoard(BlackBoard):
+    """Blackboard component called through the broker."""
+
+    def __init__(self, component: "ATComponent", name: str = "ATBlackBoard"):
+        self.component = component
+        self.name = name
+
+    async def get_all_items(self, auth_token: str = None) -> List[Dict[str, Any]]:
+        return await self.component.exec_external_method(self.name, "get_all_items", {}, auth_token=auth_token)
+
+    async def get_changed_items(self, cursor: int = None, auth_token: str = None) -> BlackBoardChanges:
+        changes = await self.component.exec_external_method(
+            self.name, "get_changed_items", {"cursor": cursor}, auth_token=auth_token
+        )
+        return BlackBoardChanges(**changes)
+
+
+class InMemoryBlackBoard(BlackBoard):
+    """Blackboard keeping items in memory, each change increments its version.
+
+    Removing items invalidates all cursors given before, changes since them are then pulled in full.
+    """
+
+    items: Dict[str, Dict[str, Any]]
+    versions: Dict[str, int]
+
+    def __init__(self, items: Iterable[Dict[str, Any]] = ()):
+        self.items = {}
+        self.versions = {}
+        self.version = 0
+        self.valid_since = 0
+        self.set_items(items)
+
+    def set_items(self, items: Iterable[Dict[str, Any]]):
+        for item in items:
+            self.version += 1
+            self.items[item["ref"]] = item
+            self.versions.pop(item["ref"], None)
+            self.versions[item["ref"]] = self.version
+
+    def remove_items(self, refs: Iterable[str]):
+        for ref in refs:
+            self.items.pop(ref, None)
+            self.versions.pop(ref, None)
+        self.version += 1
+        self.valid_since = self.version
+
+    async def get_all_items(self, auth_token: str = None) -> List[Dict[str, Any]]:
+        return list(self.items.values())
+
+    async def get_changed_items(self, cursor: int = None, auth_token: str = None) -> BlackBoardChanges:
+        if cursor is None or not self.valid_since <= cursor <= self.version:
+            return BlackBoardChanges(cursor=self.version, items=list(self.items.values()), full=True)
+        changed = []
+        for ref, version in reversed(self.versions.items()):
+            if version <= cursor:
+                break
+            changed.append(self.items[ref])
+        return BlackBoardChanges(cursor=self.version, items=changed[::-1])
+
+
+class BlackBoardSync:
+    """Pulls working memory items of sessions from a blackboard by cursors of the last applied state.
+
+    A cursor is valid while the session working memory holds exactly the blackboard items pulled up to it,
+    so it is dropped by ``invalidate`` when the working memory is changed otherwise. Syncs of one session
+    are run one by one.
+    """
+
+    blackboard: BlackBoard
+    cursors: Dict[Hashable, int]
+    pending: Dict[Hashable, object]
+    locks: Dict[Hashable, asyncio.Lock]
+
+    def __init__(self, blackboard: BlackBoard):
+        self.blackboard = blackboard
+        self.cursors = {}
+        self.pending = {}
+        self.locks = {}
+
+    async def sync(
+        self, key: Hashable, apply: Callable[[BlackBoardChanges], Awaitable[T]], auth_token: str = None
+    ) -> T:
+        """Pulls changes since the session cursor and applies them, the cursor is kept only if ``apply`` succeeds."""
+
+        lock = self.locks.get(key)
+        if lock is None:
+            lock = self.locks[key] = asyncio.Lock()
+        async with lock:
+            marker = self.pending[key] = object()
+            changes = await self.blackboard.get_changed_items(self.cursors.pop(key, None), auth_token=auth_token)
+            result = await apply(changes)
+            if self.pending.pop(key, None) is marker:
+                self.cursors[key] = changes.cursor
+            return result
+
+    def invalidate(self, key: Hashable):
+        self.cursors.pop(key, None)
+        self.pending.pop(key, None)
+
+    def forget(self, key: Hashable):
+        self.invalidate(key)
+        self.locks.pop(key, None)
@@ -0,0 +1,427 @@
+from array import array
+from bisect import bisect_left
+from bisect import bisect_right
+from typing import Dict
+from typing import List
+from typing import Mapping
+from typing import Optional
+from typing import Union
+
+from at_krl.core.temporal.allen_event import KBEvent
+from at_krl.core.temporal.allen_interval import KBInterval
+from at_krl.core.temporal.allen_reference import AllenReference
+
+from at_temporal_solver.core.timeline import EventInstance
+from at_temporal_solver.core.timeline import get_entity_id
+from at_temporal_solver.core.timeline import get_instance_by_index
+from at_temporal_solver.core.timeline import IntervalInstance
+from at_temporal_solver.core.timeline import TactRecord
+from at_temporal_solver.core.timeline import Timeline
+
+NOT_CLOSED = -1
+EMPTY_ROWS = array("q")
+
+
+class EventInstanceView(EventInstance):
+    __slots__ = ("_timeline", "_row")
+
+    def __init__(self, timeline: "CompactTimeline", row: int):
+        self._timeline = timeline
+        self._row = row
+
+    @property
+    def event(self) -> KBEvent:
+        return self._timeline._events[self._timeline._event_entity[self._row]]
+
+    @property
+    def occurance_tact(self) -> int:
+        return self._timeline._event_tact[self._row]
+
+
+class IntervalInstanceView(IntervalInstance):
+    __slots__ = ("_timeline", "_row")
+
+    def __init__(self, timeline: "CompactTimeline", row: int):
+        self._timeline = timeline
+        self._row = row
+
+    @property
+    def interval(self) -> KBInterval:
+        return self._timeline._intervals[self._timeline._interval_entity[self._row]]
+
+    @property
+    def open_tact(self) -> int:
+        return self._timeline._interval_open[self._row]
+
+    @property
+    def close_tact(self) -> Optional[int]:
+        close_tact = self._timeline._interval_close[self._row]
+        return None if close_tact == NOT_CLOSED else close_tact
+
+    @close_tact.setter
+    def close_tact(self, value: Optional[int]):
+        self._timeline._set_close_tact(self._row, value)
+
+
+class CompactTimeline(Timeline):
+    """Timeline backend storing instances in typed columns instead of per-instance objects.
+
+    Entity ids are interned to small ints. Events are stored as (entity, occurance tact) rows and
+    intervals as (entity, open tact, close tact) rows, rows of each kind are appended in tact order.
+    Instances and tact records are returned as lightweight views over the columns.
+
+    With 64-bit tacts it takes 12 bytes per event instance and 20 bytes per interval instance plus
+    8 bytes per instance for the per-entity row index, and nothing per empty tact. A session with one
+    event and half an interval per tact takes about 35 bytes per tact against roughly 400 bytes for
+    the default ``Timeline``.
+
+    ``retention`` works as in ``Timeline``: compaction rebuilds the columns keeping only the rows of
+    the retained instances.
+    """
+
+    _events: List[KBEvent]
+    _event_numbers: Dict[str, int]
+    _event_rows: List[array]
+    _intervals: List[KBInterval]
+    _interval_numbers: Dict[str, int]
+    _interval_rows: List[array]
+    _event_entity: array
+    _event_tact: array
+    _interval_entity: array
+    _interval_open: array
+    _interval_close: array
+    _event_compacted: List[int]
+    _interval_compacted: List[int]
+    _opened_rows: Dict[int, int]
+    _kept_tacts: List[int]
+    _last_tact: Optional[int]
+    _horizon: int
+    retention: Optional[int]
+    kept_instances: int
+
+    def __init__(self, retention: Optional[int] = None, kept_instances: int = 1) -> None:
+        if retention is not None and retention < 1:
+            raise ValueError(f"Retention must be a positive number of tacts, but got {retention}")
+        if kept_instances < 1:
+            raise ValueError(f"Number of kept instances must be positive, but got {kept_instances}")
+        self.retention = retention
+        self.kept_instances = kept_instances
+        self._events = []
+        self._event_numbers = {}
+        self._event_rows = []
+        self._intervals = []
+        self._interval_numbers = {}
+        self._interval_rows = []
+        self._event_entity = array("i")
+        self._event_tact = array("q")
+        self._interval_entity = array("i")
+        self._interval_open = array("q")
+        self._interval_close = array("q")
+        self._event_compacted = []
+        self._interval_compacted = []
+        self._opened_rows = {}
+        self._kept_tacts = []
+        self._last_tact = None
+        self._horizon = 0
+
+    @staticmethod
+    def _intern(
+        entity: Union[KBEvent, KBInterval],
+        entities: List,
+        numbers: Dict[str, int],
+        rows: List[array],
+        compacted: List[int],
+    ) -> int:
+        number = numbers.get(entity.id)
+        if number is None:
+            number = len(entities)
+            entities.append(entity)
+            rows.append(array("q"))
+            compacted.append(0)
+            numbers[entity.id] = number
+        return number
+
+    def _event_rows_of(self, event: Union[str, AllenReference, EventInstance]) -> array:
+        number = self._event_numbers.get(get_entity_id(event))
+        return EMPTY_ROWS if number is None else self._event_rows[number]
+
+    def _interval_rows_of(self, interval: Union[AllenReference, KBInterval, IntervalInstance, str]) -> array:
+        number = self._interval_numbers.get(get_entity_id(interval))
+        return EMPTY_ROWS if number is None else self._interval_rows[number]
+
+    def _event_compacted_of(self, event: Union[str, AllenReference, EventInstance]) -> int:
+        number = self._event_numbers.get(get_entity_id(event))
+        return 0 if number is None else self._event_compacted[number]
+
+    def _interval_compacted_of(self, interval: Union[AllenReference, KBInterval, IntervalInstance, str]) -> int:
+        number = self._interval_numbers.get(get_entity_id(interval))
+        return 0 if number is None else self._interval_compacted[number]
+
+    def _set_close_tact(self, row: int, tact: Optional[int]):
+        number = self._interval_entity[row]
+        if tact is None:
+            self._interval_close[row] = NOT_CLOSED
+            self._opened_rows[number] = row
+        else:
+            self._interval_close[row] = tact
+            if self._opened_rows.get(number) == row:
+                del self._opened_rows[number]
+
+    @property
+    def nbytes(self) -> int:
+        columns = [
+            self._event_entity,
+            self._event_tact,
+            self._interval_entity,
+            self._interval_open,
+            self._interval_close,
+            *self._event_rows,
+            *self._interval_rows,
+        ]
+        return sum(column.itemsize * len(column) for column in columns)
+
+    @property
+    def tact_numbers(self):
+        if self._last_tact is None:
+            return []
+        return self._kept_tacts + list(range(self._horizon, self._last_tact + 1))
+
+    def get_or_create_tact_record(self, tact: int) -> TactRecord:
+        if self._last_tact is None:
+            if tact != 0:
+                raise ValueError("tact number must be equal to 0 when the set of tacts is empty")
+            self._last_tact = tact
+        elif tact > self._last_tact:
+            if tact - self._last_tact != 1:
+                raise ValueError(f"New tact is {tact} that differs from the last tact {self._last_tact} more then 1")
+            self._last_tact = tact
+            if self.retention is not None and tact - self._horizon >= 2 * self.retention:
+                self.compact()
+        elif tact < self._horizon and tact not in self._kept_tacts:
+            raise ValueError(f"Tact {tact} is already compacted")
+        return self.get_tact_record(tact)
+
+    def compact(self, horizon: Optional[int] = None):
+        if horizon is None:
+            if self.retention is None or self._last_tact is None:
+                return
+            horizon = self._last_tact - self.retention + 1
+        if horizon <= self._horizon:
+            return
+
+        event_rows = self._compact_rows(self._event_rows, self._event_compacted, self._event_tact, horizon)
+        interval_rows = self._compact_rows(self._interval_rows, self._interval_compacted, self._interval_open, horizon)
+
+        self._event_entity = array("i", (self._event_entity[row] for row in event_rows))
+        self._event_tact = array("q", (self._event_tact[row] for row in event_rows))
+        self._interval_entity = array("i", (self._interval_entity[row] for row in interval_rows))
+        self._interval_open = array("q", (self._interval_open[row] for row in interval_rows))
+        self._interval_close = array("q", (self._interval_close[row] for row in interval_rows))
+
+        event_numbers = {row: number for number, row in enumerate(event_rows)}
+        interval_numbers = {row: number for number, row in enumerate(interval_rows)}
+        self._event_rows = [array("q", (event_numbers[row] for row in rows)) for rows in self._event_rows]
+        self._interval_rows = [array("q", (interval_numbers[row] for row in rows)) for rows in self._interval_rows]
+        self._opened_rows = {number: interval_numbers[row] for number, row in self._opened_rows.items()}
+        self._kept_tacts = sorted(
+            {self._interval_open[row] for row in self._opened_rows.values() if self._interval_open[row] < horizon}
+        )
+        self._horizon = horizon
+
+    def _compact_rows(self, entity_rows: List[array], compacted: List[int], tacts: array, horizon: int) -> List[int]:
+        for number, rows in enumerate(entity_rows):
+            count = min(bisect_left(rows, horizon, key=tacts.__getitem__), len(rows) - self.kept_instances)
+            if count > 0:
+                entity_rows[number] = rows[count:]
+                compacted[number] += count
+        return sorted(row for rows in entity_rows for row in rows)
+
+    def get_tact_record(self, tact: int) -> Optional[TactRecord]:
+        if self._last_tact is None or tact > self._last_tact:
+            return None
+        if tact < self._horizon and tact not in self._kept_tacts:
+            return None
+        record = TactRecord(tact)
+        events_start = bisect_left(self._event_tact, tact)
+        events_end = bisect_right(self._event_tact, tact, lo=events_start)
+        record.event_instances = [EventInstanceView(self, row) for row in range(events_start, events_end)]
+        intervals_start = bisect_left(self._interval_open, tact)
+        intervals_end = bisect_right(self._interval_open, tact, lo=intervals_start)
+        record.opened_interval_instances = [
+            IntervalInstanceView(self, row) for row in range(intervals_start, intervals_end)
+        ]
+        return record
+
+    @property
+    def opened_intervals(self) -> Mapping[str, IntervalInstance]:
+        return {
+            self._intervals[number].id: IntervalInstanceView(self, row) for number, row in self._opened_rows.items()
+        }
+
+    def still_opened_intervals(self, last_tact: int = None) -> List[IntervalInstance]:
+        return [
+            IntervalInstanceView(self, row)
+            for row in self._opened_rows.values()
+            if last_tact is None or self._interval_open[row] <= last_tact
+        ]
+
+    @property
+    def sorted_tact_list(self) -> List[TactRecord]:
+        return [self.get_tact_record(tact) for tact in self.tact_numbers]
+
+    def interval_is_still_opened(self, interval: Union[IntervalInstance, KBInterval, str]) -> bool:
+        return self._interval_numbers.get(get_entity_id(interval)) in self._opened_rows
+
+    def get_opened_interval(self, interval: Union[IntervalInstance, KBInterval, str]) -> Optional[IntervalInstance]:
+        row = self._opened_rows.get(self._interval_numbers.get(get_entity_id(interval)))
+        return None if row is None else IntervalInstanceView(self, row)
+
+    def open_interval_instance(self, tact: int, interval: KBInterval) -> IntervalInstance:
+        number = self._intern(
+            interval, self._intervals, self._interval_numbers, self._interval_rows, self._interval_compacted
+        )
+        row = self._opened_rows.get(number)
+        if row is not None:
+            return IntervalInstanceView(self, row)
+        self.get_or_create_tact_record(tact)
+        rows = self._interval_rows[number]
+        if rows and self._interval_open[rows[-1]] == tact:
+            return IntervalInstanceView(self, rows[-1])
+        row = len(self._interval_entity)
+        self._interval_entity.append(number)
+        self._interval_open.append(tact)
+        self._interval_close.append(NOT_CLOSED)
+        rows.append(row)
+        self._opened_rows[number] = row
+        return IntervalInstanceView(self, row)
+
+    def close_interval_instance(
+        self, tact: int, interval: Union[IntervalInstance, KBInterval, str]
+    ) -> Optional[IntervalInstance]:
+        row = self._opened_rows.pop(self._interval_numbers.get(get_entity_id(interval)), None)
+        if row is None:
+            return None
+        self._interval_close[row] = tact
+        return IntervalInstanceView(self, row)
+
+    def create_event_instance(self, tact, event: KBEvent) -> EventInstance:
+        number = self._intern(event, self._events, self._event_numbers, self._event_rows, self._event_compacted)
+        self.get_or_create_tact_record(tact)
+        rows = self._event_rows[number]
+        if rows and self._event_tact[rows[-1]] == tact:
+            return EventInstanceView(self, rows[-1])
+        row = len(self._event_entity)
+        self._event_entity.append(number)
+        self._event_tact.append(tact)
+        rows.append(row)
+        return EventInstanceView(self, row)
+
+    def get_event_instance(self, event: Union[str, AllenReference, EventInstance], index=-1) -> Optional[EventInstance]:
+        row = get_instance_by_index(self._event_rows_of(event), index, compacted=self._event_compacted_of(event))
+        return None if row is None else EventInstanceView(self, row)
+
+    def get_interval_instance(
+        self, interval: Union[AllenReference, KBInterval, str], index=-1
+    ) -> Optional[IntervalInstance]:
+        row = get_instance_by_index(
+            self._interval_rows_of(interval), index, compacted=self._interval_compacted_of(interval)
+        )
+        return None if row is None else IntervalInstanceView(self, row)
+
+    def get_all_event_instances(self, event: Union[str, AllenReference, EventInstance]) -> List[EventInstance]:
+        return [EventInstanceView(self, row) for row in self._event_rows_of(event)]
+
+    def get_all_interval_instances(self, interval: Union[AllenReference, KBInterval, str]) -> List[IntervalInstance]:
+        return [IntervalInstanceView(self, row) for row in self._interval_rows_of(interval)]
+
+    def count_event_instances(self, event: Union[str, AllenReference, EventInstance]) -> int:
+        return len(self._event_rows_of(event)) + self._event_compacted_of(event)
+
+    def count_interval_instances(self, interval: Union[AllenReference, KBInterval, str]) -> int:
+        return len(self._interval_rows_of(interval)) + self._interval_compacted_of(interval)
+
+    def count_closed_interval_instances(self, interval: Union[AllenReference, KBInterval, str]) -> int:
+        count = self.count_interval_instances(interval)
+        if self.interval_is_still_opened(interval):
+            return count - 1
+        return count
+
+    @property
+    def event_ids(self) -> List[str]:
+        return [event.id for event in self._events]
+
+    @property
+    def interval_ids(self) -> List[str]:
+        return [interval.id for interval in self._intervals]
+
+    def _restore(self, state: dict, entities: Mapping[str, Union[KBEvent, KBInterval]]):
+        self._last_tact = state["last_tact"]
+        self._horizon = state["horizon"]
+        self._kept_tacts = [tact for tact, _, _ in state["tacts"] if tact < self._horizon]
+        record_order = {}
+        for tact, event_ids, interval_ids in state["tacts"]:
+            record_order.update({(event_id, tact): position for position, event_id in enumerate(event_ids)})
+            record_order.update({(interval_id, tact): position for position, interval_id in enumerate(interval_ids)})
+
+        event_rows = []
+        for event_id, tacts in state["events"].items():
+            number = self._intern(
+                entities[event_id], self._events, self._event_numbers, self._event_rows, self._event_compacted
+            )
+            self._event_compacted[number] = state["compacted_events"].get(event_id, 0)
+            event_rows.extend((tact, record_order.get((event_id, tact), -1), number) for tact in tacts)
+        for tact, _, number in sorted(event_rows, key=lambda row: row[:2]):
+            self._event_rows[number].append(len(self._event_entity))
+            self._event_entity.append(number)
+            self._event_tact.append(tact)
+
+        interval_rows = []
+        for interval_id, bounds in state["intervals"].items():
+            number = self._intern(
+                entities[interval_id],
+                self._intervals,
+                self._interval_numbers,
+                self._interval_rows,
+                self._interval_compacted,
+            )
+            self._interval_compacted[number] = state["compacted_intervals"].get(interval_id, 0)
+            interval_rows.extend(
+                (open_tact, record_order.get((interval_id, open_tact), -1), number, close_tact)
+                for open_tact, close_tact in bounds
+            )
+        for open_tact, _, number, close_tact in sorted(interval_rows, key=lambda row: row[:2]):
+            row = len(self._interval_entity)
+            self._interval_rows[number].append(row)
+            self._interval_entity.append(number)
+            self._interval_open.append(open_tact)
+            self._interval_close.append(NOT_CLOSED if close_tact is None else close_tact)
+            if close_tact is None:
+                self._opened_rows[number] = row
+
+    @property
+    def __dict__(self):
+        tacts = []
+        event_row = 0
+        interval_row = 0
+        for tact in self.tact_numbers:
+            while interval_row < len(self._interval_open) and self._interval_open[interval_row] < tact:
+                interval_row += 1
+            while event_row < len(self._event_tact) and self._event_tact[event_row] < tact:
+                event_row += 1
+            opened_intervals = []
+            while interval_row < len(self._interval_open) and self._interval_open[interval_row] == tact:
+                close_tact = self._interval_close[interval_row]
+                opened_intervals.append(
+                    {
+                        "interval": self._intervals[self._interval_entity[interval_row]].id,
+                        "open_tact": tact,
+                        "close_tact": None if close_tact == NOT_CLOSED else close_tact,
+                    }
+                )
+                interval_row += 1
+            events = []
+            while event_row < len(self._event_tact) and self._event_tact[event_row] == tact:
+                events.append({"event": self._events[self._event_entity[event_row]].id, "occurance_tact": tact})
+                event_row += 1
+            tacts.append({"tact": tact, "opened_intervals": opened_intervals, "events": events})
+        return {"tacts": tacts}
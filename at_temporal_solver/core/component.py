@@ -1,26 +1,43 @@
+from dataclasses import asdict
 from typing import Any
 from typing import Coroutine
 from typing import Dict
 from typing import List
 from typing import Optional
+from typing import Type
 from typing import TypedDict
 from typing import Union
 from uuid import UUID
 from xml.etree.ElementTree import Element
+import asyncio
+import base64
 import inspect
+import logging
 
 from aio_pika import IncomingMessage
 from at_config.core.at_config_handler import ATComponentConfig
-from at_krl.core.kb_value import KBValue
 from at_krl.core.knowledge_base import KnowledgeBase
-from at_krl.core.non_factor import NonFactor
 from at_queue.core.at_component import ATComponent
 from at_queue.core.session import ConnectionParameters
 from at_queue.utils.decorators import authorized_method
-from at_solver.core.wm import WorkingMemory
 
 from at_temporal_solver.core.at_temporal_solver import TemporalSolver
+from at_temporal_solver.core.blackboard import BlackBoard
+from at_temporal_solver.core.blackboard import BlackBoardChanges
+from at_temporal_solver.core.blackboard import BlackBoardSync
+from at_temporal_solver.core.blackboard import RemoteBlackBoard
+from at_temporal_solver.core.sessions import EvictionMetrics
+from at_temporal_solver.core.sessions import EvictionPolicy
+from at_temporal_solver.core.sessions import SessionStore
 from at_temporal_solver.core.timeline import Timeline
+from at_temporal_solver.core.workers import create_executor
+from at_temporal_solver.core.workers import KBData
+from at_temporal_solver.core.workers import SolverExecutor
+from at_temporal_solver.core.workers import SolverOptions
+
+logger = logging.getLogger(__name__)
+
+WM_CHANGING_CALLS = {"reset", "update_wm", "update_wm_columns", "update_and_process_tact", "process_tacts"}
 
 
 class WMItemDict(TypedDict):
@@ -53,18 +70,119 @@ class TimelineDict(TypedDict):
 
 
 class ProcessTactResultDict(TypedDict):
+    sequence: int
+    delta: bool
     wm: Dict[str, Union[int, float, str, bool, None]]
     timeline: TimelineDict
+    signified: Dict[str, Union[int, float, str, bool, None]]
+    signified_meta: Dict[str, Dict]
+
+
+class ProcessTactDeltaDict(TypedDict):
+    sequence: int
+    delta: bool
+    tact: Optional[TactRecordDict]
+    closed_intervals: List[OpenedIntervalDict]
+    wm: Dict[str, Union[int, float, str, bool, None]]
+    signified: Dict[str, Union[int, float, str, bool, None]]
+    signified_meta: Dict[str, Dict]
+
+
+def get_message_result(result: Union[dict, bytes]) -> Union[dict, str]:
+    """Binary results are sent as base64 text, messages of the queue are JSON."""
+
+    if isinstance(result, bytes):
+        return base64.b64encode(result).decode("ascii")
+    return result
 
 
 class ATTemporalSolver(ATComponent):
-    temporal_solvers: Dict[str, TemporalSolver]
+    temporal_solvers: SessionStore
+    timeline_class: Type[Timeline]
+    retention: Optional[int]
+    incremental: bool
+    executor: SolverExecutor
+    sweep_interval: Optional[float]
+    eviction_metrics: EvictionMetrics
+    bb_sync: BlackBoardSync
 
-    def __init__(self, connection_parameters: ConnectionParameters, *args, **kwargs):
+    def __init__(
+        self,
+        connection_parameters: ConnectionParameters,
+        *args,
+        timeline_class: Type[Timeline] = Timeline,
+        retention: Optional[int] = None,
+        incremental: bool = True,
+        executor: str = "inline",
+        workers: Optional[int] = None,
+        eviction: Optional[EvictionPolicy] = None,
+        sweep_interval: Optional[float] = 60,
+        hibernation_dir: Optional[str] = None,
+        preload_dir: Optional[str] = None,
+        blackboard: Optional[BlackBoard] = None,
+        **kwargs,
+    ):
         super().__init__(connection_parameters, *args, **kwargs)
-        self.temporal_solvers = {}
+        self.timeline_class = timeline_class
+        self.retention = retention
+        self.incremental = incremental
+        self.executor = create_executor(
+            executor,
+            SolverOptions(
+                timeline_class=timeline_class,
+                retention=retention,
+                incremental=incremental,
+                eviction=eviction or EvictionPolicy(),
+                hibernation_dir=hibernation_dir,
+                preload_dir=preload_dir,
+            ),
+            workers=workers,
+        )
+        self.temporal_solvers = self.executor.solvers
+        self.sweep_interval = sweep_interval
+        self.eviction_metrics = EvictionMetrics()
+        self.bb_sync = BlackBoardSync(blackboard or RemoteBlackBoard(self))
+
+    async def start(self, *args, **kwargs):
+        sweeper = None
+        if self.sweep_interval and self.executor.options.eviction.enabled:
+            sweeper = asyncio.create_task(self.run_sweeper())
+        try:
+            return await super().start(*args, **kwargs)
+        finally:
+            if sweeper is not None:
+                sweeper.cancel()
+
+    async def run_sweeper(self):
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            try:
+                await self.sweep_sessions()
+            except Exception:
+                logger.exception("Failed to sweep temporal solver sessions")
+
+    async def sweep_sessions(self) -> List[str | int]:
+        evicted, self.eviction_metrics = await self.executor.sweep()
+        if self.executor.hibernation is None:
+            for key in evicted:
+                self.bb_sync.forget(key)
+        return evicted
+
+    def forget_evicted(self):
+        """Forgets blackboard cursors of sessions evicted over the session limit and not hibernated."""
+
+        for key in self.executor.take_evicted():
+            if not self.executor.has_session(key):
+                self.bb_sync.forget(key)
+
+    def get_metrics(self) -> Dict[str, int]:
+        return asdict(self.eviction_metrics)
 
     async def get_kb_from_config(self, config: ATComponentConfig) -> KnowledgeBase:
+        artifacts = await self.executor.kb_cache.aget(await self.get_kb_data_from_config(config))
+        return artifacts.kb
+
+    async def get_kb_data_from_config(self, config: ATComponentConfig) -> KBData:
         kb_item = config.items.get("kb")
         if kb_item is None:
             kb_item = config.items.get("knowledge_base")
@@ -75,32 +193,26 @@ class ATTemporalSolver(ATComponent):
         kb_data = kb_item.data
         if inspect.iscoroutine(kb_data):
             kb_data = await kb_data
-        if isinstance(kb_data, Element):
-            return KnowledgeBase.from_xml(kb_data)
-        elif isinstance(kb_data, dict):
-            return KnowledgeBase.from_json(kb_data)
-        elif isinstance(kb_data, str):
-            return KnowledgeBase.from_krl(kb_data)
-        else:
+        if not isinstance(kb_data, (Element, dict, str)):
             raise TypeError("Not valid type of knowledge base configuration")
+        return kb_data
 
     async def perform_configurate(
         self, config: ATComponentConfig, auth_token: str = None, *args, **kwargs
     ) -> Coroutine[Any, Any, bool]:
-        kb = await self.get_kb_from_config(config)
-        return await self.create_temporal_solver(kb, auth_token=auth_token)
+        kb_data = await self.get_kb_data_from_config(config)
+        return await self.create_temporal_solver(kb_data, auth_token=auth_token)
 
-    async def create_temporal_solver(self, kb: KnowledgeBase, auth_token: str = None) -> bool:
+    async def create_temporal_solver(self, kb: KnowledgeBase | KBData, auth_token: str = None) -> bool:
         auth_token = auth_token or "default"
 
-        knowledge_base = kb
         # knowledge_base.validate()
-        solver = TemporalSolver(knowledge_base)
-
-        auth_token_or_user_id = await self.get_user_id_or_token(auth_token, raize_on_failed=False)
-        self.temporal_solvers[auth_token_or_user_id] = solver
-
-        return True
+        key = await self.get_session_key(auth_token)
+        self.bb_sync.invalidate(key)
+        try:
+            return await self.executor.create(key, kb)
+        finally:
+            self.forget_evicted()
 
     async def check_configured(
         self,
@@ -111,64 +223,146 @@ class ATTemporalSolver(ATComponent):
         reciever: str,
         msg: IncomingMessage,
         auth_token: str = None,
-        **kwargs
+        **kwargs,
     ) -> bool:
         auth_token_or_user_id = await self.get_user_id_or_token(auth_token, raize_on_failed=False)
         return self.has_temporal_solver(auth_token_or_user_id=auth_token_or_user_id)
 
     def has_temporal_solver(self, auth_token_or_user_id: str | int) -> bool:
-        try:
-            self.get_solver(auth_token_or_user_id)
-            return True
-        except ValueError:
-            return False
+        return self.executor.has_session(auth_token_or_user_id or "default")
 
     def get_solver(self, auth_token_or_user_id: str | int) -> TemporalSolver:
-        auth_token_or_user_id = auth_token_or_user_id or "default"
-        solver = self.temporal_solvers.get(auth_token_or_user_id)
-        if solver is None:
-            raise ValueError("Temporal solver for provided token or user id is not created")
-        return solver
+        return self.executor.get_solver(auth_token_or_user_id or "default")
+
+    async def get_session_key(self, auth_token: str) -> str | int:
+        auth_token_or_user_id = await self.get_user_id_or_token(auth_token, raize_on_failed=False)
+        return auth_token_or_user_id or "default"
+
+    async def call_solver(self, auth_token: str, name: str, *args, **kwargs) -> Any:
+        key = await self.get_session_key(auth_token)
+        if name in WM_CHANGING_CALLS:
+            self.bb_sync.invalidate(key)
+        try:
+            return await self.executor.call(key, name, *args, **kwargs)
+        finally:
+            self.forget_evicted()
+
+    async def sync_solver_with_bb(self, auth_token: str, name: str, clear_before: bool = True, **kwargs) -> Any:
+        """Calls a session call with blackboard items changed since the last sync as its first argument.
+
+        The working memory is cleared before only when all blackboard items are pulled.
+        """
+
+        key = await self.get_session_key(auth_token)
+
+        async def apply(changes: BlackBoardChanges) -> Any:
+            try:
+                return await self.executor.call(
+                    key, name, changes.items, clear_before=clear_before and changes.full, **kwargs
+                )
+            finally:
+                self.forget_evicted()
+
+        return await self.bb_sync.sync(key, apply, auth_token=auth_token)
 
     @authorized_method
     async def reset(self, auth_token: str = None) -> bool:
-        auth_token_or_user_id = await self.get_user_id_or_token(auth_token, raize_on_failed=False)
-        solver = self.get_solver(auth_token_or_user_id=auth_token_or_user_id)
-        solver.wm = WorkingMemory(kb=solver.kb)
-        solver.timeline = Timeline()
-        solver.current_tact = None
-        return True
+        return await self.call_solver(auth_token, "reset")
 
     @authorized_method
     async def update_wm(self, items: List[WMItemDict], clear_before: bool = True, auth_token: str = None) -> bool:
-        auth_token_or_user_id = await self.get_user_id_or_token(auth_token, raize_on_failed=False)
-        solver = self.get_solver(auth_token_or_user_id=auth_token_or_user_id)
-        if clear_before:
-            solver.wm = WorkingMemory(solver.kb)
-        for item in items:
-            nf = NonFactor(
-                belief=item.get("belief", 50),
-                probability=item.get("probability", 100),
-                accuracy=item.get("accuracy", 0),
-            )
-            v = KBValue(content=item["value"], non_factor=nf)
-            solver.wm.set_value(item["ref"], v)
-
-        return True
+        return await self.call_solver(auth_token, "update_wm", items, clear_before=clear_before)
 
     @authorized_method
-    async def update_wm_from_bb(self, clear_before: bool = True, auth_token: str = None) -> bool:
-        items = await self.exec_external_method("ATBlackBoard", "get_all_items", {}, auth_token=auth_token)
+    async def update_wm_columns(
+        self,
+        refs: List[str],
+        values: List[Union[str, int, float, bool, None]],
+        belief: Optional[List[Union[int, float]]] = None,
+        probability: Optional[List[Union[int, float]]] = None,
+        accuracy: Optional[List[Union[int, float]]] = None,
+        clear_before: bool = True,
+        auth_token: str = None,
+    ) -> List[str]:
+        return await self.call_solver(
+            auth_token,
+            "update_wm_columns",
+            refs,
+            values,
+            belief=belief,
+            probability=probability,
+            accuracy=accuracy,
+            clear_before=clear_before,
+        )
+
+    @authorized_method
+    async def update_wm_from_bb(
+        self, clear_before: bool = True, incremental: bool = False, auth_token: str = None
+    ) -> bool:
+        if incremental:
+            return await self.sync_solver_with_bb(auth_token, "update_wm", clear_before=clear_before)
+        items = await self.bb_sync.blackboard.get_all_items(auth_token=auth_token)
         return await self.update_wm(items=items, clear_before=clear_before, auth_token=auth_token)
 
     @authorized_method
-    async def process_tact(self, auth_token: str) -> ProcessTactResultDict:
-        auth_token_or_user_id = await self.get_user_id_or_token(auth_token, raize_on_failed=False)
-        solver = self.get_solver(auth_token_or_user_id=auth_token_or_user_id)
-        solver.process_tact()
-        return {
-            "wm": solver.wm.all_values_dict,
-            "timeline": solver.timeline.__dict__,
-            "signified": {key: value.content for key, value in solver.wm.locals.items()},
-            "signified_meta": solver.signified_meta,
-        }
+    async def process_tact(
+        self,
+        delta: bool = False,
+        fields: Optional[List[str]] = None,
+        encoding: Optional[str] = None,
+        auth_token: str = None,
+    ) -> Union[ProcessTactResultDict, ProcessTactDeltaDict, str]:
+        """Processes a tact and returns its result.
+
+        ``fields`` project the result to the given keys. With ``encoding`` set to ``msgpack`` the result
+        is packed with strings interned by the session symbol table and sent as base64 text.
+        """
+
+        result = await self.call_solver(auth_token, "process_tact", delta=delta, fields=fields, encoding=encoding)
+        return get_message_result(result)
+
+    @authorized_method
+    async def update_and_process_tact(
+        self,
+        items: Optional[List[WMItemDict]] = None,
+        clear_before: bool = True,
+        delta: bool = False,
+        incremental: bool = False,
+        fields: Optional[List[str]] = None,
+        encoding: Optional[str] = None,
+        auth_token: str = None,
+    ) -> Union[ProcessTactResultDict, ProcessTactDeltaDict, str]:
+        """Updates the working memory and processes a tact in one session call.
+
+        Blackboard items are used when ``items`` are not passed, with ``incremental`` set only items
+        changed since the last sync are pulled. Calls of other clients to the session can not get in
+        between the update and the tact. ``fields`` and ``encoding`` are the same as of ``process_tact``.
+        """
+
+        kwargs = dict(clear_before=clear_before, delta=delta, fields=fields, encoding=encoding)
+        if items is None and incremental:
+            result = await self.sync_solver_with_bb(auth_token, "update_and_process_tact", **kwargs)
+        else:
+            if items is None:
+                items = await self.bb_sync.blackboard.get_all_items(auth_token=auth_token)
+            result = await self.call_solver(auth_token, "update_and_process_tact", items, **kwargs)
+        return get_message_result(result)
+
+    @authorized_method
+    async def process_tacts(
+        self,
+        batches: List[List[WMItemDict]],
+        clear_before: bool = True,
+        delta: bool = False,
+        final_only: bool = False,
+        auth_token: str = None,
+    ) -> List[Union[ProcessTactResultDict, ProcessTactDeltaDict]]:
+        return await self.call_solver(
+            auth_token, "process_tacts", batches, clear_before=clear_before, delta=delta, final_only=final_only
+        )
+
+    @authorized_method
+    async def get_state(
+        self, fields: Optional[List[str]] = None, encoding: Optional[str] = None, auth_token: str = None
+    ) -> Union[ProcessTactResultDict, str]:
+        return get_message_result(await self.call_solver(auth_token, "get_state", fields=fields, encoding=encoding))
@@ -0,0 +1,103 @@
+from dataclasses import dataclass
+from dataclasses import field
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import FrozenSet
+from typing import Iterable
+from typing import List
+from typing import Optional
+from typing import Set
+from typing import TYPE_CHECKING
+
+from at_krl.core.kb_reference import KBReference
+from at_krl.core.kb_value import KBValue
+from at_krl.core.simple.simple_evaluatable import SimpleEvaluatable
+from at_krl.core.simple.simple_operation import SimpleOperation
+from at_krl.core.simple.simple_reference import SimpleReference
+from at_krl.core.simple.simple_value import SimpleValue
+from at_krl.core.temporal.allen_evaluatable import AllenEvaluatable
+
+if TYPE_CHECKING:
+    from at_solver.core.wm import WorkingMemory
+
+
+def get_reference_path(ref: KBReference) -> str:
+    ids = []
+    while ref is not None:
+        ids.append(ref.id)
+        ref = ref.ref
+    return ".".join(ids)
+
+
+def collect_references(v: SimpleEvaluatable, wm: "WorkingMemory") -> Optional[Set[str]]:
+    """Returns paths of working memory references the expression reads.
+
+    ``None`` is returned when the expression result can change without any working memory value
+    change, e.g. when it contains Allen operations or reads values not stored in the working memory.
+    """
+
+    if v is None or isinstance(v, (SimpleValue, KBValue)):
+        return set()
+    elif isinstance(v, AllenEvaluatable):
+        return None
+    elif isinstance(v, SimpleReference):
+        if not wm.ref_is_accessible(v):
+            return None
+        return {get_reference_path(v)}
+    elif isinstance(v, SimpleOperation):
+        left = collect_references(v.left, wm)
+        if left is None:
+            return None
+        if v.is_binary:
+            right = collect_references(v.right, wm)
+            if right is None:
+                return None
+            left |= right
+        return left
+    return None
+
+
+@dataclass(kw_only=True)
+class Condition:
+    key: str
+    expression: SimpleEvaluatable
+    references: Optional[FrozenSet[str]] = None
+    compiled: Optional[Callable] = None
+
+    @property
+    def volatile(self) -> bool:
+        return self.references is None
+
+
+@dataclass(kw_only=True)
+class ConditionCache:
+    """Results of conditions cached until a working memory reference they read is changed."""
+
+    conditions: List[Condition]
+    dependents: Dict[str, List[str]] = field(default_factory=dict)
+    values: Dict[str, Any] = field(default_factory=dict)
+
+    def __post_init__(self):
+        for condition in self.conditions:
+            for reference in condition.references or ():
+                self.dependents.setdefault(reference, []).append(condition.key)
+
+    def invalidate(self, changed_refs: Optional[Iterable[str]] = None):
+        if changed_refs is None:
+            self.values.clear()
+            return
+        for reference in changed_refs:
+            for key in self.dependents.get(reference, ()):
+                self.values.pop(key, None)
+
+    def store(self, condition: Condition, value: Any):
+        if not condition.volatile:
+            self.values[condition.key] = value
+
+
+def create_condition(key: str, expression: SimpleEvaluatable, wm: "WorkingMemory") -> Condition:
+    references = collect_references(expression, wm)
+    if references is not None:
+        references = frozenset(references)
+    return Condition(key=key, expression=expression, references=references)
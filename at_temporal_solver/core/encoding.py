@@ -0,0 +1,135 @@
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Tuple
+from typing import TYPE_CHECKING
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - msgpack is optional
+    msgpack = None
+
+if TYPE_CHECKING:
+    from at_temporal_solver.core.at_temporal_solver import TemporalSolver
+
+ENCODINGS = ["json", "msgpack"]
+
+
+def require_msgpack():
+    if msgpack is None:
+        raise ImportError(
+            "The msgpack result encoding requires the msgpack package, install at-temporal-solver[msgpack]"
+        )
+
+
+class SymbolTable:
+    """Numbers of strings sent to a client, strings added since the last message are sent with it."""
+
+    ids: Dict[str, int]
+    added: List[str]
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.ids = {}
+        self.added = []
+        self.cleared = True
+
+    def intern(self, symbol: str) -> int:
+        number = self.ids.get(symbol)
+        if number is None:
+            number = self.ids[symbol] = len(self.ids)
+            self.added.append(symbol)
+        return number
+
+    def take(self) -> Tuple[bool, List[str]]:
+        """Returns whether the client must clear its table and the strings to append to it."""
+
+        cleared, added = self.cleared, self.added
+        self.cleared = False
+        self.added = []
+        return cleared, added
+
+
+class CompactResultEncoder:
+    """Encodes ``process_tact`` results of a session to msgpack with interned strings.
+
+    Working memory references, signified paths, rules, Allen operations and event and interval ids are
+    replaced by numbers of the session symbol table. Each message carries ``symbols`` added since the
+    previous one, a client appends them to its table in order and clears the table first when ``reset``
+    is set. Full results always reset the table, so a client resyncing with a full result rebuilds it.
+    """
+
+    symbols: SymbolTable
+
+    def __init__(self):
+        self.symbols = SymbolTable()
+
+    def encode(self, result: dict) -> bytes:
+        require_msgpack()
+        return msgpack.packb(self.compact(result), use_bin_type=True, default=get_plain_value)
+
+    def compact(self, result: dict) -> dict:
+        if not result.get("delta"):
+            self.symbols.reset()
+        intern = self.symbols.intern
+        compact = {}
+        for key, value in result.items():
+            if key in ("wm", "signified"):
+                value = {intern(path): content for path, content in value.items()}
+            elif key == "signified_meta":
+                value = {
+                    intern(path): [intern(meta["rule"]), intern(meta["allen_operation"]), meta["value"]]
+                    for path, meta in value.items()
+                }
+            elif key == "tact" and value is not None:
+                value = [
+                    value["tact"],
+                    [intern(item["event"]) for item in value["events"]],
+                    [
+                        [intern(item["interval"]), item["open_tact"], item["close_tact"]]
+                        for item in value["opened_intervals"]
+                    ],
+                ]
+            elif key == "closed_intervals":
+                value = [[intern(item["interval"]), item["open_tact"], item["close_tact"]] for item in value]
+            elif key == "timeline":
+                value = self.compact_timeline(value)
+            compact[key] = value
+        compact["reset"], compact["symbols"] = self.symbols.take()
+        return compact
+
+    def compact_timeline(self, state: dict) -> dict:
+        intern = self.symbols.intern
+        return {
+            **state,
+            "events": {intern(event_id): tacts for event_id, tacts in state["events"].items()},
+            "intervals": {intern(interval_id): bounds for interval_id, bounds in state["intervals"].items()},
+            "compacted_events": {intern(event_id): count for event_id, count in state["compacted_events"].items()},
+            "compacted_intervals": {
+                intern(interval_id): count for interval_id, count in state["compacted_intervals"].items()
+            },
+            "tacts": [
+                [tact, [intern(event_id) for event_id in events], [intern(interval_id) for interval_id in intervals]]
+                for tact, events, intervals in state["tacts"]
+            ],
+        }
+
+
+def encode_result(solver: "TemporalSolver", result: dict, encoding: str = None) -> Any:
+    if encoding is None or encoding == "json":
+        return result
+    elif encoding == "msgpack":
+        if "timeline" in result:
+            result = dict(result, timeline=solver.timeline.to_state())
+        return solver.compact_encoder.encode(result)
+    raise ValueError(f"Unknown result encoding: {encoding}")
+
+
+def get_plain_value(obj: Any) -> Any:
+    """Returns contents of KB values left in results, other objects are packed as strings."""
+
+    if hasattr(obj, "content"):
+        return obj.content
+    return str(obj)
@@ -0,0 +1,138 @@
+from pathlib import Path
+from typing import Hashable
+from typing import Optional
+from typing import Tuple
+from typing import Type
+from typing import Union
+from xml.etree.ElementTree import Element
+import gzip
+import hashlib
+import json
+import os
+
+from at_krl.core.knowledge_base import KnowledgeBase
+
+from at_temporal_solver.core.artifacts import KBArtifacts
+from at_temporal_solver.core.artifacts import KBCache
+from at_temporal_solver.core.at_temporal_solver import TemporalSolver
+from at_temporal_solver.core.at_temporal_solver import TIMELINE_CLASSES
+from at_temporal_solver.core.kb import get_kb_source
+from at_temporal_solver.core.kb import read_kb_file
+from at_temporal_solver.core.timeline import Timeline
+
+SNAPSHOT_VERSION = 1
+
+
+def get_timeline_name(timeline_class: Type[Timeline]) -> str:
+    for name, cls in TIMELINE_CLASSES.items():
+        if cls is timeline_class:
+            return name
+    raise ValueError(f"Timeline class {timeline_class.__name__} is not registered in TIMELINE_CLASSES")
+
+
+def snapshot_solver(solver: TemporalSolver, kb_hash: str) -> dict:
+    """Returns the state of a temporal solver needed to continue processing tacts.
+
+    Working memory values are kept with their non-factors and signified values are evaluated again
+    on restore.
+    """
+
+    return {
+        "version": SNAPSHOT_VERSION,
+        "kb": kb_hash,
+        "timeline_class": get_timeline_name(solver.timeline_class),
+        "current_tact": solver.current_tact,
+        "sequence": solver.sequence,
+        "wm": solver.get_wm_items(),
+        "timeline": solver.timeline.to_state(),
+    }
+
+
+def restore_solver(snapshot: dict, kb: Union[KnowledgeBase, KBArtifacts], incremental: bool = True) -> TemporalSolver:
+    if snapshot.get("version") != SNAPSHOT_VERSION:
+        raise ValueError(f"Unsupported temporal solver snapshot version {snapshot.get('version')}")
+    artifacts = kb if isinstance(kb, KBArtifacts) else KBArtifacts.build(kb)
+    kb = artifacts.kb
+    timeline_class = TIMELINE_CLASSES[snapshot["timeline_class"]]
+    solver = TemporalSolver.from_artifacts(
+        artifacts,
+        timeline_class=timeline_class,
+        retention=snapshot["timeline"]["retention"],
+        incremental=incremental,
+    )
+    entities = {entity.id: entity for entity in [*kb.classes.events, *kb.classes.intervals]}
+    solver.update_wm(snapshot["wm"])
+    solver.timeline = timeline_class.from_state(snapshot["timeline"], entities)
+    solver.current_tact = snapshot["current_tact"]
+    solver.sequence = snapshot["sequence"]
+    if solver.current_tact is not None:
+        solver.signify_temporal_operations_in_rules()
+    return solver
+
+
+class HibernationStore:
+    """Stores temporal solver snapshots and knowledge base sources in a directory.
+
+    Knowledge bases are stored once by the hash of their source in ``kbs``, session snapshots are
+    gzipped JSON files in ``sessions`` named by the hash of the session key. Stored knowledge bases are
+    loaded through ``kb_cache``, their hashes are the cache keys.
+    """
+
+    directory: Path
+    kb_cache: KBCache
+
+    def __init__(self, directory: Union[str, Path], kb_cache: KBCache = None):
+        self.directory = Path(directory)
+        self.kbs_directory = self.directory / "kbs"
+        self.sessions_directory = self.directory / "sessions"
+        self.kbs_directory.mkdir(parents=True, exist_ok=True)
+        self.sessions_directory.mkdir(parents=True, exist_ok=True)
+        self.kb_cache = kb_cache if kb_cache is not None else KBCache()
+
+    def save_kb(self, kb_data: Union[Element, dict, str]) -> str:
+        source, suffix = get_kb_source(kb_data)
+        kb_hash = hashlib.sha256(source).hexdigest()
+        path = self.kbs_directory / f"{kb_hash}{suffix}"
+        if not path.exists():
+            write_atomic(path, source)
+        return kb_hash
+
+    def load_kb(self, kb_hash: str) -> KBArtifacts:
+        artifacts = self.kb_cache.lookup(kb_hash)
+        if artifacts is None:
+            paths = list(self.kbs_directory.glob(f"{kb_hash}.*"))
+            if not paths:
+                raise ValueError(f"Knowledge base {kb_hash} is not stored")
+            artifacts = self.kb_cache.build(read_kb_file(paths[0]), kb_hash)
+        return artifacts
+
+    def get_session_path(self, key: Hashable) -> Path:
+        name = hashlib.sha256(f"{type(key).__name__}:{key}".encode("utf-8")).hexdigest()
+        return self.sessions_directory / f"{name}.json.gz"
+
+    def has(self, key: Hashable) -> bool:
+        return self.get_session_path(key).exists()
+
+    def save(self, key: Hashable, solver: TemporalSolver, kb_hash: str):
+        data = json.dumps(snapshot_solver(solver, kb_hash), separators=(",", ":"), ensure_ascii=False)
+        write_atomic(self.get_session_path(key), gzip.compress(data.encode("utf-8")))
+
+    def load(self, key: Hashable, incremental: bool = True) -> Optional[Tuple[TemporalSolver, str]]:
+        """Restores a session solver and returns it with its knowledge base hash, the snapshot is removed."""
+
+        path = self.get_session_path(key)
+        if not path.exists():
+            return None
+        snapshot = json.loads(gzip.decompress(path.read_bytes()))
+        solver = restore_solver(snapshot, self.load_kb(snapshot["kb"]), incremental=incremental)
+        path.unlink()
+        return solver, snapshot["kb"]
+
+    def discard(self, key: Hashable):
+        self.get_session_path(key).unlink(missing_ok=True)
+
+
+def write_atomic(path: Path, data: bytes):
+    temporary_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    temporary_path.write_bytes(data)
+    os.replace(temporary_path, path)
@@ -0,0 +1,55 @@
+from pathlib import Path
+from typing import Tuple
+from typing import Union
+from xml.etree.ElementTree import Element
+import hashlib
+import json
+import xml.etree.ElementTree as ET
+
+from at_krl.core.knowledge_base import KnowledgeBase
+
+
+def load_kb(kb_data: Union[KnowledgeBase, Element, dict, str]) -> KnowledgeBase:
+    if isinstance(kb_data, KnowledgeBase):
+        return kb_data
+    elif isinstance(kb_data, Element):
+        return KnowledgeBase.from_xml(kb_data)
+    elif isinstance(kb_data, dict):
+        return KnowledgeBase.from_json(kb_data)
+    elif isinstance(kb_data, str):
+        return KnowledgeBase.from_krl(kb_data)
+    else:
+        raise TypeError("Not valid type of knowledge base configuration")
+
+
+def read_kb_file(path: Union[str, Path]) -> Union[Element, dict, str]:
+    path = Path(path)
+    suffix = path.suffix.lower()
+    if suffix == ".xml":
+        return ET.parse(path).getroot()
+    elif suffix == ".json":
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    return path.read_text(encoding="utf-8")
+
+
+def load_kb_file(path: Union[str, Path]) -> KnowledgeBase:
+    """Loads a knowledge base from a XML, JSON or KRL file depending on the file extension."""
+
+    return load_kb(read_kb_file(path))
+
+
+def get_kb_source(kb_data: Union[Element, dict, str]) -> Tuple[bytes, str]:
+    """Returns bytes of the knowledge base source and the file extension it is loaded by."""
+
+    if isinstance(kb_data, Element):
+        return ET.tostring(kb_data, encoding="utf-8"), ".xml"
+    elif isinstance(kb_data, dict):
+        return json.dumps(kb_data, sort_keys=True, ensure_ascii=False).encode("utf-8"), ".json"
+    elif isinstance(kb_data, str):
+        return kb_data.encode("utf-8"), ".krl"
+    raise TypeError("Not valid type of knowledge base configuration")
+
+
+def get_kb_hash(kb_data: Union[Element, dict, str]) -> str:
+    return hashlib.sha256(get_kb_source(kb_data)[0]).hexdigest()
@@ -0,0 +1,135 @@
+from dataclasses import dataclass
+from typing import Any
+from typing import Collection
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import TYPE_CHECKING
+
+from at_temporal_solver.core.timeline import IntervalInstance
+from at_temporal_solver.core.timeline import TactRecord
+
+if TYPE_CHECKING:
+    from at_temporal_solver.core.at_temporal_solver import TemporalSolver
+
+RESULT_FIELDS = {"sequence", "delta", "wm", "timeline", "tact", "closed_intervals", "signified", "signified_meta"}
+
+
+def get_changed_values(previous: Optional[Dict[str, Any]], current: Dict[str, Any]) -> Dict[str, Any]:
+    if previous is None:
+        return dict(current)
+    result = {key: value for key, value in current.items() if key not in previous or previous[key] != value}
+    result.update({key: None for key in previous if key not in current})
+    return result
+
+
+def get_closed_interval_dict(instance: IntervalInstance) -> dict:
+    return {"interval": instance.interval.id, "open_tact": instance.open_tact, "close_tact": instance.close_tact}
+
+
+@dataclass(kw_only=True)
+class TactResult:
+    """Result of a single tact: its timeline record, intervals closed at it and signified Allen operations."""
+
+    sequence: int
+    tact: int
+    record: TactRecord
+    closed_intervals: List[IntervalInstance]
+    signified: Dict[str, Any]
+    signified_meta: Dict[str, dict]
+
+    @classmethod
+    def from_solver(cls, solver: "TemporalSolver") -> "TactResult":
+        return cls(
+            sequence=solver.sequence,
+            tact=solver.current_tact,
+            record=solver.timeline.get_tact_record(solver.current_tact),
+            closed_intervals=list(solver.closed_interval_instances),
+            signified={path: meta["value"] for path, meta in solver.signified_meta.items()},
+            signified_meta=dict(solver.signified_meta),
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            "sequence": self.sequence,
+            "tact": self.record.__dict__ if self.record is not None else None,
+            "closed_intervals": [get_closed_interval_dict(instance) for instance in self.closed_intervals],
+            "signified": dict(self.signified),
+            "signified_meta": dict(self.signified_meta),
+        }
+
+
+class TactResultEncoder:
+    """Builds ``process_tact`` results of a temporal solver.
+
+    Full results contain the whole timeline and working memory. Delta results contain only the last
+    tact record, the intervals closed at the last tact and the working memory and signified values
+    changed since the previously encoded result. Every result carries the solver ``sequence`` number,
+    so a client missing a sequence number requests a full result to resync.
+
+    Passing ``fields`` projects a result to the given keys of ``RESULT_FIELDS``, ``sequence`` and ``delta``
+    are always kept.
+    Excluded parts are not built, but working memory and signified values are still compared, so the
+    next delta is relative to this result.
+    """
+
+    _wm: Optional[Dict[str, Any]]
+    _signified: Optional[Dict[str, Any]]
+
+    def __init__(self):
+        self.invalidate()
+
+    def invalidate(self):
+        self._wm = None
+        self._signified = None
+
+    def encode(self, solver: "TemporalSolver", delta: bool = False, fields: Collection[str] = None) -> dict:
+        if fields is not None:
+            unknown = set(fields) - RESULT_FIELDS
+            if unknown:
+                raise ValueError(f"Unknown result fields: {', '.join(sorted(unknown))}")
+        if delta:
+            return self.delta(solver, fields)
+        return self.full(solver, fields)
+
+    def full(self, solver: "TemporalSolver", fields: Collection[str] = None) -> dict:
+        self._wm = solver.wm.all_values_dict
+        self._signified = {key: value.content for key, value in solver.wm.locals.items()}
+        result = {"sequence": solver.sequence, "delta": False}
+        if fields is None or "wm" in fields:
+            result["wm"] = dict(self._wm)
+        if fields is None or "timeline" in fields:
+            result["timeline"] = solver.timeline.__dict__
+        if fields is None or "signified" in fields:
+            result["signified"] = dict(self._signified)
+        if fields is None or "signified_meta" in fields:
+            result["signified_meta"] = solver.signified_meta
+        return result
+
+    def delta(self, solver: "TemporalSolver", fields: Collection[str] = None) -> dict:
+        wm = solver.wm.all_values_dict
+        signified = {key: value.content for key, value in solver.wm.locals.items()}
+        changed_wm = get_changed_values(self._wm, wm)
+        changed_signified = get_changed_values(self._signified, signified)
+        self._wm = wm
+        self._signified = signified
+
+        result = {"sequence": solver.sequence, "delta": True}
+        if fields is None or "tact" in fields:
+            tact_record = None
+            if solver.current_tact is not None:
+                tact_record = solver.timeline.get_tact_record(solver.current_tact)
+            result["tact"] = tact_record.__dict__ if tact_record is not None else None
+        if fields is None or "closed_intervals" in fields:
+            result["closed_intervals"] = [
+                get_closed_interval_dict(instance) for instance in solver.closed_interval_instances
+            ]
+        if fields is None or "wm" in fields:
+            result["wm"] = changed_wm
+        if fields is None or "signified" in fields:
+            result["signified"] = changed_signified
+        if fields is None or "signified_meta" in fields:
+            result["signified_meta"] = {
+                key: meta for key, meta in solver.signified_meta.items() if "signifier." + key in changed_signified
+            }
+        return result
@@ -0,0 +1,171 @@
+from collections import OrderedDict
+from dataclasses import asdict
+from dataclasses import dataclass
+from typing import Callable
+from typing import Collection
+from typing import Dict
+from typing import Hashable
+from typing import Iterator
+from typing import List
+from typing import MutableMapping
+from typing import Optional
+import logging
+import threading
+import time
+
+from at_temporal_solver.core.at_temporal_solver import TemporalSolver
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(kw_only=True)
+class EvictionPolicy:
+    max_sessions: Optional[int] = None
+    ttl: Optional[float] = None
+    session_memory: Optional[int] = None
+    memory: Optional[int] = None
+
+    @property
+    def enabled(self) -> bool:
+        return any(value is not None for value in asdict(self).values())
+
+
+@dataclass(kw_only=True)
+class EvictionMetrics:
+    lru: int = 0
+    ttl: int = 0
+    session_memory: int = 0
+    memory: int = 0
+    sessions: int = 0
+    nbytes: int = 0
+
+    @property
+    def evicted(self) -> int:
+        return self.lru + self.ttl + self.session_memory + self.memory
+
+    def merge(self, other: "EvictionMetrics") -> "EvictionMetrics":
+        return EvictionMetrics(**{key: value + getattr(other, key) for key, value in asdict(self).items()})
+
+
+@dataclass(kw_only=True)
+class Eviction:
+    key: Hashable
+    solver: TemporalSolver
+    reason: str
+
+
+class SessionStore(MutableMapping[Hashable, TemporalSolver]):
+    """Temporal solvers of sessions ordered from the least to the most recently used.
+
+    Adding a session over ``max_sessions`` evicts the least recently used one, sessions reported by ``is_busy``
+    are being processed and are skipped. ``sweep`` evicts sessions idle for more than ``ttl`` seconds and
+    sessions using more than ``session_memory`` bytes, then the least recently used sessions until all of
+    them use at most ``memory`` bytes. Memory is estimated by ``TemporalSolver.nbytes``. Evicted sessions
+    are passed to ``on_evict``.
+    """
+
+    policy: EvictionPolicy
+    metrics: EvictionMetrics
+    on_evict: Optional[Callable[[Eviction], None]]
+    is_busy: Optional[Callable[[Hashable], bool]]
+
+    def __init__(
+        self,
+        policy: EvictionPolicy = None,
+        on_evict: Callable[[Eviction], None] = None,
+        clock: Callable[[], float] = time.monotonic,
+        is_busy: Callable[[Hashable], bool] = None,
+    ):
+        self.policy = policy or EvictionPolicy()
+        self.metrics = EvictionMetrics()
+        self.on_evict = on_evict
+        self.is_busy = is_busy
+        self.clock = clock
+        self._solvers: OrderedDict[Hashable, TemporalSolver] = OrderedDict()
+        self._accessed: Dict[Hashable, float] = {}
+        self._sizes: Dict[Hashable, int] = {}
+        self._lock = threading.RLock()
+
+    def __getitem__(self, key: Hashable) -> TemporalSolver:
+        with self._lock:
+            solver = self._solvers[key]
+            self._solvers.move_to_end(key)
+            self._accessed[key] = self.clock()
+            return solver
+
+    def __setitem__(self, key: Hashable, solver: TemporalSolver):
+        with self._lock:
+            self._solvers[key] = solver
+            self._solvers.move_to_end(key)
+            self._accessed[key] = self.clock()
+            max_sessions = self.policy.max_sessions
+            if max_sessions is not None and len(self._solvers) > max_sessions:
+                candidates = [
+                    other
+                    for other in self._solvers
+                    if other != key and (self.is_busy is None or not self.is_busy(other))
+                ]
+                for other in candidates[: len(self._solvers) - max_sessions]:
+                    self.evict(other, "lru")
+
+    def __delitem__(self, key: Hashable):
+        with self._lock:
+            del self._solvers[key]
+            del self._accessed[key]
+
+    def __iter__(self) -> Iterator[Hashable]:
+        return iter(list(self._solvers))
+
+    def __len__(self) -> int:
+        return len(self._solvers)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._solvers
+
+    def evict(self, key: Hashable, reason: str) -> Eviction:
+        with self._lock:
+            eviction = Eviction(key=key, solver=self._solvers.pop(key), reason=reason)
+            del self._accessed[key]
+        setattr(self.metrics, reason, getattr(self.metrics, reason) + 1)
+        logger.info("Evicted temporal solver session %s (%s)", key, reason)
+        if self.on_evict is not None:
+            self.on_evict(eviction)
+        return eviction
+
+    def sweep(self, now: float = None, busy: Collection[Hashable] = ()) -> List[Eviction]:
+        """Evicts sessions by the policy. ``busy`` sessions are being processed, they are treated as just used."""
+
+        policy = self.policy
+        now = self.clock() if now is None else now
+        evictions = []
+        with self._lock:
+            for key in busy:
+                if key in self._solvers:
+                    self._solvers.move_to_end(key)
+                    self._accessed[key] = now
+
+            if policy.ttl is not None:
+                for key in [key for key, accessed in self._accessed.items() if now - accessed > policy.ttl]:
+                    evictions.append(self.evict(key, "ttl"))
+
+            sizes = {
+                key: self._sizes.get(key, 0) if key in busy else solver.nbytes for key, solver in self._solvers.items()
+            }
+            self._sizes = sizes
+            if policy.session_memory is not None:
+                for key in [key for key, size in sizes.items() if size > policy.session_memory and key not in busy]:
+                    evictions.append(self.evict(key, "session_memory"))
+                    del sizes[key]
+
+            total = sum(sizes.values())
+            if policy.memory is not None:
+                while total > policy.memory and self._solvers:
+                    key = next(iter(self._solvers))
+                    if key in busy:
+                        break
+                    evictions.append(self.evict(key, "memory"))
+                    total -= sizes.pop(key)
+
+            self.metrics.sessions = len(self._solvers)
+            self.metrics.nbytes = total
+        return evictions
@@ -0,0 +1,170 @@
+from dataclasses import dataclass
+from dataclasses import field
+from typing import Dict
+from typing import FrozenSet
+from typing import Iterable
+from typing import List
+from typing import Optional
+from typing import Set
+from typing import Tuple
+from typing import Union
+
+from at_krl.core.kb_rule import KBRule
+from at_krl.core.knowledge_base import KnowledgeBase
+from at_krl.core.simple.simple_evaluatable import SimpleEvaluatable
+from at_krl.core.simple.simple_operation import SimpleOperation
+from at_krl.core.simple.simple_value import SimpleValue
+from at_krl.core.temporal.allen_attribute_expression import AllenAttributeExpression
+from at_krl.core.temporal.allen_evaluatable import AllenEvaluatable
+from at_krl.core.temporal.allen_operation import AllenOperation
+from at_krl.core.temporal.allen_reference import AllenReference
+
+from at_temporal_solver.core.timeline import get_entity_id
+
+
+def get_references(v: AllenEvaluatable) -> Optional[List[AllenReference]]:
+    if isinstance(v, AllenOperation):
+        return [v.left, v.right]
+    elif isinstance(v, AllenAttributeExpression):
+        return [v.ref]
+    return None
+
+
+def collect_entities(v: AllenEvaluatable) -> Optional[Set[str]]:
+    """Returns ids of events and intervals the Allen operation value depends on.
+
+    ``None`` is returned when the value can change without any change of these entities instances,
+    e.g. when an operand is referenced by an index expression.
+    """
+
+    references = get_references(v)
+    if references is None:
+        return None
+    result = set()
+    for reference in references:
+        if not isinstance(reference, AllenReference) or reference.index:
+            return None
+        result.add(get_entity_id(reference))
+    return result
+
+
+def get_constant_index(index: SimpleEvaluatable) -> Optional[Union[int, float]]:
+    """Returns the value of an instance index given by a constant, ``None`` for other index expressions."""
+
+    if isinstance(index, SimpleValue):
+        content = index.to_simple().content
+    elif isinstance(index, SimpleOperation) and index.operation_name == "neg":
+        content = get_constant_index(index.left)
+        content = -content if content is not None else None
+    else:
+        return None
+    return content if isinstance(content, (int, float)) and not isinstance(content, bool) else None
+
+
+def count_referenced_instances(v: AllenEvaluatable) -> int:
+    """Returns the number of last instances of an entity the Allen operation can reach by negative indexes."""
+
+    result = 1
+    for reference in get_references(v) or ():
+        index = get_constant_index(getattr(reference, "index", None))
+        if index is not None and index < 0:
+            result = max(result, int(-index))
+    return result
+
+
+@dataclass(kw_only=True)
+class PlannedOperation:
+    key: str
+    operation: AllenEvaluatable
+    usages: List[Tuple[str, KBRule]] = field(default_factory=list)
+    entities: Optional[FrozenSet[str]] = None
+
+    @property
+    def volatile(self) -> bool:
+        return self.entities is None
+
+    @property
+    def uses_sections(self) -> bool:
+        return isinstance(self.operation, AllenOperation)
+
+    @property
+    def krl(self) -> str:
+        return self.operation.krl
+
+
+@dataclass(kw_only=True)
+class SignificationPlan:
+    """Distinct Allen operations of the knowledge base rules conditions.
+
+    Operations are deduplicated by their KRL representation, every planned operation keeps the
+    ``xml_owner_path`` of each place it is used at with the rule using it.
+
+    Operations are also indexed by ids of events and intervals they reference, so only operations
+    affected by the timeline changes of a tact have to be evaluated again.
+
+    ``kept_instances`` is the deepest constant negative index of the operations references, timelines
+    with retention keep this number of last instances of every entity.
+    """
+
+    operations: List[PlannedOperation] = field(default_factory=list)
+    by_path: Dict[str, PlannedOperation] = field(default_factory=dict)
+    by_key: Dict[str, PlannedOperation] = field(default_factory=dict)
+    dependents: Dict[str, List[PlannedOperation]] = field(default_factory=dict)
+    volatile: List[PlannedOperation] = field(default_factory=list)
+    kept_instances: int = 1
+
+    @classmethod
+    def from_kb(cls, kb: KnowledgeBase) -> "SignificationPlan":
+        plan = cls()
+        for rule in kb.rules:
+            plan.add_condition(rule.condition, rule)
+        return plan
+
+    def add_condition(self, v: SimpleEvaluatable, rule: KBRule):
+        if isinstance(v, AllenEvaluatable):
+            self.add_operation(v, rule)
+        elif isinstance(v, SimpleOperation):
+            self.add_condition(v.left, rule)
+            if v.is_binary:
+                self.add_condition(v.right, rule)
+
+    def add_operation(self, v: AllenEvaluatable, rule: KBRule) -> PlannedOperation:
+        planned = self.by_path.get(v.xml_owner_path)
+        if planned is not None:
+            return planned
+        key = v.krl
+        planned = self.by_key.get(key)
+        if planned is None:
+            entities = collect_entities(v)
+            planned = PlannedOperation(
+                key=key, operation=v, entities=frozenset(entities) if entities is not None else None
+            )
+            self.by_key[key] = planned
+            self.operations.append(planned)
+            self.kept_instances = max(self.kept_instances, count_referenced_instances(v))
+            if planned.volatile:
+                self.volatile.append(planned)
+            for entity in planned.entities or ():
+                self.dependents.setdefault(entity, []).append(planned)
+        planned.usages.append((v.xml_owner_path, rule))
+        self.by_path[v.xml_owner_path] = planned
+        return planned
+
+    def get_affected_operations(
+        self, changed_entities: Iterable[str], opened_intervals: Iterable[str]
+    ) -> List[PlannedOperation]:
+        """Returns operations to evaluate again after the instances of ``changed_entities`` were created or closed.
+
+        Operations with a still opened interval operand are affected on every tact, as the section of
+        an opened interval ends at the current tact.
+        """
+
+        result = {id(planned): planned for planned in self.volatile}
+        for entity in changed_entities:
+            for planned in self.dependents.get(entity, ()):
+                result[id(planned)] = planned
+        for entity in opened_intervals:
+            for planned in self.dependents.get(entity, ()):
+                if planned.uses_sections:
+                    result[id(planned)] = planned
+        return list(result.values())
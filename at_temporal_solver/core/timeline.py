@@ -1,21 +1,24 @@
 from dataclasses import dataclass
+from types import MappingProxyType
 from typing import Dict
 from typing import List
+from typing import Mapping
 from typing import Optional
 from typing import Union
+import bisect
 
 from at_krl.core.temporal.allen_event import KBEvent
 from at_krl.core.temporal.allen_interval import KBInterval
 from at_krl.core.temporal.allen_reference import AllenReference
 
 
-@dataclass(kw_only=True)
+@dataclass(kw_only=True, slots=True)
 class EventInstance:
     event: KBEvent
     occurance_tact: int
 
 
-@dataclass(kw_only=True)
+@dataclass(kw_only=True, slots=True)
 class IntervalInstance:
     interval: KBInterval
     open_tact: int
@@ -26,6 +29,12 @@ class IntervalInstance:
         return self.close_tact is not None
 
 
+def get_instance_tact(instance: Union[EventInstance, IntervalInstance]) -> int:
+    if isinstance(instance, EventInstance):
+        return instance.occurance_tact
+    return instance.open_tact
+
+
 class TactRecord:
     tact: int
     event_instances: List[EventInstance]
@@ -110,11 +119,75 @@ class TactRecord:
         }
 
 
+def get_entity_id(
+    entity: Union[str, KBEvent, KBInterval, AllenReference, EventInstance, IntervalInstance]
+) -> Optional[str]:
+    if isinstance(entity, EventInstance):
+        entity = entity.event
+    elif isinstance(entity, IntervalInstance):
+        entity = entity.interval
+    elif isinstance(entity, AllenReference):
+        entity = entity.target
+    if isinstance(entity, (KBEvent, KBInterval)):
+        return entity.id
+    return entity
+
+
+def get_instance_by_index(instances: List, index: Union[int, float] = -1, compacted: int = 0):
+    if isinstance(index, float) and index.is_integer():
+        index = int(index)
+    if not isinstance(index, int):
+        return None
+    if index >= 0:
+        index -= compacted
+        if index < 0:
+            return None
+    if instances and -len(instances) <= index < len(instances):
+        return instances[index]
+    return None
+
+
+TACT_RECORD_BYTES = 280
+INSTANCE_BYTES = 72
+
+
 class Timeline:
-    _tacts: Dict[int, TactRecord]
+    """Timeline of event and interval instances grouped by tact.
+
+    When ``retention`` is set only the last ``retention`` tacts are kept. Older tact records are
+    dropped every ``retention`` tacts, except the ones holding a still opened interval, and the last
+    ``kept_instances`` instances of every event and interval are always kept, so negative indexes down
+    to ``-kept_instances`` are resolved as without compaction. Dropped instances are accounted in
+    per-entity counters, so instance counts and indexes stay the same as without compaction, while
+    references to dropped instances are resolved to ``None``.
+    """
 
-    def __init__(self) -> None:
+    _tacts: Dict[int, TactRecord]
+    _event_instances: Dict[str, List[EventInstance]]
+    _interval_instances: Dict[str, List[IntervalInstance]]
+    _compacted_events: Dict[str, int]
+    _compacted_intervals: Dict[str, int]
+    _opened_intervals: Dict[str, IntervalInstance]
+    _last_tact: Optional[int]
+    _horizon: int
+    retention: Optional[int]
+    kept_instances: int
+
+    def __init__(self, retention: Optional[int] = None, kept_instances: int = 1) -> None:
+        if retention is not None and retention < 1:
+            raise ValueError(f"Retention must be a positive number of tacts, but got {retention}")
+        if kept_instances < 1:
+            raise ValueError(f"Number of kept instances must be positive, but got {kept_instances}")
+        self.retention = retention
+        self.kept_instances = kept_instances
         self._tacts = {}
+        self._event_instances = {}
+        self._interval_instances = {}
+        self._compacted_events = {}
+        self._compacted_intervals = {}
+        self._opened_intervals = {}
+        self._last_tact = None
+        self._horizon = 0
 
     @property
     def tact_numbers(self):
@@ -123,63 +196,108 @@ class Timeline:
     def get_or_create_tact_record(self, tact: int) -> TactRecord:
         tact_record = self._tacts.get(tact)
         if tact_record is None:
-            lact_tact_num = 0
-            if not len(self.tact_numbers):
+            if self._last_tact is None:
                 if tact != 0:
                     raise ValueError("tact number must be equal to 0 when the set of tacts is empty")
-            else:
-                lact_tact_num = self.tact_numbers[-1]
-                if tact > lact_tact_num and tact - lact_tact_num != 1:
-                    raise ValueError(f"New tact is {tact} that differs from the last tact {lact_tact_num} more then 1")
+            elif tact > self._last_tact and tact - self._last_tact != 1:
+                raise ValueError(f"New tact is {tact} that differs from the last tact {self._last_tact} more then 1")
+            elif tact < self._horizon:
+                raise ValueError(f"Tact {tact} is already compacted")
             tact_record = TactRecord(tact)
             self._tacts[tact] = tact_record
+            if self._last_tact is None or tact > self._last_tact:
+                self._last_tact = tact
+                if self.retention is not None and tact - self._horizon >= 2 * self.retention:
+                    self.compact()
         return tact_record
 
+    def compact(self, horizon: Optional[int] = None):
+        if horizon is None:
+            if self.retention is None or self._last_tact is None:
+                return
+            horizon = self._last_tact - self.retention + 1
+        if horizon <= self._horizon:
+            return
+
+        for index, compacted in [
+            (self._event_instances, self._compacted_events),
+            (self._interval_instances, self._compacted_intervals),
+        ]:
+            for entity_id, instances in index.items():
+                count = min(
+                    bisect.bisect_left(instances, horizon, key=get_instance_tact),
+                    len(instances) - self.kept_instances,
+                )
+                if count > 0:
+                    del instances[:count]
+                    compacted[entity_id] = compacted.get(entity_id, 0) + count
+
+        retained = {id(instance) for instances in self._event_instances.values() for instance in instances}
+        retained.update(id(instance) for instances in self._interval_instances.values() for instance in instances)
+        for tact in [tact for tact in self._tacts if tact < horizon]:
+            tact_record = self._tacts[tact]
+            if any(not instance.closed for instance in tact_record.opened_interval_instances):
+                tact_record.event_instances = [
+                    instance for instance in tact_record.event_instances if id(instance) in retained
+                ]
+                tact_record.opened_interval_instances = [
+                    instance for instance in tact_record.opened_interval_instances if id(instance) in retained
+                ]
+            else:
+                del self._tacts[tact]
+        self._horizon = horizon
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory used by tact records and instances."""
+
+        instances = sum(len(instances) for instances in self._event_instances.values())
+        instances += sum(len(instances) for instances in self._interval_instances.values())
+        return len(self._tacts) * TACT_RECORD_BYTES + instances * INSTANCE_BYTES
+
+    @property
+    def opened_intervals(self) -> Mapping[str, IntervalInstance]:
+        return MappingProxyType(self._opened_intervals)
+
+    def get_tact_record(self, tact: int) -> Optional[TactRecord]:
+        return self._tacts.get(tact)
+
     def still_opened_intervals(self, last_tact: int = None) -> List[IntervalInstance]:
-        last_tact = last_tact if last_tact is not None else self.last_tact_number
         if last_tact is None:
-            return []
-        result = []
-        for tact in range(last_tact + 1):
-            tact_record = self._tacts.get(tact)
-            if tact_record is not None:
-                for interval_instance in tact_record.opened_interval_instances:
-                    if not interval_instance.closed:
-                        result.append(interval_instance)
-        return result
+            return list(self._opened_intervals.values())
+        return [instance for instance in self._opened_intervals.values() if instance.open_tact <= last_tact]
 
     @property
     def last_tact_number(self):
-        tacts_list = list(self._tacts.keys())
-        if not len(tacts_list):
-            return None
-        return max(list(self._tacts.keys()))
+        return self._last_tact
 
     @property
     def sorted_tact_list(self) -> List[TactRecord]:
-        if self.last_tact_number is None:
-            return []
-        return [self._tacts[tact] for tact in range(self.last_tact_number + 1)]
+        return [self._tacts[tact] for tact in sorted(self._tacts)]
 
     def interval_is_still_opened(self, interval: Union[IntervalInstance, KBInterval, str]) -> bool:
-        if isinstance(interval, IntervalInstance):
-            interval = interval.interval
-        if isinstance(interval, KBInterval):
-            interval = interval.id
-        still_opened_intervals = self.still_opened_intervals()
-        return interval in [instance.interval.id for instance in still_opened_intervals]
+        return get_entity_id(interval) in self._opened_intervals
+
+    def get_opened_interval(self, interval: Union[IntervalInstance, KBInterval, str]) -> Optional[IntervalInstance]:
+        return self._opened_intervals.get(get_entity_id(interval))
 
     def open_interval_instance(self, tact: int, interval: KBInterval) -> IntervalInstance:
-        if self.interval_is_still_opened(interval):
-            return self.get_interval_instance(interval)
+        opened_instance = self._opened_intervals.get(interval.id)
+        if opened_instance is not None:
+            return opened_instance
         tact_record = self.get_or_create_tact_record(tact)
         result = tact_record.open_interval_instance(interval)
         self._tacts[tact] = tact_record
+        self._index_instance(self._interval_instances, interval.id, result, result.open_tact)
+        if not result.closed:
+            self._opened_intervals[interval.id] = result
         return result
 
-    def close_interval_instance(self, tact: int, interval: KBInterval) -> Optional[IntervalInstance]:
-        instance = self.get_interval_instance(interval)
-        if (instance is None) ^ instance.closed:
+    def close_interval_instance(
+        self, tact: int, interval: Union[IntervalInstance, KBInterval, str]
+    ) -> Optional[IntervalInstance]:
+        instance = self._opened_intervals.pop(get_entity_id(interval), None)
+        if instance is None:
             return None
         instance.close_tact = tact
         return instance
@@ -188,45 +306,138 @@ class Timeline:
         tact_record = self.get_or_create_tact_record(tact)
         result = tact_record.create_event_instance(event)
         self._tacts[tact] = tact_record
+        self._index_instance(self._event_instances, event.id, result, result.occurance_tact)
         return result
 
+    @staticmethod
+    def _index_instance(index: Dict[str, List], entity_id: str, instance, tact: int):
+        instances = index.setdefault(entity_id, [])
+        if instances and instances[-1] is instance:
+            return
+        if not instances or get_instance_tact(instances[-1]) <= tact:
+            instances.append(instance)
+        elif not any(existing is instance for existing in instances):
+            bisect.insort(instances, instance, key=get_instance_tact)
+
     def get_event_instance(self, event: Union[str, AllenReference, EventInstance], index=-1) -> Optional[EventInstance]:
-        all_instances = self.get_all_event_instances(event)
-        if all_instances and index in range(-len(all_instances), len(all_instances)):
-            return all_instances[index]
+        event_id = get_entity_id(event)
+        return get_instance_by_index(
+            self._event_instances.get(event_id), index, compacted=self._compacted_events.get(event_id, 0)
+        )
 
     def get_interval_instance(
         self, interval: Union[AllenReference, KBInterval, str], index=-1
     ) -> Optional[IntervalInstance]:
-        all_instances = self.get_all_interval_instances(interval)
-        if all_instances and index in range(-len(all_instances), len(all_instances)):
-            return all_instances[index]
-
-    def get_all_event_instances(self, event: Union[str, AllenReference, EventInstance]):
-        if isinstance(event, EventInstance):
-            event = event.event
-        elif isinstance(event, AllenReference):
-            event = event.target
-        result = []
-        tact_list: List[TactRecord] = self.sorted_tact_list
-        for tact_record in tact_list:
-            instance = tact_record.get_event_instance_by_event(event)
-            if instance is not None:
-                result.append(instance)
-        return result
+        interval_id = get_entity_id(interval)
+        return get_instance_by_index(
+            self._interval_instances.get(interval_id), index, compacted=self._compacted_intervals.get(interval_id, 0)
+        )
 
-    def get_all_interval_instances(self, interval: Union[AllenReference, KBInterval, str]):
-        if isinstance(interval, IntervalInstance):
-            interval = interval.interval
-        elif isinstance(interval, AllenReference):
-            interval = interval.target
-        result = []
-        tact_list: List[TactRecord] = self.sorted_tact_list
-        for tact_record in tact_list:
-            instance = tact_record.get_interval_instance_by_interval(interval)
-            if instance is not None:
-                result.append(instance)
-        return result
+    def get_all_event_instances(self, event: Union[str, AllenReference, EventInstance]) -> List[EventInstance]:
+        return list(self._event_instances.get(get_entity_id(event), []))
+
+    def get_all_interval_instances(self, interval: Union[AllenReference, KBInterval, str]) -> List[IntervalInstance]:
+        return list(self._interval_instances.get(get_entity_id(interval), []))
+
+    def count_event_instances(self, event: Union[str, AllenReference, EventInstance]) -> int:
+        event_id = get_entity_id(event)
+        return len(self._event_instances.get(event_id, ())) + self._compacted_events.get(event_id, 0)
+
+    def count_interval_instances(self, interval: Union[AllenReference, KBInterval, str]) -> int:
+        interval_id = get_entity_id(interval)
+        return len(self._interval_instances.get(interval_id, ())) + self._compacted_intervals.get(interval_id, 0)
+
+    def count_closed_interval_instances(self, interval: Union[AllenReference, KBInterval, str]) -> int:
+        # only the latest instance of an interval can still be opened
+        interval_id = get_entity_id(interval)
+        count = self.count_interval_instances(interval_id)
+        if interval_id in self._opened_intervals:
+            return count - 1
+        return count
+
+    @property
+    def event_ids(self) -> List[str]:
+        return list(self._event_instances)
+
+    @property
+    def interval_ids(self) -> List[str]:
+        return list(self._interval_instances)
+
+    def to_state(self) -> dict:
+        """Returns the timeline contents as plain data referring to events and intervals by their ids."""
+
+        events = {
+            event_id: [instance.occurance_tact for instance in self.get_all_event_instances(event_id)]
+            for event_id in self.event_ids
+        }
+        intervals = {
+            interval_id: [
+                [instance.open_tact, instance.close_tact] for instance in self.get_all_interval_instances(interval_id)
+            ]
+            for interval_id in self.interval_ids
+        }
+        return {
+            "retention": self.retention,
+            "kept_instances": self.kept_instances,
+            "last_tact": self._last_tact,
+            "horizon": self._horizon,
+            "events": events,
+            "intervals": intervals,
+            "compacted_events": {
+                event_id: self.count_event_instances(event_id) - len(tacts) for event_id, tacts in events.items()
+            },
+            "compacted_intervals": {
+                interval_id: self.count_interval_instances(interval_id) - len(bounds)
+                for interval_id, bounds in intervals.items()
+            },
+            "tacts": [
+                [
+                    record.tact,
+                    [instance.event.id for instance in record.event_instances],
+                    [instance.interval.id for instance in record.opened_interval_instances],
+                ]
+                for record in self.sorted_tact_list
+            ],
+        }
+
+    @classmethod
+    def from_state(cls, state: dict, entities: Mapping[str, Union[KBEvent, KBInterval]]) -> "Timeline":
+        """Creates a timeline from ``to_state`` data, ``entities`` are events and intervals by their ids."""
+
+        timeline = cls(retention=state["retention"], kept_instances=state.get("kept_instances", 1))
+        timeline._restore(state, entities)
+        return timeline
+
+    def _restore(self, state: dict, entities: Mapping[str, Union[KBEvent, KBInterval]]):
+        self._last_tact = state["last_tact"]
+        self._horizon = state["horizon"]
+        for event_id, tacts in state["events"].items():
+            self._event_instances[event_id] = [
+                EventInstance(event=entities[event_id], occurance_tact=tact) for tact in tacts
+            ]
+        for interval_id, bounds in state["intervals"].items():
+            instances = [
+                IntervalInstance(interval=entities[interval_id], open_tact=open_tact, close_tact=close_tact)
+                for open_tact, close_tact in bounds
+            ]
+            self._interval_instances[interval_id] = instances
+            if instances and not instances[-1].closed:
+                self._opened_intervals[interval_id] = instances[-1]
+        self._compacted_events = {key: count for key, count in state["compacted_events"].items() if count}
+        self._compacted_intervals = {key: count for key, count in state["compacted_intervals"].items() if count}
+        for tact, event_ids, interval_ids in state["tacts"]:
+            record = TactRecord(tact)
+            record.event_instances = [
+                self._find_instance(self._event_instances[event_id], tact) for event_id in event_ids
+            ]
+            record.opened_interval_instances = [
+                self._find_instance(self._interval_instances[interval_id], tact) for interval_id in interval_ids
+            ]
+            self._tacts[tact] = record
+
+    @staticmethod
+    def _find_instance(instances: List, tact: int):
+        return instances[bisect.bisect_left(instances, tact, key=get_instance_tact)]
 
     @property
     def __dict__(self):
@@ -0,0 +1,480 @@
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from dataclasses import field
+from dataclasses import replace
+from functools import partial
+from multiprocessing.connection import Connection
+from typing import Any
+from typing import Callable
+from typing import Collection
+from typing import Dict
+from typing import Hashable
+from typing import List
+from typing import Optional
+from typing import Tuple
+from typing import Type
+from typing import Union
+from xml.etree.ElementTree import Element
+import asyncio
+import builtins
+import logging
+import multiprocessing
+import os
+import traceback
+import zlib
+
+from at_temporal_solver.core.artifacts import KBArtifacts
+from at_temporal_solver.core.artifacts import KBCache
+from at_temporal_solver.core.at_temporal_solver import TemporalSolver
+from at_temporal_solver.core.hibernation import HibernationStore
+from at_temporal_solver.core.sessions import EvictionMetrics
+from at_temporal_solver.core.sessions import Eviction
+from at_temporal_solver.core.sessions import EvictionPolicy
+from at_temporal_solver.core.sessions import SessionStore
+from at_temporal_solver.core.timeline import Timeline
+
+logger = logging.getLogger(__name__)
+
+KBData = Union[Element, dict, str]
+
+
+@dataclass(kw_only=True)
+class SolverOptions:
+    timeline_class: Type[Timeline] = Timeline
+    retention: Optional[int] = None
+    incremental: bool = True
+    eviction: EvictionPolicy = field(default_factory=EvictionPolicy)
+    hibernation_dir: Optional[str] = None
+    preload_dir: Optional[str] = None
+
+    def create_solver(self, artifacts: KBArtifacts) -> TemporalSolver:
+        return TemporalSolver.from_artifacts(
+            artifacts,
+            timeline_class=self.timeline_class,
+            retention=self.retention,
+            incremental=self.incremental,
+        )
+
+
+def process_tact(solver: TemporalSolver, delta: bool = False, **kwargs) -> dict | bytes:
+    solver.process_tact()
+    return solver.get_result(delta=delta, **kwargs)
+
+
+def update_wm(solver: TemporalSolver, items: List[Dict], clear_before: bool = True) -> bool:
+    solver.update_wm(items, clear_before=clear_before)
+    return True
+
+
+def update_wm_columns(solver: TemporalSolver, *args, **kwargs) -> List[str]:
+    return sorted(solver.update_wm_columns(*args, **kwargs))
+
+
+def update_and_process_tact(
+    solver: TemporalSolver, items: List[Dict], clear_before: bool = True, delta: bool = False, **kwargs
+) -> dict | bytes:
+    solver.update_wm(items, clear_before=clear_before)
+    return process_tact(solver, delta=delta, **kwargs)
+
+
+def reset(solver: TemporalSolver) -> bool:
+    solver.reset()
+    return True
+
+
+SESSION_CALLS: Dict[str, Callable[..., Any]] = {
+    "reset": reset,
+    "update_wm": update_wm,
+    "update_wm_columns": update_wm_columns,
+    "process_tact": process_tact,
+    "update_and_process_tact": update_and_process_tact,
+    "process_tacts": TemporalSolver.process_tacts,
+    "get_state": TemporalSolver.get_result,
+}
+
+
+class SolverExecutor:
+    """Runs session calls of temporal solvers on the event loop.
+
+    Calls are referred by names of ``SESSION_CALLS``, so they can be sent to other threads and
+    processes by subclasses. Sessions are kept in a ``SessionStore`` evicting them by
+    ``options.eviction`` on ``sweep``.
+
+    Knowledge bases are parsed once per source by ``kb_cache`` and shared by sessions, ``create``
+    parses knowledge bases missing in the cache in an executor. Artifacts precompiled to
+    ``options.preload_dir`` are loaded to the cache on creation.
+
+    With ``options.hibernation_dir`` set evicted sessions and sessions left on ``close`` are saved
+    to the directory and restored on their next call. Sessions created from a parsed ``KnowledgeBase``
+    have no source to store and are dropped instead.
+
+    Sessions evicted over ``max_sessions`` by creating or restoring other sessions are collected until
+    ``take_evicted``, sessions evicted by ``sweep`` are returned by it.
+    """
+
+    solvers: SessionStore
+    options: SolverOptions
+    hibernation: Optional[HibernationStore]
+    kb_hashes: Dict[Hashable, str]
+    kb_cache: KBCache
+    evicted: List[Hashable]
+
+    def __init__(self, options: SolverOptions, solvers: SessionStore = None):
+        self.options = options
+        self.solvers = solvers if solvers is not None else SessionStore(options.eviction, on_evict=self.on_evict)
+        self.evicted = []
+        self.kb_cache = KBCache()
+        self.hibernation = (
+            HibernationStore(options.hibernation_dir, kb_cache=self.kb_cache) if options.hibernation_dir else None
+        )
+        self.kb_hashes = {}
+        if options.preload_dir:
+            self.preload()
+
+    def preload(self):
+        loaded = self.kb_cache.preload(self.options.preload_dir)
+        logger.info("Preloaded %s knowledge base artifacts from %s", loaded, self.options.preload_dir)
+
+    def get_solver(self, key: Hashable) -> TemporalSolver:
+        solver = self.solvers.get(key)
+        if solver is None and self.hibernation is not None:
+            restored = self.hibernation.load(key, incremental=self.options.incremental)
+            if restored is not None:
+                solver, self.kb_hashes[key] = restored
+                self.solvers[key] = solver
+        if solver is None:
+            raise ValueError("Temporal solver for provided token or user id is not created")
+        return solver
+
+    def create_session(self, key: Hashable, kb_data: KBData, artifacts: KBArtifacts = None) -> bool:
+        if artifacts is None:
+            artifacts = self.kb_cache.get(kb_data)
+        if self.hibernation is not None:
+            self.hibernation.discard(key)
+            if artifacts.kb_hash is None:
+                self.kb_hashes.pop(key, None)
+            else:
+                self.kb_hashes[key] = self.hibernation.save_kb(kb_data)
+        self.solvers[key] = self.options.create_solver(artifacts)
+        return True
+
+    def on_evict(self, eviction: Eviction):
+        self.hibernate(eviction)
+        if eviction.reason == "lru":
+            self.evicted.append(eviction.key)
+
+    def take_evicted(self) -> List[Hashable]:
+        """Returns keys of sessions evicted over ``max_sessions`` since the previous call."""
+
+        evicted, self.evicted = self.evicted, []
+        return evicted
+
+    def hibernate(self, eviction: Eviction):
+        kb_hash = self.kb_hashes.pop(eviction.key, None)
+        if self.hibernation is not None and kb_hash is not None:
+            self.hibernation.save(eviction.key, eviction.solver, kb_hash)
+
+    def hibernate_sessions(self):
+        if self.hibernation is not None:
+            for key in list(self.solvers):
+                self.hibernate(Eviction(key=key, solver=self.solvers.pop(key), reason="close"))
+
+    def call_session(self, key: Hashable, name: str, *args, **kwargs) -> Any:
+        return SESSION_CALLS[name](self.get_solver(key), *args, **kwargs)
+
+    def has_session(self, key: Hashable) -> bool:
+        return key in self.solvers or (self.hibernation is not None and self.hibernation.has(key))
+
+    def sweep_sessions(self, busy: Collection[Hashable] = ()) -> Tuple[List[Hashable], EvictionMetrics]:
+        evictions = self.solvers.sweep(busy=busy)
+        return [eviction.key for eviction in evictions], replace(self.solvers.metrics)
+
+    async def sweep(self) -> Tuple[List[Hashable], EvictionMetrics]:
+        return self.sweep_sessions()
+
+    async def create(self, key: Hashable, kb_data: KBData) -> bool:
+        return self.create_session(key, kb_data, await self.kb_cache.aget(kb_data))
+
+    async def call(self, key: Hashable, name: str, *args, **kwargs) -> Any:
+        return self.call_session(key, name, *args, **kwargs)
+
+    async def has(self, key: Hashable) -> bool:
+        return self.has_session(key)
+
+    def close(self):
+        self.hibernate_sessions()
+
+
+class ThreadSolverExecutor(SolverExecutor):
+    """Runs session calls in a thread pool, calls of one session are run one by one."""
+
+    pool: ThreadPoolExecutor
+    locks: Dict[Hashable, asyncio.Lock]
+
+    def __init__(self, options: SolverOptions, solvers: SessionStore = None, workers: int = None):
+        super().__init__(options, solvers)
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="at-temporal-solver")
+        self.locks = {}
+        self.solvers.is_busy = self.is_busy
+
+    def get_lock(self, key: Hashable) -> asyncio.Lock:
+        lock = self.locks.get(key)
+        if lock is None:
+            lock = self.locks[key] = asyncio.Lock()
+        return lock
+
+    def is_busy(self, key: Hashable) -> bool:
+        lock = self.locks.get(key)
+        return lock is not None and lock.locked()
+
+    def take_evicted(self) -> List[Hashable]:
+        evicted = super().take_evicted()
+        for key in evicted:
+            self.locks.pop(key, None)
+        return evicted
+
+    async def run(self, key: Hashable, func: Callable, *args, **kwargs) -> Any:
+        async with self.get_lock(key):
+            return await asyncio.get_running_loop().run_in_executor(self.pool, partial(func, *args, **kwargs))
+
+    async def create(self, key: Hashable, kb_data: KBData) -> bool:
+        artifacts = await self.kb_cache.aget(kb_data, executor=self.pool)
+        return await self.run(key, self.create_session, key, kb_data, artifacts)
+
+    async def call(self, key: Hashable, name: str, *args, **kwargs) -> Any:
+        return await self.run(key, self.call_session, key, name, *args, **kwargs)
+
+    async def sweep(self) -> Tuple[List[Hashable], EvictionMetrics]:
+        evicted, metrics = self.sweep_sessions(busy=[key for key in self.locks if self.is_busy(key)])
+        for key in evicted:
+            self.locks.pop(key, None)
+        return evicted, metrics
+
+    def close(self):
+        self.pool.shutdown(wait=True)
+        self.hibernate_sessions()
+
+
+class WorkerError(RuntimeError):
+    """A worker process failed a request with an exception not rebuilt in the parent, or exited."""
+
+
+class RemoteTraceback(Exception):
+    def __init__(self, tb: str):
+        self.tb = tb
+
+    def __str__(self) -> str:
+        return self.tb
+
+
+def describe_error(e: Exception) -> Tuple[str, str, str]:
+    """Returns a picklable description of an exception, exceptions of solvers may refer to unpicklable objects."""
+
+    return type(e).__name__, str(e), "".join(traceback.format_exception(type(e), e, e.__traceback__))
+
+
+def rebuild_error(name: str, message: str, tb: str) -> Exception:
+    """Rebuilds an exception described by ``describe_error``, builtin exception types are kept."""
+
+    error = None
+    exception_type = getattr(builtins, name, None)
+    if isinstance(exception_type, type) and issubclass(exception_type, Exception):
+        try:
+            error = exception_type(message)
+        except TypeError:
+            pass
+    if error is None:
+        error = WorkerError(f"{name}: {message}")
+    error.__cause__ = RemoteTraceback(tb)
+    return error
+
+
+def run_worker(connection: Connection, options: SolverOptions):
+    executor = SolverExecutor(options)
+    while True:
+        try:
+            message = connection.recv()
+        except EOFError:
+            break
+        if message is None:
+            break
+        name, args, kwargs = message
+        try:
+            result = getattr(executor, name)(*args, **kwargs)
+        except Exception as e:
+            connection.send((False, describe_error(e), executor.take_evicted()))
+            continue
+        evicted = executor.take_evicted()
+        try:
+            connection.send((True, result, evicted))
+        except Exception as e:
+            connection.send((False, describe_error(e), evicted))
+    executor.close()
+    connection.close()
+
+
+class SolverWorker:
+    """A worker process owning temporal solvers of its sessions.
+
+    Requests are sent to the process one by one from a dedicated thread, so waiting for a reply
+    does not block the event loop. When the process exits, requests of its sessions fail with
+    ``WorkerError``.
+    """
+
+    def __init__(self, options: SolverOptions, context=None):
+        context = context or multiprocessing.get_context("spawn")
+        self.connection, self.child_connection = context.Pipe()
+        self.process = context.Process(target=run_worker, args=(self.child_connection, options), daemon=True)
+        self.pool = ThreadPoolExecutor(max_workers=1)
+        self.sessions = 0
+
+    def start(self):
+        self.process.start()
+        # the parent keeps no end of the child, so a reply of an exited process is EOF and not a hang
+        self.child_connection.close()
+
+    def request(self, name: str, *args, **kwargs) -> Tuple[bool, Any, List[Hashable]]:
+        """Returns whether the request succeeded, its result or error and keys of sessions evicted handling it."""
+
+        try:
+            self.connection.send((name, args, kwargs))
+            return self.connection.recv()
+        except (EOFError, OSError) as e:
+            raise WorkerError(f"Worker process {self.process.pid} exited") from e
+
+    async def arequest(self, name: str, *args, **kwargs) -> Tuple[bool, Any, List[Hashable]]:
+        return await asyncio.get_running_loop().run_in_executor(self.pool, partial(self.request, name, *args, **kwargs))
+
+    def close(self):
+        if self.process.is_alive():
+            try:
+                self.pool.submit(self.connection.send, None).result()
+            except OSError:
+                logger.warning("Worker process %s exited before it was closed", self.process.pid)
+            self.process.join(timeout=60)
+        self.connection.close()
+        self.pool.shutdown(wait=False)
+
+
+class ProcessSolverExecutor(SolverExecutor):
+    """Runs temporal solvers in worker processes, each worker owns the solvers of its sessions.
+
+    A session is assigned to the worker with the least sessions when it is created, so the event loop
+    only forwards requests and results. Worker processes are started on the first request, or on creation
+    with ``options.preload_dir`` set, each of them preloads artifacts to its own cache.
+    """
+
+    workers: List[SolverWorker]
+    owners: Dict[Hashable, SolverWorker]
+
+    def __init__(self, options: SolverOptions, workers: int = None):
+        self.workers = [SolverWorker(options) for _ in range(workers or os.cpu_count() or 1)]
+        self.owners = {}
+        self.started = False
+        super().__init__(options)
+
+    def preload(self):
+        self.start()
+
+    def start(self):
+        if not self.started:
+            for worker in self.workers:
+                worker.start()
+            self.started = True
+
+    def select_worker(self, key: Hashable) -> SolverWorker:
+        return min(self.workers, key=lambda worker: worker.sessions)
+
+    async def request(self, worker: SolverWorker, name: str, *args, **kwargs) -> Any:
+        ok, result, evicted = await worker.arequest(name, *args, **kwargs)
+        for key in evicted:
+            if self.owners.get(key) is worker:
+                del self.owners[key]
+                worker.sessions -= 1
+        self.evicted.extend(evicted)
+        if not ok:
+            raise rebuild_error(*result)
+        return result
+
+    def get_owner(self, key: Hashable) -> SolverWorker:
+        worker = self.owners.get(key)
+        if worker is None and self.hibernation is not None and self.hibernation.has(key):
+            self.start()
+            worker = self.owners[key] = self.select_worker(key)
+            worker.sessions += 1
+        if worker is None:
+            raise ValueError("Temporal solver for provided token or user id is not created")
+        return worker
+
+    def get_solver(self, key: Hashable) -> TemporalSolver:
+        raise ValueError("Temporal solvers are owned by worker processes")
+
+    def has_session(self, key: Hashable) -> bool:
+        return key in self.owners or (self.hibernation is not None and self.hibernation.has(key))
+
+    async def create(self, key: Hashable, kb_data: KBData) -> bool:
+        self.start()
+        worker = self.owners.get(key) or self.select_worker(key)
+        result = await self.request(worker, "create_session", key, kb_data)
+        if key not in self.owners:
+            worker.sessions += 1
+            self.owners[key] = worker
+        return result
+
+    async def call(self, key: Hashable, name: str, *args, **kwargs) -> Any:
+        return await self.request(self.get_owner(key), "call_session", key, name, *args, **kwargs)
+
+    async def sweep(self) -> Tuple[List[Hashable], EvictionMetrics]:
+        if not self.started:
+            return [], EvictionMetrics()
+        evicted = []
+        metrics = EvictionMetrics()
+        for worker in self.workers:
+            worker_evicted, worker_metrics = await self.request(worker, "sweep_sessions")
+            for key in worker_evicted:
+                if self.hibernation is None and self.owners.pop(key, None) is not None:
+                    worker.sessions -= 1
+            evicted.extend(worker_evicted)
+            metrics = metrics.merge(worker_metrics)
+        return evicted, metrics
+
+    def close(self):
+        if self.started:
+            for worker in self.workers:
+                worker.close()
+
+
+def get_shard(key: Hashable, shards: int) -> int:
+    return zlib.crc32(str(key).encode("utf-8")) % shards
+
+
+class ShardedSolverExecutor(ProcessSolverExecutor):
+    """Runs temporal solvers in worker processes, sessions are routed to workers by a stable hash of their key.
+
+    The owner of a session does not depend on the order sessions are configured in, so requests are
+    forwarded by the key alone and a worker reports sessions it does not own.
+    """
+
+    def select_worker(self, key: Hashable) -> SolverWorker:
+        return self.workers[get_shard(key, len(self.workers))]
+
+    def get_owner(self, key: Hashable) -> SolverWorker:
+        self.start()
+        return self.select_worker(key)
+
+
+EXECUTOR_MODES = ["inline", "thread", "process", "sharded"]
+
+
+def create_executor(
+    mode: str, options: SolverOptions, solvers: SessionStore = None, workers: int = None
+) -> SolverExecutor:
+    if mode == "inline":
+        return SolverExecutor(options, solvers)
+    elif mode == "thread":
+        return ThreadSolverExecutor(options, solvers, workers=workers)
+    elif mode == "process":
+        return ProcessSolverExecutor(options, workers=workers)
+    elif mode == "sharded":
+        return ShardedSolverExecutor(options, workers=workers)
+    raise ValueError(f"Unknown executor mode: {mode}")
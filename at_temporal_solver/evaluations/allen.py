@@ -27,6 +27,9 @@ class ModifiedBasicEvaluator(BasicEvaluator):
     temporal_solver: "TemporalSolver"
 
     def eval(self, v: Evaluatable | AllenEvaluatable, ref_stack: List[KBReference] = None) -> KBValue:
+        compiler = self.temporal_solver.compiler
+        if compiler is not None:
+            return SimpleValue(content=compiler.compile(v)(self.wm, self.temporal_solver))
         if not isinstance(v, AllenEvaluatable):
             return super().eval(v, ref_stack)
         evaluator = AllenEvaluator(temporal_solver=self.temporal_solver)
@@ -53,13 +56,11 @@ class AllenEvaluator:
             if operation.id == "ДЛИТЕЛЬНОСТЬ" and isinstance(instance, IntervalInstance) and instance.closed:
                 return SimpleValue(content=instance.close_tact - instance.open_tact)
             elif operation.id == "КОЛ_ВОЗН" and isinstance(instance, EventInstance):
-                return SimpleValue(content=len(self.get_all_instances(operation.ref)))
+                return SimpleValue(content=self.count_instances(operation.ref))
             elif operation.id == "КОЛ_НАЧ" and isinstance(instance, IntervalInstance):
-                return SimpleValue(content=len(self.get_all_instances(operation.ref)))
+                return SimpleValue(content=self.count_instances(operation.ref))
             elif operation.id == "КОЛ_ОКОНЧ" and isinstance(instance, IntervalInstance):
-                return SimpleValue(
-                    content=len([interval for interval in self.get_all_instances(operation.ref) if interval.closed])
-                )
+                return SimpleValue(content=self.count_instances(operation.ref, closed_only=True))
             elif operation.id == "ТАКТ_НАЧ" and isinstance(instance, IntervalInstance):
                 return SimpleValue(content=instance.open_tact)
             elif operation.id == "ТАКТ_ОКОНЧ" and isinstance(instance, IntervalInstance):
@@ -85,6 +86,8 @@ class AllenEvaluator:
 
             return ALLEN_EVALUATORS[operation.sign](left_section, right_section)
 
+        return SimpleValue(content=None)
+
     def get_section(self, orig: Union[EventInstance, IntervalInstance]) -> TimeSection:
         if isinstance(orig, IntervalInstance):
             return TimeSection(
@@ -101,12 +104,22 @@ class AllenEvaluator:
         elif isinstance(ref.target, KBInterval):
             return self.temporal_solver.timeline.get_all_interval_instances(ref)
 
+    def count_instances(self, ref: AllenReference, closed_only: bool = False) -> int:
+        timeline = self.temporal_solver.timeline
+        if isinstance(ref.target, KBEvent):
+            return timeline.count_event_instances(ref)
+        elif isinstance(ref.target, KBInterval):
+            if closed_only:
+                return timeline.count_closed_interval_instances(ref)
+            return timeline.count_interval_instances(ref)
+        return 0
+
     def get_instance(self, ref: AllenReference) -> Union[EventInstance, IntervalInstance, None]:
         index = -1
         if ref.index:
             m_evaluator = ModifiedBasicEvaluator(wm=self.temporal_solver.wm, temporal_solver=self.temporal_solver)
-            index = m_evaluator.eval(ref.index).to_simple()
-            if index.content is None:
+            index = m_evaluator.eval(ref.index).to_simple().content
+            if index is None:
                 return None
         if isinstance(ref.target, KBEvent):
             return self.temporal_solver.timeline.get_event_instance(ref, index)
@@ -151,7 +164,7 @@ def eval_f(left: TimeSection, right: TimeSection, *args, **kwargs) -> KBValue:
 
 
 def eval_fi(left: TimeSection, right: TimeSection, *args, **kwargs) -> KBValue:
-    return eval_fi(left=right, right=left)
+    return eval_f(left=right, right=left)
 
 
 def eval_d(left: TimeSection, right: TimeSection, *args, **kwargs) -> KBValue:
@@ -0,0 +1,104 @@
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import Sequence
+
+from at_krl.core.simple.simple_value import SimpleValue
+from at_krl.core.temporal.allen_evaluatable import AllenEvaluatable
+from at_krl.core.temporal.allen_operation import AllenOperation
+
+from at_temporal_solver.evaluations.allen import AllenEvaluator
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover - numpy is optional
+    numpy = None
+
+BATCH_THRESHOLD = 64
+
+Relation = Callable[..., object]
+
+# Relations over section bounds (left open, left close, right open, right close). Bitwise operators
+# are used, so the same functions evaluate both python integers and numpy arrays.
+BATCH_RELATIONS: Dict[str, Relation] = {
+    "b": lambda lo, lc, ro, rc: lc < ro,
+    "bi": lambda lo, lc, ro, rc: rc < lo,
+    "m": lambda lo, lc, ro, rc: lc == ro,
+    "mi": lambda lo, lc, ro, rc: rc == lo,
+    "a": lambda lo, lc, ro, rc: rc < lo,
+    "ai": lambda lo, lc, ro, rc: lc < ro,
+    "s": lambda lo, lc, ro, rc: (lo == ro) & (lc < rc),
+    "si": lambda lo, lc, ro, rc: (ro == lo) & (rc < lc),
+    "f": lambda lo, lc, ro, rc: (lc == rc) & (lo > ro),
+    "fi": lambda lo, lc, ro, rc: (rc == lc) & (ro > lo),
+    "d": lambda lo, lc, ro, rc: (lo > ro) & (lc < rc),
+    "di": lambda lo, lc, ro, rc: (ro > lo) & (rc < lc),
+    "o": lambda lo, lc, ro, rc: (lo < ro) & (lc > ro) & (lc < rc),
+    "oi": lambda lo, lc, ro, rc: (ro < lo) & (rc > lo) & (rc < lc),
+    "e": lambda lo, lc, ro, rc: (lo == ro) & (lc == rc),
+}
+
+
+class AllenBatchEvaluator(AllenEvaluator):
+    """Evaluates many Allen operations of a tact at once.
+
+    Sections of all operands are gathered into open and close columns and every relation is computed
+    for all operations with its sign by a single vectorized comparison when numpy is installed, with
+    the ``at-temporal-solver[numpy]`` extra, and the batch has at least ``threshold`` operations.
+    Otherwise relations are compared one by one.
+    Results are the same as of ``AllenEvaluator.eval``. Operations other than ``AllenOperation`` are
+    evaluated by ``AllenEvaluator``.
+    """
+
+    threshold: int
+
+    def __init__(self, temporal_solver, threshold: int = BATCH_THRESHOLD):
+        super().__init__(temporal_solver)
+        self.threshold = threshold
+
+    def eval_all(self, operations: Sequence[AllenEvaluatable]) -> List[SimpleValue]:
+        results: List[SimpleValue] = [None] * len(operations)
+        positions: Dict[str, List[int]] = {}
+        columns = ([], [], [], [])
+
+        for i, operation in enumerate(operations):
+            if not isinstance(operation, AllenOperation) or operation.sign not in BATCH_RELATIONS:
+                results[i] = self.eval(operation)
+                continue
+            left_instance = self.get_instance(operation.left)
+            right_instance = self.get_instance(operation.right)
+            if left_instance is None or right_instance is None:
+                results[i] = SimpleValue(content=None)
+                continue
+            left = self.get_section(left_instance)
+            right = self.get_section(right_instance)
+            positions.setdefault(operation.sign, []).append(len(columns[0]))
+            for column, bound in zip(columns, (left.open, left.close, right.open, right.close)):
+                column.append(bound)
+            results[i] = len(columns[0]) - 1
+
+        if numpy is not None and len(columns[0]) >= self.threshold:
+            values = self.compare_vectorized(columns, positions)
+        else:
+            values = self.compare(columns, positions)
+
+        return [SimpleValue(content=values[result]) if isinstance(result, int) else result for result in results]
+
+    @staticmethod
+    def compare(columns, positions: Dict[str, List[int]]) -> List[bool]:
+        values = [None] * len(columns[0])
+        lo, lc, ro, rc = columns
+        for sign, rows in positions.items():
+            relation = BATCH_RELATIONS[sign]
+            for row in rows:
+                values[row] = relation(lo[row], lc[row], ro[row], rc[row])
+        return values
+
+    @staticmethod
+    def compare_vectorized(columns, positions: Dict[str, List[int]]) -> List[bool]:
+        values = numpy.zeros(len(columns[0]), dtype=bool)
+        arrays = [numpy.asarray(column, dtype=numpy.int64) for column in columns]
+        for sign, rows in positions.items():
+            rows = numpy.asarray(rows, dtype=numpy.intp)
+            values[rows] = BATCH_RELATIONS[sign](*(array[rows] for array in arrays))
+        return values.tolist()
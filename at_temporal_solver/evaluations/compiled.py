@@ -0,0 +1,138 @@
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import Optional
+from typing import TYPE_CHECKING
+
+from at_krl.core.simple.simple_evaluatable import SimpleEvaluatable
+from at_krl.core.simple.simple_operation import SimpleOperation
+from at_krl.core.simple.simple_reference import SimpleReference
+from at_krl.core.simple.simple_value import SimpleValue
+from at_krl.core.temporal.allen_evaluatable import AllenEvaluatable
+
+from at_temporal_solver.evaluations.allen import AllenEvaluator
+from at_temporal_solver.evaluations.simple import SimpleEvaluator
+from at_temporal_solver.evaluations.simple import unify_number
+
+if TYPE_CHECKING:
+    from at_solver.core.wm import WorkingMemory
+
+    from at_temporal_solver.core.at_temporal_solver import TemporalSolver
+
+CompiledExpression = Callable[["WorkingMemory", Optional["TemporalSolver"]], Any]
+
+
+OPERATIONS: Dict[str, Callable[..., Any]] = {
+    "eq": lambda left, right: left == right,
+    "gt": lambda left, right: left > right,
+    "ge": lambda left, right: left >= right,
+    "lt": lambda left, right: left < right,
+    "le": lambda left, right: left <= right,
+    "ne": lambda left, right: left != right,
+    "and": lambda left, right: left and right,
+    "or": lambda left, right: left or right,
+    "not": lambda v: not v,
+    "xor": lambda left, right: (left and not right) or (right and not left),
+    "neg": lambda v: -1 * unify_number(v),
+    "add": lambda left, right: left + right,
+    "sub": lambda left, right: left - right,
+    "mul": lambda left, right: unify_number(left) * unify_number(right),
+    "div": lambda left, right: unify_number(left) / unify_number(right),
+    "mod": lambda left, right: unify_number(left) % unify_number(right),
+    "pow": lambda left, right: unify_number(left) ** unify_number(right),
+}
+
+
+def get_value_content(wm: "WorkingMemory", value: SimpleEvaluatable, ref: SimpleReference = None) -> Any:
+    if value is None:
+        return None
+    elif isinstance(value, SimpleValue):
+        return value.to_simple().content
+    return SimpleEvaluator(wm).eval(value, ref_stack=[ref] if ref is not None else None).content
+
+
+class ExpressionCompiler:
+    """Compiles KB expressions into closures returning the expression value content.
+
+    Compiled expressions give the same results as ``SimpleEvaluator`` (``AllenEvaluator`` for Allen
+    operations when a temporal solver is passed). An operation with an unknown operand is unknown, so
+    ``and`` and ``or`` do not short-circuit: a known result would differ from the interpreted one once
+    it is negated or compared.
+    """
+
+    compiled: Dict[int, CompiledExpression]
+
+    def __init__(self):
+        self.compiled = {}
+
+    def get(self, v: SimpleEvaluatable) -> Optional[CompiledExpression]:
+        return self.compiled.get(id(v))
+
+    def compile(self, v: SimpleEvaluatable) -> CompiledExpression:
+        compiled = self.compiled.get(id(v))
+        if compiled is None:
+            compiled = self._compile(v)
+            if v is not None:
+                self.compiled[id(v)] = compiled
+        return compiled
+
+    def _compile(self, v: SimpleEvaluatable) -> CompiledExpression:
+        if v is None:
+            return lambda wm, temporal_solver=None: None
+        elif isinstance(v, SimpleValue):
+            content = v.to_simple().content
+            return lambda wm, temporal_solver=None: content
+        elif isinstance(v, AllenEvaluatable):
+            return self._compile_allen(v)
+        elif isinstance(v, SimpleReference):
+            return self._compile_reference(v)
+        elif isinstance(v, SimpleOperation):
+            return self._compile_operation(v)
+        return lambda wm, temporal_solver=None: SimpleEvaluator(wm).eval(v).content
+
+    def _compile_allen(self, v: AllenEvaluatable) -> CompiledExpression:
+        def allen(wm, temporal_solver=None):
+            if temporal_solver is None:
+                return SimpleEvaluator(wm).eval(v).content
+            result = AllenEvaluator(temporal_solver).eval(v)
+            return result.content if result is not None else None
+
+        return allen
+
+    def _compile_reference(self, v: SimpleReference) -> CompiledExpression:
+        local_key = v.to_simple().krl
+
+        def reference(wm, temporal_solver=None):
+            instance = wm.get_instance_by_ref(v)
+            if instance is not None:
+                return get_value_content(wm, instance.value, v)
+            return get_value_content(wm, wm.locals.get(local_key))
+
+        return reference
+
+    def _compile_operation(self, v: SimpleOperation) -> CompiledExpression:
+        operation = OPERATIONS[v.operation_name]
+        left = self.compile(v.left)
+
+        if not v.is_binary:
+
+            def unary(wm, temporal_solver=None):
+                value = left(wm, temporal_solver)
+                if value is None:
+                    return None
+                return operation(value)
+
+            return unary
+
+        right = self.compile(v.right)
+
+        def binary(wm, temporal_solver=None):
+            left_value = left(wm, temporal_solver)
+            if left_value is None:
+                return None
+            right_value = right(wm, temporal_solver)
+            if right_value is None:
+                return None
+            return operation(left_value, right_value)
+
+        return binary
@@ -105,7 +105,7 @@ def eval_not(v: SimpleValue, *args, **kwargs) -> SimpleValue:
 
 
 def eval_xor(left: SimpleValue, right: SimpleValue) -> SimpleValue:
-    content = (left.content and not right.content) or (right and not left.content)
+    content = (left.content and not right.content) or (right.content and not left.content)
     return SimpleValue(content=content)
 
 
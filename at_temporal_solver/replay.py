@@ -0,0 +1,54 @@
+from dataclasses import dataclass
+from typing import Dict
+from typing import IO
+from typing import Iterable
+from typing import Iterator
+from typing import List
+import json
+import time
+
+from at_temporal_solver.core.at_temporal_solver import TemporalSolver
+
+
+@dataclass(kw_only=True)
+class ReplayStats:
+    tacts: int
+    seconds: float
+
+    @property
+    def tacts_per_second(self) -> float:
+        return self.tacts / self.seconds if self.seconds else 0.0
+
+
+def read_wm_stream(lines: Iterable[str]) -> Iterator[List[Dict]]:
+    """Reads working memory items of tacts from JSON lines, one list of items per line."""
+
+    for number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        items = json.loads(line)
+        if not isinstance(items, list):
+            raise ValueError(f"Line {number}: expected a list of working memory items")
+        yield items
+
+
+def replay(
+    solver: TemporalSolver,
+    batches: Iterable[List[Dict]],
+    output: IO[str] = None,
+    delta: bool = True,
+    clear_before: bool = True,
+) -> ReplayStats:
+    """Processes a tact for each of ``batches`` and writes tact results to ``output`` as JSON lines."""
+
+    tacts = 0
+    started = time.perf_counter()
+    for items in batches:
+        solver.update_wm(items, clear_before=clear_before)
+        solver.process_tact()
+        tacts += 1
+        if output is not None:
+            output.write(json.dumps(solver.get_result(delta=delta), ensure_ascii=False, default=str))
+            output.write("\n")
+    return ReplayStats(tacts=tacts, seconds=time.perf_counter() - started)
@@ -0,0 +1,57 @@
+"""Compares two result files of ``benchmarks.tact_latency`` by median latencies.
+
+Run as ``python -m benchmarks.compare BASELINE.json CURRENT.json [--threshold 0.1]``, exits with 1 when any
+phase of a scenario is slower than the baseline by more than the threshold.
+"""
+from typing import Dict
+from typing import List
+from typing import Tuple
+import argparse
+import json
+import sys
+
+from benchmarks.tact_latency import PHASES
+
+
+def load_report(path: str) -> Dict:
+    with open(path, encoding="utf-8") as file:
+        return json.load(file)
+
+
+def compare_reports(baseline: Dict, current: Dict, threshold: float = 0.1) -> List[Tuple[str, str, float, float, bool]]:
+    """Returns ``(scenario, phase, baseline median, current median, regressed)`` for scenarios of both reports.
+
+    Whole runs are compared, so runs with different numbers of tacts are not comparable.
+    """
+
+    if baseline.get("format") != current.get("format"):
+        raise ValueError("Reports of different formats are not comparable")
+    rows = []
+    for name, result in current["scenarios"].items():
+        base = baseline["scenarios"].get(name)
+        if base is None or base["config"] != result["config"] or base["tacts"] != result["tacts"]:
+            continue
+        for phase in PHASES:
+            before, after = base["total"][phase]["median"], result["total"][phase]["median"]
+            rows.append((name, phase, before, after, after > before * (1 + threshold)))
+    return rows
+
+
+def main(baseline: str, current: str, threshold: float = 0.1) -> int:
+    rows = compare_reports(load_report(baseline), load_report(current), threshold)
+    print(f"{'scenario':<10} {'phase':<38} {'baseline, ms':>13} {'current, ms':>12} {'change':>8}")
+    for name, phase, before, after, regressed in rows:
+        change = after / before - 1 if before else 0.0
+        print(
+            f"{name:<10} {phase:<38} {before * 1000:>13.3f} {after * 1000:>12.3f} {change:>+8.1%}"
+            + (" regression" if regressed else "")
+        )
+    return int(any(row[-1] for row in rows))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("baseline", help="Results of the previous release")
+    parser.add_argument("current", help="Results to check")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Allowed slowdown of median latencies")
+    sys.exit(main(**vars(parser.parse_args())))
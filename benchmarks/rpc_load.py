@@ -0,0 +1,250 @@
+"""Load test of the ``ATTemporalSolver`` component through an in-process stand-in of the message broker.
+
+Run as ``python -m benchmarks.rpc_load [--sessions 100] [--tacts 50] [--output results.json]``, RabbitMQ is not
+needed. Simulated clients configure their sessions with a synthetic knowledge base and then update the working
+memory and process tacts concurrently, resetting sessions periodically.
+"""
+from dataclasses import dataclass
+from dataclasses import field
+from typing import Any
+from typing import Dict
+from typing import List
+import argparse
+import asyncio
+import json
+import time
+
+from at_queue.core.session import ConnectionParameters
+
+from at_temporal_solver.core.component import ATTemporalSolver
+from at_temporal_solver.core.workers import EXECUTOR_MODES
+from benchmarks.synthetic import generate_kb
+from benchmarks.synthetic import generate_wm_stream
+from benchmarks.tact_latency import FORMAT_VERSION
+from benchmarks.tact_latency import get_environment
+from benchmarks.tact_latency import SCENARIOS
+from benchmarks.tact_latency import summarize
+
+COMPONENT_NAME = "ATTemporalSolver"
+
+
+@dataclass(kw_only=True)
+class LocalConfigItem:
+    data: Any
+
+
+@dataclass(kw_only=True)
+class LocalConfig:
+    """Component configuration in the shape read by ``ATTemporalSolver.get_kb_data_from_config``."""
+
+    items: Dict[str, LocalConfigItem]
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "LocalConfig":
+        return cls(items={name: LocalConfigItem(data=item["data"]) for name, item in data["items"].items()})
+
+
+class LocalBroker:
+    """Delivers method calls to registered components in process, in place of RabbitMQ and ``at_queue``.
+
+    Requests and responses are encoded to JSON like broker messages. Every component consumes its own queue
+    and processes each delivered message in a separate task.
+    """
+
+    components: Dict[str, Any]
+    queues: Dict[str, asyncio.Queue]
+    consumers: List[asyncio.Task]
+
+    def __init__(self):
+        self.components = {}
+        self.queues = {}
+        self.consumers = []
+        self.message_bytes = 0
+
+    def register(self, name: str, component: Any):
+        self.components[name] = component
+        self.queues[name] = asyncio.Queue()
+        self.consumers.append(asyncio.create_task(self.consume(name)))
+
+    async def call(self, reciever: str, method: str, args: dict, auth_token: str = None) -> Any:
+        body = json.dumps({"method": method, "args": args, "auth_token": auth_token})
+        self.message_bytes += len(body)
+        response = asyncio.get_running_loop().create_future()
+        await self.queues[reciever].put((body, response))
+        result = await response
+        self.message_bytes += len(result)
+        return json.loads(result)
+
+    async def consume(self, name: str):
+        component, queue = self.components[name], self.queues[name]
+        tasks = set()
+        while True:
+            body, response = await queue.get()
+            task = asyncio.create_task(self.deliver(component, body, response))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+    async def deliver(self, component: Any, body: str, response: asyncio.Future):
+        message = json.loads(body)
+        try:
+            result = await getattr(component, message["method"])(**message["args"], auth_token=message["auth_token"])
+            response.set_result(json.dumps(result, default=str))
+        except Exception as e:
+            response.set_exception(e)
+
+    async def close(self):
+        for consumer in self.consumers:
+            consumer.cancel()
+        await asyncio.gather(*self.consumers, return_exceptions=True)
+
+
+class LocalATTemporalSolver(ATTemporalSolver):
+    """Temporal solver component connected to a ``LocalBroker`` instead of RabbitMQ.
+
+    Auth tokens are used as user ids like without an authentication service.
+    """
+
+    broker: LocalBroker
+
+    def __init__(self, broker: LocalBroker, *args, **kwargs):
+        super().__init__(ConnectionParameters(), *args, **kwargs)
+        self.broker = broker
+
+    async def configurate(self, config: dict, auth_token: str = None) -> bool:
+        return await self.perform_configurate(LocalConfig.from_dict(config), auth_token=auth_token)
+
+    async def get_user_id_or_token(self, auth_token: str, raize_on_failed: bool = True) -> str:
+        return auth_token
+
+    async def exec_external_method(self, reciever: str, methode_name: str, method_args: dict, auth_token: str = None):
+        return await self.broker.call(reciever, methode_name, method_args, auth_token=auth_token)
+
+
+@dataclass(kw_only=True)
+class LoadStats:
+    latencies: Dict[str, List[float]] = field(default_factory=dict)
+    errors: Dict[str, int] = field(default_factory=dict)
+    loop_lags: List[float] = field(default_factory=list)
+
+    async def call(self, broker: LocalBroker, method: str, args: dict, auth_token: str) -> Any:
+        started = time.perf_counter()
+        try:
+            return await broker.call(COMPONENT_NAME, method, args, auth_token=auth_token)
+        except Exception:
+            self.errors[method] = self.errors.get(method, 0) + 1
+        finally:
+            self.latencies.setdefault(method, []).append(time.perf_counter() - started)
+
+
+async def monitor_loop_lag(lags: List[float], interval: float = 0.01):
+    """Records how much later than scheduled the event loop wakes a sleeping task."""
+
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(interval)
+        lags.append(max(0.0, loop.time() - started - interval))
+
+
+async def run_client(
+    broker: LocalBroker, stats: LoadStats, token: str, kb: dict, batches: List[List[Dict]], reset_every: int = None
+):
+    await stats.call(broker, "configurate", {"config": {"items": {"kb": {"data": kb}}}}, token)
+    for tact, items in enumerate(batches, start=1):
+        await stats.call(broker, "update_wm", {"items": items}, token)
+        await stats.call(broker, "process_tact", {"delta": True}, token)
+        if reset_every and tact % reset_every == 0:
+            await stats.call(broker, "reset", {}, token)
+
+
+async def run_load(
+    scenario: str = "small",
+    sessions: int = 100,
+    tacts: int = 50,
+    reset_every: int = None,
+    executor: str = "inline",
+    workers: int = None,
+    lag_interval: float = 0.01,
+) -> Dict:
+    """Runs ``sessions`` concurrent clients of one component and returns throughput and latency statistics."""
+
+    config = SCENARIOS[scenario]
+    kb = generate_kb(config)
+    streams = [list(generate_wm_stream(config, tacts, seed=session)) for session in range(sessions)]
+
+    broker = LocalBroker()
+    component = LocalATTemporalSolver(broker, executor=executor, workers=workers, sweep_interval=None)
+    broker.register(COMPONENT_NAME, component)
+    stats = LoadStats()
+    monitor = asyncio.create_task(monitor_loop_lag(stats.loop_lags, lag_interval))
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(
+            *(
+                run_client(broker, stats, f"session-{session}", kb, stream, reset_every=reset_every)
+                for session, stream in enumerate(streams)
+            )
+        )
+        seconds = time.perf_counter() - started
+    finally:
+        monitor.cancel()
+        await broker.close()
+        component.executor.close()
+
+    calls = sum(len(latencies) for latencies in stats.latencies.values())
+    return {
+        "scenario": scenario,
+        "config": config.to_dict(),
+        "sessions": sessions,
+        "tacts": tacts,
+        "reset_every": reset_every,
+        "executor": executor,
+        "workers": workers,
+        "seconds": seconds,
+        "calls": calls,
+        "calls_per_second": calls / seconds,
+        "tacts_per_second": sessions * tacts / seconds,
+        "message_bytes": broker.message_bytes,
+        "errors": stats.errors,
+        "methods": {
+            method: {"calls": len(latencies), **summarize(latencies)} for method, latencies in stats.latencies.items()
+        },
+        "loop_lag": summarize(stats.loop_lags) if stats.loop_lags else None,
+    }
+
+
+def print_report(result: Dict):
+    print(
+        f"{result['sessions']} sessions x {result['tacts']} tacts in {result['seconds']:.2f} s: "
+        f"{result['calls_per_second']:.1f} calls/s, {result['tacts_per_second']:.1f} tacts/s"
+    )
+    print(f"{'method':<16} {'calls':>8} {'p50, ms':>10} {'p99, ms':>10} {'max, ms':>10} {'errors':>7}")
+    for method, latency in [*result["methods"].items(), ("loop lag", result["loop_lag"])]:
+        if latency is None:
+            continue
+        print(
+            f"{method:<16} {latency.get('calls', ''):>8} {latency['median'] * 1000:>10.3f} "
+            f"{latency['p99'] * 1000:>10.3f} {latency['max'] * 1000:>10.3f} {result['errors'].get(method, 0):>7}"
+        )
+
+
+def main(output: str = None, **kwargs):
+    result = asyncio.run(run_load(**kwargs))
+    print_report(result)
+    if output:
+        report = {"format": FORMAT_VERSION, "environment": get_environment(), "load": result}
+        with open(output, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--scenario", choices=list(SCENARIOS), default="small")
+    parser.add_argument("--sessions", type=int, default=100, help="Number of concurrent client sessions")
+    parser.add_argument("--tacts", type=int, default=50, help="Number of tacts of every session")
+    parser.add_argument("--reset-every", type=int, help="Reset sessions after the given number of tacts")
+    parser.add_argument("--executor", choices=EXECUTOR_MODES, default="inline")
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--lag-interval", type=float, default=0.01, help="Seconds between event loop lag probes")
+    parser.add_argument("-o", "--output", help="JSON file to write results to")
+    main(**vars(parser.parse_args()))
@@ -0,0 +1,66 @@
+"""Measures the cold start of temporal solvers from knowledge base sources and from precompiled artifacts.
+
+Run as ``python -m benchmarks.startup KB_FILE [KB_FILE ...]``.
+"""
+from pathlib import Path
+from typing import Callable
+from typing import Dict
+from typing import List
+import argparse
+import statistics
+import tempfile
+import time
+
+from at_temporal_solver.core.artifacts import ARTIFACT_SUFFIX
+from at_temporal_solver.core.artifacts import KBArtifacts
+from at_temporal_solver.core.artifacts import KBCache
+from at_temporal_solver.core.artifacts import load_artifacts
+from at_temporal_solver.core.artifacts import save_artifacts
+from at_temporal_solver.core.at_temporal_solver import TemporalSolver
+from at_temporal_solver.core.kb import get_kb_hash
+from at_temporal_solver.core.kb import load_kb
+from at_temporal_solver.core.kb import read_kb_file
+
+
+def measure(func: Callable[[], object], repeat: int) -> float:
+    """Returns the median time of ``func`` calls in seconds."""
+
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - started)
+    return statistics.median(times)
+
+
+def bench_startup(path: str, repeat: int = 5) -> Dict[str, float]:
+    kb_data = read_kb_file(path)
+    artifacts = KBArtifacts.build(load_kb(kb_data), kb_hash=get_kb_hash(kb_data))
+    cache = KBCache()
+    cache.store(artifacts)
+    with tempfile.TemporaryDirectory() as directory:
+        artifact_path = Path(directory) / (Path(path).stem + ARTIFACT_SUFFIX)
+        save_artifacts(artifacts, artifact_path)
+        return {
+            "parse": measure(lambda: TemporalSolver(load_kb(read_kb_file(path))), repeat),
+            "artifact": measure(lambda: TemporalSolver.from_artifacts(load_artifacts(artifact_path)), repeat),
+            "cached": measure(lambda: TemporalSolver.from_artifacts(cache.get(kb_data)), repeat),
+            "artifact_bytes": artifact_path.stat().st_size,
+        }
+
+
+def main(kbs: List[str], repeat: int = 5):
+    print(f"{'knowledge base':<40} {'parse, ms':>10} {'artifact, ms':>13} {'cached, ms':>11} {'artifact, KB':>13}")
+    for path in kbs:
+        result = bench_startup(path, repeat=repeat)
+        print(
+            f"{Path(path).name:<40} {result['parse'] * 1000:>10.2f} {result['artifact'] * 1000:>13.2f} "
+            f"{result['cached'] * 1000:>11.2f} {result['artifact_bytes'] / 1024:>13.1f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("kbs", nargs="+", help="Knowledge base files (.xml, .json or .krl)")
+    parser.add_argument("--repeat", type=int, default=5, help="Number of measurements, the median is reported")
+    main(**vars(parser.parse_args()))
@@ -0,0 +1,176 @@
+"""Generators of synthetic knowledge bases and working memory streams for benchmarks."""
+from dataclasses import asdict
+from dataclasses import dataclass
+from typing import Any
+from typing import Dict
+from typing import Iterator
+from typing import List
+import random
+
+from at_temporal_solver.evaluations.allen_batch import BATCH_RELATIONS
+
+VALUE_RANGE = 100
+
+
+@dataclass(kw_only=True)
+class SyntheticKB:
+    """Sizes of a synthetic knowledge base.
+
+    ``objects`` instances of a class with ``attributes`` number properties are placed in ``world``.
+    Intervals and events have conditions on random attributes, ``allen_operations`` relations of random
+    events and intervals are spread over ``rules``, ``indexed`` of them refer to an earlier instance.
+    """
+
+    objects: int = 1
+    attributes: int = 10
+    intervals: int = 5
+    events: int = 5
+    rules: int = 10
+    allen_operations: int = 20
+    indexed: float = 0.25
+    seed: int = 0
+
+    @property
+    def refs(self) -> List[str]:
+        return [f"object{i}.attr{j}" for i in range(self.objects) for j in range(self.attributes)]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def ref(path: str) -> dict:
+    result = None
+    for id in reversed(path.split(".")):
+        result = {"tag": "ref", "id": id, "ref": result}
+    return result
+
+
+def value(content: Any) -> dict:
+    return {"tag": "value", "content": content}
+
+
+def operation(tag: str, left: dict, right: dict) -> dict:
+    return {"tag": tag, "left": left, "right": right}
+
+
+def allen_ref(id: str, index: int = None) -> dict:
+    return {"tag": "ref", "id": id, "index": value(index) if index is not None else None, "meta": "allen_reference"}
+
+
+def property_dict(id: str, type_id: str) -> dict:
+    return {
+        "tag": "property",
+        "id": id,
+        "type": {"tag": "ref", "id": type_id, "ref": None, "meta": "type_or_class"},
+        "desc": None,
+        "value": None,
+        "source": "asked",
+        "question": None,
+        "query": None,
+    }
+
+
+def conjunction(conditions: List[dict]) -> dict:
+    result = conditions[0]
+    for condition in conditions[1:]:
+        result = operation("and", result, condition)
+    return result
+
+
+def generate_kb(config: SyntheticKB) -> dict:
+    """Returns a knowledge base in the JSON format of ``KnowledgeBase.from_json``."""
+
+    rnd = random.Random(config.seed)
+    refs = config.refs
+    intervals = []
+    for i in range(config.intervals):
+        path = rnd.choice(refs)
+        threshold = rnd.randrange(VALUE_RANGE)
+        intervals.append(
+            {
+                "tag": "interval",
+                "id": f"INTERVAL{i}",
+                "group": "ИНТЕРВАЛ",
+                "desc": None,
+                "open": operation("lt", ref(path), value(threshold)),
+                "close": operation("ge", ref(path), value(threshold)),
+            }
+        )
+    events = [
+        {
+            "tag": "event",
+            "id": f"EVENT{i}",
+            "group": "СОБЫТИЕ",
+            "desc": None,
+            "occurance_condition": operation("gt", ref(rnd.choice(refs)), value(rnd.randrange(VALUE_RANGE))),
+        }
+        for i in range(config.events)
+    ]
+    entities = [interval["id"] for interval in intervals] + [event["id"] for event in events]
+
+    allen_conditions = [[] for _ in range(config.rules)]
+    signs = sorted(BATCH_RELATIONS)
+    for i in range(config.allen_operations if entities and config.rules else 0):
+        operands = [
+            allen_ref(rnd.choice(entities), rnd.choice([0, -2]) if rnd.random() < config.indexed else None)
+            for _ in range(2)
+        ]
+        allen_conditions[i % config.rules].append(operation(rnd.choice(signs), *operands))
+
+    rules = []
+    for i, conditions in enumerate(allen_conditions):
+        conditions = conditions + [operation("ge", ref(rnd.choice(refs)), value(rnd.randrange(VALUE_RANGE)))]
+        rules.append(
+            {
+                "tag": "rule",
+                "id": f"RULE{i}",
+                "condition": conjunction(conditions),
+                "instructions": [{"tag": "assign", "ref": ref(rnd.choice(refs)), "value": value(0)}],
+                "else_instructions": [],
+                "meta": "simple",
+                "period": None,
+                "desc": None,
+            }
+        )
+
+    return {
+        "tag": "knowledge-base",
+        "problem_info": None,
+        "types": [{"tag": "type", "id": "NUMBER", "desc": None, "meta": "number", "from": 0, "to": VALUE_RANGE}],
+        "classes": [
+            {
+                "tag": "class",
+                "id": "OBJECT",
+                "group": None,
+                "desc": None,
+                "properties": [property_dict(f"attr{j}", "NUMBER") for j in range(config.attributes)],
+                "rules": [],
+            },
+            *intervals,
+            *events,
+            {
+                "tag": "class",
+                "id": "world",
+                "group": None,
+                "desc": None,
+                "properties": [property_dict(f"object{i}", "OBJECT") for i in range(config.objects)],
+                "rules": rules,
+            },
+        ],
+    }
+
+
+def generate_wm_stream(config: SyntheticKB, tacts: int, changes: float = 0.1, seed: int = 0) -> Iterator[List[Dict]]:
+    """Yields working memory items of ``tacts`` tacts, a ``changes`` share of attributes changes at every tact.
+
+    Every tact contains all attributes, so the stream is replayed with ``clear_before``.
+    """
+
+    rnd = random.Random(seed)
+    refs = config.refs
+    values = {path: rnd.randrange(VALUE_RANGE) for path in refs}
+    changed = max(1, round(len(refs) * changes))
+    for _ in range(tacts):
+        for path in rnd.sample(refs, min(changed, len(refs))):
+            values[path] = rnd.randrange(VALUE_RANGE)
+        yield [{"ref": path, "value": content} for path, content in values.items()]
@@ -0,0 +1,166 @@
+"""Measures tact processing latency of temporal solvers on synthetic knowledge bases as the timeline grows.
+
+Run as ``python -m benchmarks.tact_latency [--scenario NAME ...] [--output results.json]``, results of two runs
+are compared by ``python -m benchmarks.compare``.
+"""
+from dataclasses import replace
+from importlib import metadata
+from typing import Callable
+from typing import Dict
+from typing import List
+import argparse
+import json
+import platform
+import statistics
+import time
+
+from at_temporal_solver.core.at_temporal_solver import TemporalSolver
+from at_temporal_solver.core.encoding import encode_result
+from at_temporal_solver.core.kb import load_kb
+from benchmarks.synthetic import generate_kb
+from benchmarks.synthetic import generate_wm_stream
+from benchmarks.synthetic import SyntheticKB
+
+FORMAT_VERSION = 2
+
+PHASES = [
+    "process_tact",
+    "build_timeline_tact",
+    "signify_temporal_operations_in_rules",
+    "serialize_json",
+    "serialize_msgpack",
+]
+
+SCENARIOS = {
+    "small": SyntheticKB(attributes=10, intervals=5, events=5, rules=10, allen_operations=20),
+    "medium": SyntheticKB(objects=5, attributes=10, intervals=25, events=25, rules=50, allen_operations=200),
+    "large": SyntheticKB(objects=10, attributes=20, intervals=100, events=100, rules=200, allen_operations=1000),
+}
+
+
+class PhaseTimer:
+    """Records durations of solver method calls by wrapping the methods of one solver instance."""
+
+    times: Dict[str, List[float]]
+
+    def __init__(self, solver: TemporalSolver, methods: List[str]):
+        self.times = {}
+        for method in methods:
+            setattr(solver, method, self.wrap(method, getattr(solver, method)))
+
+    def wrap(self, name: str, method: Callable) -> Callable:
+        times = self.times.setdefault(name, [])
+
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                times.append(time.perf_counter() - started)
+
+        return timed
+
+    def measure(self, name: str, func: Callable[[], object]) -> object:
+        return self.wrap(name, func)()
+
+
+def percentile(ordered: List[float], share: float) -> float:
+    return ordered[min(len(ordered) - 1, int(len(ordered) * share))]
+
+
+def summarize(times: List[float]) -> Dict[str, float]:
+    ordered = sorted(times)
+    return {
+        "mean": statistics.fmean(ordered),
+        "median": statistics.median(ordered),
+        "p95": percentile(ordered, 0.95),
+        "p99": percentile(ordered, 0.99),
+        "max": ordered[-1],
+    }
+
+
+def bench_tacts(
+    config: SyntheticKB, tacts: int = 1000, window: int = None, changes: float = 0.1, incremental: bool = True
+) -> Dict:
+    """Runs ``tacts`` tacts of a scripted working memory stream, latencies are summarized by windows of tacts.
+
+    The delta result of every tact is built once and serialized to JSON and to the compact msgpack encoding,
+    which requires the ``msgpack`` extra. Serialization phases do not include building the delta.
+    """
+
+    window = window or max(1, tacts // 10)
+    solver = TemporalSolver(load_kb(generate_kb(config)), incremental=incremental)
+    timer = PhaseTimer(solver, PHASES[:3])
+    for items in generate_wm_stream(config, tacts, changes=changes, seed=config.seed):
+        solver.update_wm(items)
+        solver.process_tact()
+        result = solver.get_result(delta=True)
+        timer.measure("serialize_json", lambda: json.dumps(result, default=str))
+        timer.measure("serialize_msgpack", lambda: encode_result(solver, result, "msgpack"))
+
+    windows = []
+    for start in range(0, tacts, window):
+        end = min(start + window, tacts)
+        windows.append({"tacts": [start, end], **{phase: summarize(timer.times[phase][start:end]) for phase in PHASES}})
+    return {
+        "config": config.to_dict(),
+        "tacts": tacts,
+        "changes": changes,
+        "incremental": incremental,
+        "total": {phase: summarize(timer.times[phase]) for phase in PHASES},
+        "windows": windows,
+    }
+
+
+def get_environment() -> Dict[str, str]:
+    try:
+        version = metadata.version("at-temporal-solver")
+    except metadata.PackageNotFoundError:
+        version = None
+    return {
+        "package_version": version,
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "started": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+
+def print_report(name: str, result: Dict):
+    print(f"{name}: {result['tacts']} tacts, median ms")
+    print(f"{'tacts':<14}" + "".join(f"{phase[:18]:>20}" for phase in PHASES))
+    for window in result["windows"]:
+        start, end = window["tacts"]
+        print(f"{f'{start}-{end}':<14}" + "".join(f"{window[phase]['median'] * 1000:>20.3f}" for phase in PHASES))
+
+
+def main(
+    scenarios: List[str] = None,
+    tacts: int = 1000,
+    window: int = None,
+    changes: float = 0.1,
+    seed: int = 0,
+    full: bool = False,
+    output: str = None,
+):
+    results = {}
+    for name in scenarios or list(SCENARIOS):
+        config = replace(SCENARIOS[name], seed=seed)
+        results[name] = bench_tacts(config, tacts=tacts, window=window, changes=changes, incremental=not full)
+        print_report(name, results[name])
+    if output:
+        report = {"format": FORMAT_VERSION, "environment": get_environment(), "scenarios": results}
+        with open(output, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--scenario", dest="scenarios", action="append", choices=list(SCENARIOS))
+    parser.add_argument("--tacts", type=int, default=1000, help="Number of tacts of every scenario")
+    parser.add_argument("--window", type=int, help="Number of tacts summarized together, tacts / 10 by default")
+    parser.add_argument("--changes", type=float, default=0.1, help="Share of attributes changed at every tact")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--full", action="store_true", help="Disable incremental signification")
+    parser.add_argument("-o", "--output", help="JSON file to write results to")
+    main(**vars(parser.parse_args()))
@@ -0,0 +1,40 @@
+from itertools import product
+
+import pytest
+
+from at_temporal_solver.evaluations.allen import ALLEN_EVALUATORS
+from at_temporal_solver.evaluations.allen import TimeSection
+from at_temporal_solver.evaluations.allen_batch import AllenBatchEvaluator
+from at_temporal_solver.evaluations.allen_batch import BATCH_RELATIONS
+
+
+def get_sections():
+    return [
+        TimeSection(open=open_tact, close=close_tact, orig=None)
+        for open_tact, close_tact in product(range(4), repeat=2)
+        if open_tact <= close_tact
+    ]
+
+
+def get_batch():
+    positions = {}
+    columns = ([], [], [], [])
+    expected = []
+    for sign, (left, right) in product(ALLEN_EVALUATORS, product(get_sections(), repeat=2)):
+        positions.setdefault(sign, []).append(len(expected))
+        for column, bound in zip(columns, (left.open, left.close, right.open, right.close)):
+            column.append(bound)
+        expected.append(ALLEN_EVALUATORS[sign](left, right).content)
+    return columns, positions, expected
+
+
+def test_batch_relations_match_scalar():
+    assert set(BATCH_RELATIONS) == set(ALLEN_EVALUATORS)
+    columns, positions, expected = get_batch()
+    assert AllenBatchEvaluator.compare(columns, positions) == expected
+
+
+def test_vectorized_relations_match_scalar():
+    pytest.importorskip("numpy")
+    columns, positions, expected = get_batch()
+    assert AllenBatchEvaluator.compare_vectorized(columns, positions) == expected
@@ -0,0 +1,80 @@
+import asyncio
+
+import pytest
+
+from at_temporal_solver.core.artifacts import KBArtifacts
+from at_temporal_solver.core.artifacts import KBCache
+from at_temporal_solver.core.artifacts import load_artifacts
+from at_temporal_solver.core.artifacts import save_artifacts
+from at_temporal_solver.core.at_temporal_solver import TemporalSolver
+from at_temporal_solver.core.kb import get_kb_hash
+from at_temporal_solver.core.kb import load_kb
+from at_temporal_solver.core.workers import create_executor
+from at_temporal_solver.core.workers import SolverOptions
+from tests.test_temporal_solver import get_kb
+from tests.test_temporal_solver import get_kb_dict
+from tests.test_temporal_solver import get_tacts
+from tests.test_temporal_solver import get_wm_items
+
+
+def test_kb_cache():
+    cache = KBCache(max_size=1)
+    artifacts = cache.get(get_kb_dict())
+    assert artifacts.kb_hash == get_kb_hash(get_kb_dict())
+    assert cache.get(get_kb_dict()) is artifacts
+    assert len(cache) == 1
+
+    async def get_concurrently():
+        other = get_kb_dict()
+        other["types"][0]["desc"] = "other"
+        return await asyncio.gather(*(cache.aget(other) for _ in range(4)))
+
+    others = asyncio.run(get_concurrently())
+    assert all(other is others[0] for other in others)
+    assert others[0] is not artifacts
+    assert artifacts.kb_hash not in cache and len(cache) == 1
+
+
+def test_shared_artifacts():
+    async def create():
+        executor = create_executor("inline", SolverOptions())
+        for key in ["first", "second"]:
+            await executor.create(key, get_kb_dict())
+        return executor
+
+    executor = asyncio.run(create())
+    first, second = executor.get_solver("first"), executor.get_solver("second")
+    assert first.kb is second.kb
+    assert first.artifacts is second.artifacts
+    assert first.condition_cache is not second.condition_cache
+
+    solver = TemporalSolver.from_artifacts(first.artifacts)
+    for tact in get_tacts():
+        first.update_wm(get_wm_items(tact))
+        first.process_tact()
+        solver.update_wm(get_wm_items(tact))
+        solver.process_tact()
+        assert first.get_result() == solver.get_result()
+    assert second.current_tact is None
+
+
+def test_precompiled_artifacts(tmp_path):
+    kb_hash = get_kb_hash(get_kb_dict())
+    save_artifacts(KBArtifacts.build(load_kb(get_kb_dict()), kb_hash=kb_hash), tmp_path / "kb.atkb")
+    (tmp_path / "broken.atkb").write_bytes(b"broken")
+    with pytest.raises(ValueError):
+        load_artifacts(tmp_path / "broken.atkb")
+
+    cache = KBCache()
+    assert cache.preload(tmp_path) == 1
+    artifacts = cache.get(get_kb_dict())
+    assert artifacts.kb_hash == kb_hash
+    assert all(condition.compiled is not None for condition in artifacts.conditions)
+
+    solver = TemporalSolver(get_kb())
+    loaded_solver = TemporalSolver.from_artifacts(artifacts)
+    for tact in get_tacts():
+        for current in [solver, loaded_solver]:
+            current.update_wm(get_wm_items(tact))
+            current.process_tact()
+        assert loaded_solver.get_result() == solver.get_result()
@@ -0,0 +1,60 @@
+import asyncio
+
+import pytest
+
+from at_temporal_solver.core.at_temporal_solver import TemporalSolver
+from at_temporal_solver.core.kb import load_kb
+from benchmarks import tact_latency
+from benchmarks.compare import compare_reports
+from benchmarks.synthetic import generate_kb
+from benchmarks.synthetic import generate_wm_stream
+from benchmarks.synthetic import SyntheticKB
+from benchmarks.tact_latency import bench_tacts
+from benchmarks.tact_latency import PHASES
+
+
+def test_synthetic_kb():
+    config = SyntheticKB(objects=2, attributes=5, rules=5, allen_operations=30, indexed=0.5)
+    assert generate_kb(config) == generate_kb(config)
+    solver = TemporalSolver(load_kb(generate_kb(config)))
+    stream = list(generate_wm_stream(config, 20, changes=0.3))
+    assert stream == list(generate_wm_stream(config, 20, changes=0.3))
+    for items in stream:
+        assert len(items) == len(config.refs)
+        solver.update_wm(items)
+        solver.process_tact()
+    assert len(solver.get_result()["signified"]) == config.allen_operations
+    assert solver.timeline.to_state()["intervals"]
+
+
+def test_tact_latency_report(monkeypatch):
+    pytest.importorskip("msgpack")
+    encoded = []
+    original = tact_latency.encode_result
+
+    def encode_result(solver, result, encoding):
+        encoded.append(result)
+        return original(solver, result, encoding)
+
+    monkeypatch.setattr(tact_latency, "encode_result", encode_result)
+    result = bench_tacts(SyntheticKB(), tacts=10, window=4)
+    assert len(encoded) == 10 and all(delta["wm"] for delta in encoded)
+    assert [window["tacts"] for window in result["windows"]] == [[0, 4], [4, 8], [8, 10]]
+    assert set(result["total"]) == set(PHASES)
+    report = {"scenarios": {"small": result}}
+    rows = compare_reports(report, report)
+    assert len(rows) == len(PHASES) and not any(row[-1] for row in rows)
+
+
+def test_rpc_load():
+    pytest.importorskip("at_queue")
+    from benchmarks.rpc_load import run_load
+
+    result = asyncio.run(run_load(sessions=4, tacts=6, reset_every=3))
+    assert result["errors"] == {}
+    assert {method: latency["calls"] for method, latency in result["methods"].items()} == {
+        "configurate": 4,
+        "update_wm": 24,
+        "process_tact": 24,
+        "reset": 8,
+    }
@@ -0,0 +1,79 @@
+import asyncio
+
+import pytest
+
+from at_temporal_solver.core.at_temporal_solver import TemporalSolver
+from at_temporal_solver.core.blackboard import BlackBoard
+from at_temporal_solver.core.blackboard import BlackBoardSync
+from at_temporal_solver.core.blackboard import InMemoryBlackBoard
+from tests.test_temporal_solver import get_kb
+from tests.test_temporal_solver import get_tacts
+from tests.test_temporal_solver import get_wm_items
+
+
+def test_in_memory_blackboard():
+    async def run():
+        blackboard = InMemoryBlackBoard([{"ref": "object1.attr1", "value": 1}, {"ref": "object1.attr2", "value": 2}])
+        changes = await blackboard.get_changed_items()
+        assert changes.full and len(changes.items) == 2
+
+        blackboard.set_items([{"ref": "object1.attr1", "value": 3}])
+        changed = await blackboard.get_changed_items(changes.cursor)
+        assert not changed.full
+        assert changed.items == [{"ref": "object1.attr1", "value": 3}]
+        assert (await blackboard.get_changed_items(changed.cursor)).items == []
+
+        blackboard.remove_items(["object1.attr2"])
+        removed = await blackboard.get_changed_items(changed.cursor)
+        assert removed.full
+        assert removed.items == [{"ref": "object1.attr1", "value": 3}]
+
+    asyncio.run(run())
+
+
+def test_blackboard_interface():
+    with pytest.raises(TypeError):
+        BlackBoard()
+
+
+def test_blackboard_sync():
+    async def run():
+        kb = get_kb()
+        blackboard = InMemoryBlackBoard()
+        sync = BlackBoardSync(blackboard)
+        solver = TemporalSolver(kb, incremental=True)
+        pulled_solver = TemporalSolver(kb, incremental=True)
+        pulls = []
+
+        async def apply(changes):
+            pulls.append((changes.full, len(changes.items)))
+            return solver.update_wm(changes.items, clear_before=changes.full)
+
+        for tact in get_tacts():
+            blackboard.set_items(item for item in get_wm_items(tact) if item["ref"] != "object1.attr3")
+            await sync.sync("key", apply)
+            solver.process_tact()
+            pulled_solver.update_wm(await blackboard.get_all_items())
+            pulled_solver.process_tact()
+            assert solver.get_result() == pulled_solver.get_result()
+
+        assert pulls[0] == (True, 2)
+        assert all(not full for full, _ in pulls[1:])
+
+        async def fail(changes):
+            raise RuntimeError()
+
+        with pytest.raises(RuntimeError):
+            await sync.sync("key", fail)
+        assert "key" not in sync.cursors
+        await sync.sync("key", apply)
+        assert pulls[-1] == (True, 2)
+
+        async def invalidated(changes):
+            sync.invalidate("key")
+            return await apply(changes)
+
+        await sync.sync("key", invalidated)
+        assert "key" not in sync.cursors
+
+    asyncio.run(run())
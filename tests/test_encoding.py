@@ -0,0 +1,74 @@
+import pytest
+
+from at_temporal_solver.core import encoding
+from at_temporal_solver.core.at_temporal_solver import TemporalSolver
+from at_temporal_solver.core.encoding import get_plain_value
+from tests.test_temporal_solver import get_kb
+from tests.test_temporal_solver import get_tacts
+from tests.test_temporal_solver import get_wm_items
+
+
+def test_result_projection():
+    solver = TemporalSolver(get_kb())
+    solver.update_wm(get_wm_items(get_tacts()[0]))
+    solver.process_tact()
+    assert set(solver.get_result(delta=True, fields=["signified"])) == {"sequence", "delta", "signified"}
+    assert set(solver.get_result(fields=["wm"])) == {"sequence", "delta", "wm"}
+    with pytest.raises(ValueError):
+        solver.get_result(fields=["unknown"])
+
+
+def plain(values: dict) -> dict:
+    return {key: get_plain_value(value) if hasattr(value, "content") else value for key, value in values.items()}
+
+
+def test_compact_results():
+    msgpack = pytest.importorskip("msgpack")
+    solver = TemporalSolver(get_kb())
+    compact_solver = TemporalSolver(get_kb())
+    symbols = []
+
+    def decode(data):
+        message = msgpack.unpackb(data, strict_map_key=False)
+        if message["reset"]:
+            symbols.clear()
+        symbols.extend(message["symbols"])
+        return message
+
+    for tact in get_tacts():
+        for current in [solver, compact_solver]:
+            current.update_wm(get_wm_items(tact))
+            current.process_tact()
+        expected = solver.get_result(delta=True)
+        message = decode(compact_solver.get_result(delta=True, encoding="msgpack"))
+        assert message["sequence"] == expected["sequence"]
+        assert {symbols[key]: value for key, value in message["wm"].items()} == expected["wm"]
+        assert {symbols[key]: value for key, value in message["signified"].items()} == plain(expected["signified"])
+        assert {
+            symbols[key]: {"rule": symbols[rule], "allen_operation": symbols[krl], "value": value}
+            for key, (rule, krl, value) in message["signified_meta"].items()
+        } == {key: plain(meta) for key, meta in expected["signified_meta"].items()}
+        assert [
+            {"interval": symbols[interval], "open_tact": open_tact, "close_tact": close_tact}
+            for interval, open_tact, close_tact in message["closed_intervals"]
+        ] == expected["closed_intervals"]
+        assert [symbols[event] for event in message["tact"][1]] == [
+            item["event"] for item in expected["tact"]["events"]
+        ]
+
+    message = decode(compact_solver.get_result(fields=["timeline"], encoding="msgpack"))
+    assert message["reset"]
+    assert set(message) == {"sequence", "delta", "timeline", "reset", "symbols"}
+    timeline = solver.timeline.to_state()
+    assert {symbols[key]: value for key, value in message["timeline"]["intervals"].items()} == timeline["intervals"]
+    with pytest.raises(ValueError):
+        compact_solver.get_result(encoding="xml")
+
+
+def test_msgpack_missing(monkeypatch):
+    monkeypatch.setattr(encoding, "msgpack", None)
+    solver = TemporalSolver(get_kb())
+    solver.update_wm(get_wm_items(get_tacts()[0]))
+    solver.process_tact()
+    with pytest.raises(ImportError, match=r"at-temporal-solver\[msgpack\]"):
+        solver.get_result(encoding="msgpack")
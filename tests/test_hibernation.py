@@ -0,0 +1,86 @@
+from copy import deepcopy
+import asyncio
+
+import pytest
+
+from at_temporal_solver.core.at_temporal_solver import TemporalSolver
+from at_temporal_solver.core.compact_timeline import CompactTimeline
+from at_temporal_solver.core.hibernation import HibernationStore
+from at_temporal_solver.core.sessions import EvictionPolicy
+from at_temporal_solver.core.timeline import Timeline
+from at_temporal_solver.core.workers import create_executor
+from at_temporal_solver.core.workers import SolverOptions
+from tests.test_temporal_solver import get_kb
+from tests.test_temporal_solver import get_kb_dict
+from tests.test_temporal_solver import get_tacts
+from tests.test_temporal_solver import get_wm_items
+
+
+def get_uncertain_wm_items(tact) -> list:
+    return [dict(item, belief=90, probability=70, accuracy=3) for item in get_wm_items(tact)]
+
+
+@pytest.mark.parametrize("timeline_class", [Timeline, CompactTimeline])
+@pytest.mark.parametrize("retention", [None, 2])
+def test_hibernate_and_restore(tmp_path, timeline_class, retention):
+    kb = get_kb()
+    tacts = get_tacts() * 3
+    solver = TemporalSolver(kb, timeline_class=timeline_class, retention=retention, incremental=True)
+    expected = []
+    for tact in tacts:
+        solver.update_wm(get_uncertain_wm_items(tact))
+        solver.process_tact()
+        expected.append(deepcopy(solver.get_result()))
+
+    store = HibernationStore(tmp_path)
+    kb_hash = store.save_kb(get_kb_dict())
+    hibernated = TemporalSolver(kb, timeline_class=timeline_class, retention=retention, incremental=True)
+    for index, tact in enumerate(tacts):
+        if index % 2:
+            store.save("session", hibernated, kb_hash)
+            hibernated, restored_kb_hash = store.load("session")
+            assert restored_kb_hash == kb_hash
+            assert not store.has("session")
+            assert hibernated.timeline.__dict__ == expected[index - 1]["timeline"]
+            assert hibernated.get_wm_items() == get_uncertain_wm_items(tacts[index - 1])
+        hibernated.update_wm(get_uncertain_wm_items(tact))
+        hibernated.process_tact()
+        result = hibernated.get_result()
+        assert result["timeline"] == expected[index]["timeline"]
+        assert result["signified_meta"] == expected[index]["signified_meta"]
+        assert result["sequence"] == expected[index]["sequence"]
+
+
+def test_executor_hibernates_evicted_sessions(tmp_path):
+    async def run():
+        options = SolverOptions(eviction=EvictionPolicy(max_sessions=1), hibernation_dir=str(tmp_path))
+        executor = create_executor("inline", options)
+        await executor.create("first", get_kb_dict())
+        await executor.call("first", "update_wm", get_wm_items(get_tacts()[0]))
+        first = await executor.call("first", "process_tact")
+
+        await executor.create("second", get_kb_dict())
+        assert "first" not in executor.solvers
+        assert executor.has_session("first")
+        assert await executor.call("first", "get_state") == first
+        assert "second" not in executor.solvers
+        executor.close()
+
+        restarted = create_executor("inline", options)
+        assert restarted.has_session("first")
+        assert await restarted.call("first", "get_state") == first
+
+    asyncio.run(run())
+
+
+def test_executor_drops_sessions_of_parsed_kbs(tmp_path):
+    async def run():
+        options = SolverOptions(eviction=EvictionPolicy(max_sessions=1), hibernation_dir=str(tmp_path))
+        executor = create_executor("inline", options)
+        assert await executor.create("first", get_kb())
+        await executor.create("second", get_kb_dict())
+        assert not executor.has_session("first")
+        executor.close()
+        assert not create_executor("inline", options).has_session("first")
+
+    asyncio.run(run())
@@ -0,0 +1,29 @@
+from io import StringIO
+import json
+
+from at_temporal_solver.core.at_temporal_solver import TemporalSolver
+from at_temporal_solver.replay import read_wm_stream
+from at_temporal_solver.replay import replay
+from tests.test_temporal_solver import get_kb
+from tests.test_temporal_solver import get_tacts
+from tests.test_temporal_solver import get_wm_items
+
+
+def test_replay():
+    kb = get_kb()
+    lines = [json.dumps(get_wm_items(tact)) for tact in get_tacts()]
+    output = StringIO()
+
+    stats = replay(TemporalSolver(kb, incremental=True), read_wm_stream(lines + [""]), output=output)
+    assert stats.tacts == len(lines)
+
+    solver = TemporalSolver(kb)
+    results = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert len(results) == len(lines)
+    for tact, result in zip(get_tacts(), results):
+        solver.update_wm(get_wm_items(tact))
+        solver.process_tact()
+        expected = solver.get_result(delta=True)
+        assert result["sequence"] == expected["sequence"]
+        assert result["tact"] == expected["tact"]
+        assert result["wm"] == expected["wm"]
@@ -0,0 +1,96 @@
+from at_temporal_solver.core.at_temporal_solver import TemporalSolver
+from at_temporal_solver.core.at_temporal_solver import WM_VALUE_BYTES
+from at_temporal_solver.core.compact_timeline import CompactTimeline
+from at_temporal_solver.core.sessions import EvictionPolicy
+from at_temporal_solver.core.sessions import SessionStore
+from tests.test_temporal_solver import get_kb
+from tests.test_temporal_solver import get_tacts
+from tests.test_temporal_solver import get_wm_items
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_lru_eviction():
+    kb = get_kb()
+    evicted = []
+    store = SessionStore(EvictionPolicy(max_sessions=2), on_evict=evicted.append)
+    store["first"] = TemporalSolver(kb)
+    store["second"] = TemporalSolver(kb)
+    assert store["first"] is not None
+    store["third"] = TemporalSolver(kb)
+
+    assert list(store) == ["first", "third"]
+    assert [(eviction.key, eviction.reason) for eviction in evicted] == [("second", "lru")]
+    assert store.metrics.lru == 1
+
+
+def test_lru_eviction_skips_busy():
+    kb = get_kb()
+    busy = {"first"}
+    store = SessionStore(EvictionPolicy(max_sessions=2), is_busy=busy.__contains__)
+    store["first"] = TemporalSolver(kb)
+    store["second"] = TemporalSolver(kb)
+    store["third"] = TemporalSolver(kb)
+    assert list(store) == ["first", "third"]
+
+    busy.add("third")
+    store["fourth"] = TemporalSolver(kb)
+    assert list(store) == ["first", "third", "fourth"]
+    assert store.metrics.lru == 1
+
+    busy.clear()
+    store["fifth"] = TemporalSolver(kb)
+    assert list(store) == ["fourth", "fifth"]
+
+
+def test_ttl_eviction():
+    kb = get_kb()
+    clock = Clock()
+    store = SessionStore(EvictionPolicy(ttl=10), clock=clock)
+    store["first"] = TemporalSolver(kb)
+    clock.now = 5
+    store["second"] = TemporalSolver(kb)
+    clock.now = 12
+
+    assert [eviction.key for eviction in store.sweep()] == ["first"]
+    assert [eviction.key for eviction in store.sweep(busy=["second"], now=30)] == []
+    assert list(store) == ["second"]
+    assert store.metrics.ttl == 1
+
+
+def test_memory_eviction():
+    kb = get_kb()
+    solvers = {key: TemporalSolver(kb) for key in ["other", "large", "small"]}
+    for tact in get_tacts():
+        solvers["large"].update_wm(get_wm_items(tact))
+        solvers["large"].process_tact()
+    solvers["other"].update_wm(get_wm_items(get_tacts()[0]))
+    solvers["other"].process_tact()
+
+    budget = solvers["other"].nbytes
+    store = SessionStore(EvictionPolicy(session_memory=budget, memory=budget - 1))
+    for key, solver in solvers.items():
+        store[key] = solver
+
+    evictions = store.sweep()
+    assert [(eviction.key, eviction.reason) for eviction in evictions] == [
+        ("large", "session_memory"),
+        ("other", "memory"),
+    ]
+    assert list(store) == ["small"]
+    assert store.metrics.evicted == 2
+    assert store.metrics.nbytes == solvers["small"].nbytes
+
+
+def test_compact_timeline_session_memory():
+    solver = TemporalSolver(get_kb(), timeline_class=CompactTimeline)
+    for tact in get_tacts():
+        solver.update_wm(get_wm_items(tact))
+        solver.process_tact()
+    assert solver.nbytes == solver.timeline.nbytes + len(get_wm_items(get_tacts()[-1])) * WM_VALUE_BYTES
@@ -1,11 +1,21 @@
+from copy import deepcopy
+import asyncio
+
+import pytest
+
 from at_krl.core.knowledge_base import KnowledgeBase
 from at_solver.core.wm import WorkingMemory
 
 from at_temporal_solver.core.at_temporal_solver import TemporalSolver
+from at_temporal_solver.core.compact_timeline import CompactTimeline
+from at_temporal_solver.core.signification import SignificationPlan
+from at_temporal_solver.core.timeline import Timeline
+from at_temporal_solver.evaluations.compiled import ExpressionCompiler
+from at_temporal_solver.evaluations.simple import SimpleEvaluator
 
 
-def test_temporal_solver():
-    kb_dict = {
+def get_kb_dict() -> dict:
+    return {
         "tag": "knowledge-base",
         "problem_info": None,
         "types": [{"tag": "type", "id": "TEST", "desc": None, "meta": "number", "from": 0, "to": 1000}],
@@ -319,10 +329,13 @@ def test_temporal_solver():
         ],
     }
 
-    kb = KnowledgeBase.from_json(kb_dict)
-    solver = TemporalSolver(kb)
 
-    tacts = [
+def get_kb() -> KnowledgeBase:
+    return KnowledgeBase.from_json(get_kb_dict())
+
+
+def get_tacts():
+    return [
         {
             "current_tick": 1,
             "resources": [
@@ -366,6 +379,22 @@ def test_temporal_solver():
             ],
         },
     ]
+
+
+def get_wm_items(tact):
+    return [
+        {"ref": f"{resource['resource_name']}.{param}", "value": value}
+        for resource in tact["resources"]
+        for param, value in resource.items()
+        if param != "resource_name"
+    ]
+
+
+def test_temporal_solver():
+    kb = get_kb()
+    solver = TemporalSolver(kb)
+
+    tacts = get_tacts()
     for tact in tacts:
         solver.wm = WorkingMemory(kb=kb)
         print(solver.wm.all_values_dict)
@@ -380,3 +409,233 @@ def test_temporal_solver():
         solver.process_tact()
         print(solver.timeline.__dict__)
         print(solver.wm.locals)
+
+
+def test_delta_results():
+    kb = get_kb()
+    solver = TemporalSolver(kb)
+
+    previous = {}
+    for tact in get_tacts():
+        solver.wm = WorkingMemory(kb=kb)
+        for item in get_wm_items(tact):
+            solver.wm.set_value(item["ref"], item["value"])
+        solver.process_tact()
+        result = solver.get_result(delta=True)
+
+        assert result["sequence"] == solver.sequence
+        assert result["tact"]["tact"] == solver.current_tact
+        previous.update(result["wm"])
+        assert previous == solver.wm.all_values_dict
+
+    full = solver.get_result()
+    assert full["sequence"] == len(get_tacts())
+    assert full["wm"] == previous
+    assert solver.get_result(delta=True)["wm"] == {}
+
+
+def test_incremental_conditions():
+    kb = get_kb()
+    solver = TemporalSolver(kb)
+    incremental_solver = TemporalSolver(kb, incremental=True)
+
+    tacts = get_tacts() + get_tacts()
+    for index, tact in enumerate(tacts):
+        items = get_wm_items(tact)
+        clear_before = index % 2 == 0
+        if index % 3 == 0:
+            items = items[:1]
+        solver.update_wm(items, clear_before=clear_before)
+        changed = incremental_solver.update_wm(items, clear_before=clear_before)
+        assert changed <= {"object1.attr1", "object1.attr2", "object1.attr3"}
+
+        solver.process_tact()
+        incremental_solver.process_tact()
+        assert incremental_solver.timeline.__dict__ == solver.timeline.__dict__
+        assert incremental_solver.signified_meta == solver.signified_meta
+
+
+def test_compiled_expressions():
+    kb = get_kb()
+    solver = TemporalSolver(kb, compile_expressions=False)
+    compiler = ExpressionCompiler()
+    expressions = [interval.open for interval in kb.classes.intervals]
+    expressions += [interval.close for interval in kb.classes.intervals]
+    expressions += [event.occurance_condition for event in kb.classes.events]
+    expressions += [rule.condition.right for rule in kb.rules if rule.condition.is_binary]
+
+    for tact in get_tacts():
+        solver.update_wm(get_wm_items(tact))
+        evaluator = SimpleEvaluator(solver.wm)
+        for expression in expressions:
+            assert compiler.compile(expression)(solver.wm) == evaluator.eval(expression).content
+
+
+def test_compiled_unknown_operands():
+    def ref(attr: str) -> dict:
+        return {"tag": "ref", "id": "object1", "ref": {"tag": "ref", "id": attr, "ref": None}}
+
+    def operation(tag: str, left: dict, right: dict = None) -> dict:
+        return {"tag": tag, "left": left, "right": right}
+
+    def is_two(attr: str) -> dict:
+        return operation("eq", ref(attr), {"tag": "value", "content": 2})
+
+    conditions = []
+    for tag in ["and", "or"]:
+        for left, right in [("attr1", "attr2"), ("attr2", "attr1")]:
+            combined = operation(tag, is_two(left), is_two(right))
+            conditions.append(operation("not", combined))
+            conditions.append(operation("eq", combined, {"tag": "value", "content": False}))
+            conditions.append(operation("eq", combined, {"tag": "value", "content": True}))
+
+    kb_dict = get_kb_dict()
+    kb_dict["classes"][-2]["occurance_condition"] = conditions[0]
+    kb_dict["classes"][-1]["rules"] = [
+        {**kb_dict["classes"][-1]["rules"][1], "id": f"RULE{i}", "condition": condition}
+        for i, condition in enumerate(conditions)
+    ]
+    kb = KnowledgeBase.from_json(kb_dict)
+    expressions = [event.occurance_condition for event in kb.classes.events] + [rule.condition for rule in kb.rules]
+    compiler = ExpressionCompiler()
+    solver = TemporalSolver(kb, compile_expressions=False)
+
+    for items in [[], [{"ref": "object1.attr1", "value": 1}], [{"ref": "object1.attr1", "value": 2}]]:
+        solver.update_wm(items)
+        evaluator = SimpleEvaluator(solver.wm)
+        for expression in expressions:
+            assert compiler.compile(expression)(solver.wm) == evaluator.eval(expression).content
+
+    compiled_solver = TemporalSolver(kb)
+    for current in [solver, compiled_solver]:
+        current.update_wm([{"ref": "object1.attr1", "value": 1}])
+        current.process_tact()
+    assert compiled_solver.timeline.__dict__ == solver.timeline.__dict__
+
+
+def test_signification_plan():
+    kb_dict = get_kb_dict()
+    world = kb_dict["classes"][-1]
+    shared_rule = deepcopy(world["rules"][2])
+    shared_rule["id"] = "TEST_RULE4"
+    world["rules"].append(shared_rule)
+    kb = KnowledgeBase.from_json(kb_dict)
+
+    plan = SignificationPlan.from_kb(kb)
+    assert len(plan.operations) == 1
+    assert [rule.id for _, rule in plan.operations[0].usages] == ["TEST_RULE3", "TEST_RULE4"]
+
+    solver = TemporalSolver(kb)
+    for tact in get_tacts():
+        solver.update_wm(get_wm_items(tact))
+        solver.process_tact()
+        assert len(solver.signified_meta) == 2
+        values = {meta["value"] for meta in solver.signified_meta.values()}
+        assert len(values) == 1
+
+
+def test_selective_signification():
+    kb = get_kb()
+    plan = SignificationPlan.from_kb(kb)
+    assert not plan.volatile
+    assert set(plan.dependents) == {"TEST_INTERVAL", "TEST_EVENT"}
+
+    solver = TemporalSolver(kb)
+    incremental_solver = TemporalSolver(kb, incremental=True)
+    for tact in get_tacts():
+        solver.update_wm(get_wm_items(tact))
+        solver.process_tact()
+        incremental_solver.update_wm(get_wm_items(tact))
+        incremental_solver.process_tact()
+        assert incremental_solver.signified_meta == solver.signified_meta
+
+
+def test_retention_negative_indexes():
+    kb_dict = get_kb_dict()
+    allen_operation = kb_dict["classes"][-1]["rules"][2]["condition"]["left"]
+    allen_operation["left"]["index"] = {"tag": "value", "content": -3}
+    kb = KnowledgeBase.from_json(kb_dict)
+    assert SignificationPlan.from_kb(kb).kept_instances == 3
+
+    for timeline_class in [Timeline, CompactTimeline]:
+        solver = TemporalSolver(kb, timeline_class=timeline_class)
+        retention_solver = TemporalSolver(kb, timeline_class=timeline_class, retention=2)
+        for tact in get_tacts() * 5:
+            for current in [solver, retention_solver]:
+                current.update_wm(get_wm_items(tact))
+                current.process_tact()
+            assert retention_solver.signified_meta == solver.signified_meta
+        assert retention_solver.timeline.get_event_instance("TEST_EVENT", -3).occurance_tact < 30
+        assert None not in {meta["value"] for meta in retention_solver.signified_meta.values()}
+
+
+def test_process_tacts():
+    kb = get_kb()
+    solver = TemporalSolver(kb)
+    batch_solver = TemporalSolver(kb)
+
+    batches = [get_wm_items(tact) for tact in get_tacts()]
+    results = batch_solver.process_tacts(batches, delta=True)
+    for items, result in zip(batches, results):
+        solver.update_wm(items)
+        solver.process_tact()
+        assert result == solver.get_result(delta=True)
+
+    final_solver = TemporalSolver(kb)
+    [final] = final_solver.process_tacts(batches, final_only=True)
+    assert final == solver.get_result()
+
+
+def test_run_stream():
+    kb = get_kb()
+    solver = TemporalSolver(kb)
+    batches = [get_wm_items(tact) for tact in get_tacts()]
+
+    stream = TemporalSolver(kb).run(iter(batches))
+    for items in batches:
+        result = next(stream)
+        solver.update_wm(items)
+        solver.process_tact()
+        assert result.sequence == solver.sequence
+        assert result.tact == solver.current_tact
+        assert result.to_dict()["tact"] == solver.get_result(delta=True)["tact"]
+        assert result.signified_meta == solver.signified_meta
+
+    async def produce():
+        for items in batches:
+            yield items
+
+    async def consume():
+        return [result async for result in TemporalSolver(kb).arun(produce())]
+
+    results = asyncio.run(consume())
+    assert [result.tact for result in results] == list(range(len(batches)))
+    assert results[-1].signified_meta == solver.signified_meta
+
+
+def test_update_wm_columns():
+    kb = get_kb()
+    solver = TemporalSolver(kb, incremental=True)
+    columns_solver = TemporalSolver(kb, incremental=True)
+    for tact in get_tacts():
+        items = get_wm_items(tact)
+        solver.update_wm(items)
+        solver.process_tact()
+        wm = columns_solver.wm
+        values = {item["ref"]: columns_solver.wm.get_value(item["ref"]) for item in items}
+        changed = columns_solver.update_wm_columns([item["ref"] for item in items], [item["value"] for item in items])
+        assert columns_solver.wm is wm
+        for item in items:
+            value = columns_solver.wm.get_value(item["ref"])
+            assert value.content == item["value"]
+            assert (item["ref"] in changed) == (value is not values[item["ref"]])
+        columns_solver.process_tact()
+        assert columns_solver.get_result() == solver.get_result()
+
+    attr1 = columns_solver.wm.get_value("object1.attr1").content
+    changed = columns_solver.update_wm_columns(["object1.attr1"], [attr1], belief=[70])
+    assert changed == {"object1.attr2", "object1.attr3"}
+    assert columns_solver.wm is not wm
+    assert columns_solver.wm.get_value("object1.attr1").non_factor.belief == 70
+    with pytest.raises(ValueError):
+        columns_solver.update_wm_columns(["object1.attr1"], [1, 2])
@@ -0,0 +1,191 @@
+from at_krl.core.knowledge_base import KnowledgeBase
+
+from at_temporal_solver.core.compact_timeline import CompactTimeline
+from at_temporal_solver.core.timeline import Timeline
+
+
+def get_kb() -> KnowledgeBase:
+    kb_dict = {
+        "tag": "knowledge-base",
+        "problem_info": None,
+        "types": [{"tag": "type", "id": "TEST", "desc": None, "meta": "number", "from": 0, "to": 1000}],
+        "classes": [
+            {
+                "tag": "class",
+                "id": "КЛАСС_object1",
+                "group": "ГРУППА1",
+                "desc": "object1",
+                "properties": [
+                    {
+                        "tag": "property",
+                        "id": "attr1",
+                        "type": {"tag": "ref", "id": "TEST", "ref": None, "meta": "type_or_class"},
+                        "desc": None,
+                        "value": None,
+                        "source": "asked",
+                        "question": None,
+                        "query": None,
+                    },
+                ],
+                "rules": [],
+            },
+            {
+                "tag": "interval",
+                "id": "TEST_INTERVAL",
+                "group": "ИНТЕРВАЛ",
+                "desc": "TEST_INTERVAL",
+                "open": {
+                    "tag": "lt",
+                    "left": {"tag": "ref", "id": "object1", "ref": {"tag": "ref", "id": "attr1", "ref": None}},
+                    "right": {"tag": "value", "content": 2},
+                },
+                "close": {
+                    "tag": "ge",
+                    "left": {"tag": "ref", "id": "object1", "ref": {"tag": "ref", "id": "attr1", "ref": None}},
+                    "right": {"tag": "value", "content": 2},
+                },
+            },
+            {
+                "tag": "event",
+                "id": "TEST_EVENT",
+                "group": "СОБЫТИЕ",
+                "desc": "TEST_EVENT",
+                "occurance_condition": {
+                    "tag": "gt",
+                    "left": {"tag": "ref", "id": "object1", "ref": {"tag": "ref", "id": "attr1", "ref": None}},
+                    "right": {"tag": "value", "content": 4},
+                },
+            },
+            {
+                "tag": "class",
+                "id": "world",
+                "group": None,
+                "desc": "Класс верхнего уровня, включающий в себя экземпляры других классов и общие правила",
+                "properties": [
+                    {
+                        "tag": "property",
+                        "id": "object1",
+                        "type": {"tag": "ref", "id": "КЛАСС_object1", "ref": None, "meta": "type_or_class"},
+                        "desc": "object1",
+                        "value": None,
+                        "source": "asked",
+                        "question": None,
+                        "query": None,
+                    }
+                ],
+                "rules": [],
+            },
+        ],
+    }
+    return KnowledgeBase.from_json(kb_dict)
+
+
+def fill_timeline(timeline: Timeline, kb: KnowledgeBase, tacts: int = 10) -> Timeline:
+    interval = kb.classes.intervals[0]
+    event = kb.classes.events[0]
+    for tact in range(tacts):
+        timeline.get_or_create_tact_record(tact)
+        if tact % 2 == 0:
+            timeline.create_event_instance(tact, event)
+        if tact % 3 == 0:
+            timeline.open_interval_instance(tact, interval)
+        elif tact % 3 == 1:
+            timeline.close_interval_instance(tact, interval)
+    return timeline
+
+
+def test_timeline_instance_index():
+    kb = get_kb()
+    timeline = fill_timeline(Timeline(), kb)
+
+    assert timeline.last_tact_number == 9
+    assert timeline.count_event_instances("TEST_EVENT") == 5
+    assert timeline.count_interval_instances("TEST_INTERVAL") == 4
+    assert timeline.count_closed_interval_instances("TEST_INTERVAL") == 3
+
+    assert timeline.get_event_instance("TEST_EVENT", 0).occurance_tact == 0
+    assert timeline.get_event_instance("TEST_EVENT").occurance_tact == 8
+    assert timeline.get_interval_instance("TEST_INTERVAL", 1).close_tact == 4
+    assert timeline.get_interval_instance("TEST_INTERVAL", 4) is None
+    assert not timeline.get_interval_instance("TEST_INTERVAL").closed
+
+    assert [instance.open_tact for instance in timeline.get_all_interval_instances("TEST_INTERVAL")] == [0, 3, 6, 9]
+
+
+def test_timeline_opened_intervals():
+    kb = get_kb()
+    interval = kb.classes.intervals[0]
+    for timeline_class in [Timeline, CompactTimeline]:
+        timeline = timeline_class()
+
+        timeline.get_or_create_tact_record(0)
+        opened = timeline.open_interval_instance(0, interval)
+        assert timeline.interval_is_still_opened("TEST_INTERVAL")
+        assert timeline.open_interval_instance(0, interval) == opened
+        assert timeline.still_opened_intervals() == [opened]
+        assert timeline.get_opened_interval("TEST_INTERVAL") == opened
+
+        timeline.get_or_create_tact_record(1)
+        assert timeline.close_interval_instance(1, interval) == opened
+        assert timeline.get_interval_instance(interval).close_tact == 1
+        assert not timeline.interval_is_still_opened(interval)
+        assert timeline.get_opened_interval(interval) is None
+        assert timeline.close_interval_instance(1, interval) is None
+        assert timeline.still_opened_intervals() == []
+        assert dict(timeline.opened_intervals) == {}
+
+
+def test_compact_timeline_matches_default():
+    kb = get_kb()
+    timeline = fill_timeline(Timeline(), kb, tacts=30)
+    compact = fill_timeline(CompactTimeline(), kb, tacts=30)
+
+    assert compact.__dict__ == timeline.__dict__
+    assert compact.tact_numbers == timeline.tact_numbers
+    assert compact.get_tact_record(6).__dict__ == timeline.get_tact_record(6).__dict__
+    for method in ["count_event_instances", "count_interval_instances", "count_closed_interval_instances"]:
+        entity = "TEST_EVENT" if method == "count_event_instances" else "TEST_INTERVAL"
+        assert getattr(compact, method)(entity) == getattr(timeline, method)(entity)
+    for index in [0, 3, -1, -2, 100]:
+        expected = timeline.get_interval_instance("TEST_INTERVAL", index)
+        actual = compact.get_interval_instance("TEST_INTERVAL", index)
+        if expected is None:
+            assert actual is None
+        else:
+            assert (actual.open_tact, actual.close_tact) == (expected.open_tact, expected.close_tact)
+    assert compact.nbytes < 40 * 30
+
+
+def test_timeline_retention():
+    kb = get_kb()
+    for timeline_class in [Timeline, CompactTimeline]:
+        full = fill_timeline(timeline_class(), kb, tacts=100)
+        timeline = fill_timeline(timeline_class(retention=10), kb, tacts=100)
+
+        assert len(timeline.tact_numbers) < 20
+        assert timeline.last_tact_number == 99
+        for method in ["count_event_instances", "count_interval_instances", "count_closed_interval_instances"]:
+            entity = "TEST_EVENT" if method == "count_event_instances" else "TEST_INTERVAL"
+            assert getattr(timeline, method)(entity) == getattr(full, method)(entity)
+        assert timeline.get_event_instance("TEST_EVENT", 0) is None
+        assert timeline.get_event_instance("TEST_EVENT", 45).occurance_tact == 90
+        assert timeline.get_event_instance("TEST_EVENT", -2).occurance_tact == 96
+        assert timeline.get_interval_instance("TEST_INTERVAL").open_tact == 99
+
+        kept = fill_timeline(timeline_class(retention=3, kept_instances=3), kb, tacts=100)
+        kept.compact()
+        assert kept.get_event_instance("TEST_EVENT", -3).occurance_tact < 97
+        for index in [-1, -2, -3]:
+            assert (
+                kept.get_event_instance("TEST_EVENT", index).occurance_tact
+                == full.get_event_instance("TEST_EVENT", index).occurance_tact
+            )
+            assert (
+                kept.get_interval_instance("TEST_INTERVAL", index).open_tact
+                == full.get_interval_instance("TEST_INTERVAL", index).open_tact
+            )
+        assert kept.get_event_instance("TEST_EVENT", -4) is None
+        restored = timeline_class.from_state(
+            kept.to_state(), {entity.id: entity for entity in [*kb.classes.events, *kb.classes.intervals]}
+        )
+        assert restored.kept_instances == 3
@@ -0,0 +1,133 @@
+import asyncio
+import pickle
+
+import pytest
+
+from at_temporal_solver.core.at_temporal_solver import TemporalSolver
+from at_temporal_solver.core.sessions import EvictionPolicy
+from at_temporal_solver.core.workers import create_executor
+from at_temporal_solver.core.workers import describe_error
+from at_temporal_solver.core.workers import EXECUTOR_MODES
+from at_temporal_solver.core.workers import get_shard
+from at_temporal_solver.core.workers import rebuild_error
+from at_temporal_solver.core.workers import SolverOptions
+from at_temporal_solver.core.workers import WorkerError
+from tests.test_temporal_solver import get_kb
+from tests.test_temporal_solver import get_kb_dict
+from tests.test_temporal_solver import get_tacts
+from tests.test_temporal_solver import get_wm_items
+
+
+async def run_sessions(mode: str) -> dict:
+    executor = create_executor(mode, SolverOptions(), workers=2)
+    try:
+        keys = ["first", "second"]
+        for key in keys:
+            assert await executor.create(key, get_kb_dict())
+            assert executor.has_session(key)
+
+        results = {key: [] for key in keys}
+        for tact in get_tacts():
+            await executor.call("first", "update_wm", get_wm_items(tact))
+            tact_results = await asyncio.gather(
+                executor.call("first", "process_tact", delta=True),
+                executor.call("second", "update_and_process_tact", get_wm_items(tact), delta=True),
+            )
+            for key, result in zip(keys, tact_results):
+                results[key].append(result)
+
+        evicted, metrics = await executor.sweep()
+        assert evicted == []
+        assert metrics.sessions == len(keys)
+
+        with pytest.raises(ValueError):
+            await executor.call("unknown", "process_tact")
+        return results
+    finally:
+        executor.close()
+
+
+@pytest.mark.parametrize("mode", EXECUTOR_MODES)
+def test_executor_modes(mode):
+    solver = TemporalSolver(get_kb(), incremental=True)
+    expected = []
+    for tact in get_tacts():
+        solver.update_wm(get_wm_items(tact))
+        solver.process_tact()
+        expected.append(solver.get_result(delta=True))
+
+    results = asyncio.run(run_sessions(mode))
+    assert results["first"] == expected
+    assert results["second"] == expected
+
+
+async def run_lru_eviction(mode: str):
+    executor = create_executor(mode, SolverOptions(eviction=EvictionPolicy(max_sessions=1)), workers=1)
+    try:
+        assert await executor.create("first", get_kb_dict())
+        assert executor.take_evicted() == []
+        assert await executor.create("second", get_kb_dict())
+        assert executor.take_evicted() == ["first"]
+        assert executor.take_evicted() == []
+        assert not executor.has_session("first")
+        assert executor.has_session("second")
+        with pytest.raises(ValueError):
+            await executor.call("first", "process_tact")
+        if mode in ("process", "sharded"):
+            assert sum(worker.sessions for worker in executor.workers) == 1
+    finally:
+        executor.close()
+
+
+@pytest.mark.parametrize("mode", EXECUTOR_MODES)
+def test_executor_lru_eviction(mode):
+    asyncio.run(run_lru_eviction(mode))
+
+
+def test_shard_routing():
+    keys = [f"token-{i}" for i in range(100)]
+    shards = [get_shard(key, 4) for key in keys]
+    assert shards == [get_shard(key, 4) for key in keys]
+    assert set(shards) == {0, 1, 2, 3}
+
+
+class UnpicklableError(Exception):
+    def __init__(self, message: str):
+        super().__init__(message)
+        self.callback = lambda: None
+
+
+def test_worker_errors():
+    try:
+        raise UnpicklableError("failed")
+    except UnpicklableError as e:
+        description = describe_error(e)
+    error = rebuild_error(*pickle.loads(pickle.dumps(description)))
+    assert isinstance(error, WorkerError)
+    assert str(error) == "UnpicklableError: failed"
+    assert "test_worker_errors" in str(error.__cause__)
+
+    error = rebuild_error(*describe_error(ValueError("failed")))
+    assert type(error) is ValueError
+    assert str(error) == "failed"
+
+
+async def run_failing_worker():
+    executor = create_executor("process", SolverOptions(), workers=1)
+    try:
+        assert await executor.create("first", get_kb_dict())
+        with pytest.raises(KeyError):
+            await executor.call("first", "unknown")
+
+        worker = executor.owners["first"]
+        worker.process.kill()
+        worker.process.join()
+        for _ in range(2):
+            with pytest.raises(WorkerError):
+                await executor.call("first", "process_tact")
+    finally:
+        executor.close()
+
+
+def test_worker_exit():
+    asyncio.run(asyncio.wait_for(run_failing_worker(), timeout=60))